@@ -0,0 +1,158 @@
+"""Time-bucketed rollups of downloads, purchases and revenue.
+
+analytics_rollups holds one document per (scope, scope_id, granularity,
+bucket): scope is "pack", "creator" or "platform" (scope_id "all"),
+granularity "hour" or "day", and bucket the UTC start of the period. Each
+document counts downloads (whole packs, as in download_count), purchases,
+revenue_cents and earnings_cents (the creators' cut). Events are added
+with $inc upserts, batched into one bulk_write per call, and range queries
+read only these documents.
+
+rebuild() recounts every bucket from the downloads and purchases
+collections, for history that predates the rollups.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from ledger import creator_cut, to_cents
+
+GRANULARITIES = {"hour": timedelta(hours=1), "day": timedelta(days=1)}
+METRICS = ("downloads", "purchases", "revenue_cents", "earnings_cents")
+PLATFORM = "all"
+WRITE_BATCH_SIZE = 1000
+
+BucketKey = Tuple[str, str, str, datetime]
+
+
+def as_utc(at: datetime) -> datetime:
+    return at.replace(tzinfo=timezone.utc) if at.tzinfo is None else at.astimezone(timezone.utc)
+
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    at = as_utc(at)
+    if granularity == "day":
+        return at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def bucket_keys(pack_id: str, creator_id: Optional[str], at: datetime) -> List[BucketKey]:
+    """Every bucket an event at `at` for this pack falls into"""
+    scopes = [("pack", pack_id), ("platform", PLATFORM)]
+    if creator_id:
+        scopes.append(("creator", creator_id))
+    return [
+        (scope, scope_id, granularity, bucket_start(at, granularity))
+        for scope, scope_id in scopes
+        for granularity in GRANULARITIES
+    ]
+
+
+class Analytics:
+    def __init__(self, collection, packs):
+        self.collection = collection
+        self.packs = packs
+
+    async def _write(self, buckets: Dict[BucketKey, Counter], replace: bool = False) -> None:
+        """$inc each bucket by its counter, or with replace overwrite its metrics"""
+        operations = []
+        for (scope, scope_id, granularity, bucket), metrics in buckets.items():
+            values = {metric: metrics.get(metric, 0) for metric in METRICS} if replace else dict(metrics)
+            operations.append(UpdateOne(
+                {"scope": scope, "scope_id": scope_id, "granularity": granularity, "bucket": bucket},
+                {"$set": values} if replace else {"$inc": values},
+                upsert=True
+            ))
+        for start in range(0, len(operations), WRITE_BATCH_SIZE):
+            await self.collection.bulk_write(operations[start:start + WRITE_BATCH_SIZE], ordered=False)
+
+    async def _creators(self, pack_ids: Iterable[str]) -> Dict[str, str]:
+        packs = await self.packs.find(
+            {"pack_id": {"$in": list(set(pack_ids))}}, {"_id": 0, "pack_id": 1, "creator_id": 1}
+        ).to_list(None)
+        return {pack["pack_id"]: pack.get("creator_id") for pack in packs}
+
+    async def add_downloads(self, downloads: List[Dict]) -> None:
+        """Count download documents (pack_id, downloaded_at)"""
+        if not downloads:
+            return
+        creators = await self._creators(d["pack_id"] for d in downloads)
+        buckets = defaultdict(Counter)
+        for download in downloads:
+            for key in bucket_keys(download["pack_id"], creators.get(download["pack_id"]), download["downloaded_at"]):
+                buckets[key]["downloads"] += 1
+        await self._write(buckets)
+
+    async def add_purchase(self, pack_id: str, creator_id: Optional[str], gross_cents: int, at: datetime) -> None:
+        metrics = Counter(purchases=1, revenue_cents=gross_cents, earnings_cents=creator_cut(gross_cents))
+        await self._write({key: metrics for key in bucket_keys(pack_id, creator_id, at)})
+
+    async def series(self, scope: str, scope_id: str, granularity: str, start: datetime, end: datetime) -> List[Dict]:
+        """Buckets from the one containing start up to (not including) end,
+        with empty periods filled in"""
+        start, end = bucket_start(start, granularity), as_utc(end)
+        docs = await self.collection.find(
+            {
+                "scope": scope, "scope_id": scope_id, "granularity": granularity,
+                "bucket": {"$gte": start, "$lt": end}
+            },
+            {"_id": 0, "bucket": 1, **{metric: 1 for metric in METRICS}}
+        ).to_list(None)
+        by_bucket = {as_utc(doc["bucket"]): doc for doc in docs}
+        series = []
+        step = GRANULARITIES[granularity]
+        bucket = start
+        while bucket < end:
+            doc = by_bucket.get(bucket, {})
+            series.append({"bucket": bucket, **{metric: doc.get(metric, 0) for metric in METRICS}})
+            bucket += step
+        return series
+
+    async def rebuild(self, downloads, purchases) -> Dict[str, int]:
+        """Recount every bucket from the raw collections and overwrite them"""
+        creators = {}
+        async for pack in self.packs.find({}, {"_id": 0, "pack_id": 1, "creator_id": 1}):
+            creators[pack["pack_id"]] = pack.get("creator_id")
+        buckets = defaultdict(Counter)
+        counts = {"downloads": 0, "purchases": 0}
+        # ZIP member downloads carry a file name and aren't pack downloads
+        async for download in downloads.find({"file": {"$exists": False}}, {"_id": 0, "pack_id": 1, "downloaded_at": 1}):
+            for key in bucket_keys(download["pack_id"], creators.get(download["pack_id"]), download["downloaded_at"]):
+                buckets[key]["downloads"] += 1
+            counts["downloads"] += 1
+        async for purchase in purchases.find({}, {"_id": 0, "pack_id": 1, "amount": 1, "created_at": 1}):
+            gross = to_cents(purchase["amount"])
+            for key in bucket_keys(purchase["pack_id"], creators.get(purchase["pack_id"]), purchase["created_at"]):
+                buckets[key]["purchases"] += 1
+                buckets[key]["revenue_cents"] += gross
+                buckets[key]["earnings_cents"] += creator_cut(gross)
+            counts["purchases"] += 1
+        await self._write(buckets, replace=True)
+        counts["buckets"] = len(buckets)
+        return counts
+
+
+def summarize(series: List[Dict]) -> Dict:
+    """Totals over a series, with money in dollars"""
+    totals = {metric: sum(bucket[metric] for bucket in series) for metric in METRICS}
+    return {
+        "downloads": totals["downloads"],
+        "purchases": totals["purchases"],
+        "revenue": totals["revenue_cents"] / 100,
+        "earnings": totals["earnings_cents"] / 100,
+    }
+
+
+def in_dollars(series: List[Dict]) -> List[Dict]:
+    return [
+        {
+            "bucket": bucket["bucket"],
+            "downloads": bucket["downloads"],
+            "purchases": bucket["purchases"],
+            "revenue": bucket["revenue_cents"] / 100,
+            "earnings": bucket["earnings_cents"] / 100,
+        }
+        for bucket in series
+    ]
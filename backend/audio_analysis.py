@@ -0,0 +1,440 @@
+"""Audio decoding and waveform analysis for uploaded packs.
+
+Everything here is CPU- or subprocess-bound and meant to run in a worker
+process (see media_executor in server.py), never on the event loop.
+PCM WAV is decoded natively; every other format goes through ffmpeg.
+"""
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import wave
+import zipfile
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from audio_headers import AudioHeaderError, read_audio_info
+
+AUDIO_EXTENSIONS = {".wav", ".wave", ".aif", ".aiff", ".aifc", ".mp3", ".flac", ".ogg", ".m4a"}
+
+# Waveform peaks: min/max pairs per bucket at several resolutions, quantized
+# to int8. The envelope is built at ENVELOPE_RATE points per second first so
+# memory stays bounded regardless of file length.
+PEAKS_VERSION = 1
+PEAKS_RESOLUTIONS = (256, 1024, 4096)
+ENVELOPE_RATE = 400
+FFMPEG_SAMPLE_RATE = 22050
+BLOCK_FRAMES = 1 << 16
+# Tail of ffmpeg's error output kept in AudioDecodeError
+FFMPEG_ERROR_CHARS = 2000
+
+
+class AudioDecodeError(Exception):
+    pass
+
+
+def ffmpeg_path() -> Optional[str]:
+    return shutil.which(os.environ.get("FFMPEG_BINARY", "ffmpeg"))
+
+
+def pack_audio_key(pack: Dict) -> Optional[str]:
+    """Stored audio file that represents a pack: its preview, else the main file unless it's a ZIP"""
+    relative = pack.get("preview_audio_path")
+    if not relative and pack.get("file_type") != "zip":
+        relative = pack.get("audio_file_path")
+    if not relative or Path(relative).suffix.lower() not in AUDIO_EXTENSIONS:
+        return None
+    return relative
+
+
+def peaks_key(pack_id: str) -> str:
+    """Storage key of a pack's waveform peaks"""
+    return f"peaks/{pack_id}.json"
+
+
+def _pcm_to_float(raw: bytes, sample_width: int) -> np.ndarray:
+    if sample_width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sample_width == 2:
+        return np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    if sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        return ints.astype(np.float32) / 8388608.0
+    if sample_width == 4:
+        return np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    raise AudioDecodeError(f"Unsupported sample width: {sample_width}")
+
+
+def _iter_wav_blocks(path: Path, max_seconds: Optional[float], mono: bool) -> Iterator[Tuple[np.ndarray, int]]:
+    with wave.open(str(path), "rb") as wav:
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        rate = wav.getframerate()
+        remaining = wav.getnframes()
+        if max_seconds is not None:
+            remaining = min(remaining, int(max_seconds * rate))
+        while remaining > 0:
+            raw = wav.readframes(min(BLOCK_FRAMES, remaining))
+            if not raw:
+                break
+            samples = _pcm_to_float(raw, width)
+            frames = len(samples) // channels
+            remaining -= frames
+            block = samples[:frames * channels].reshape(frames, channels)
+            yield (block.mean(axis=1) if mono else block), rate
+
+
+def _iter_ffmpeg_blocks(path: Path, sample_rate: int, max_seconds: Optional[float], channels: int) -> Iterator[Tuple[np.ndarray, int]]:
+    binary = ffmpeg_path()
+    if not binary:
+        raise AudioDecodeError(f"ffmpeg is required to decode {path.suffix} files")
+    cmd = [binary, "-v", "error", "-nostdin", "-i", str(path)]
+    if max_seconds is not None:
+        cmd += ["-t", str(max_seconds)]
+    cmd += ["-f", "f32le", "-ac", str(channels), "-ar", str(sample_rate), "-"]
+    # stderr goes to a file rather than a pipe: nothing reads it while
+    # stdout is streaming, and a full stderr pipe would stall ffmpeg
+    with tempfile.TemporaryFile() as errors:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors)
+        try:
+            frame_bytes = 4 * channels
+            while True:
+                raw = proc.stdout.read(BLOCK_FRAMES * frame_bytes)
+                if not raw:
+                    break
+                samples = np.frombuffer(raw[:len(raw) - len(raw) % frame_bytes], dtype="<f4")
+                yield (samples if channels == 1 else samples.reshape(-1, channels)), sample_rate
+            proc.wait()
+            if proc.returncode != 0:
+                errors.seek(0)
+                message = errors.read().decode(errors="replace").strip()
+                raise AudioDecodeError(message[-FFMPEG_ERROR_CHARS:] or "ffmpeg failed")
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+            proc.stdout.close()
+
+
+def iter_audio_blocks(
+    path: Path,
+    sample_rate: int = FFMPEG_SAMPLE_RATE,
+    max_seconds: Optional[float] = None,
+    channels: int = 1
+) -> Iterator[Tuple[np.ndarray, int]]:
+    """Decode a file to float32 blocks of (samples, sample_rate).
+
+    With channels=1 blocks are mono 1-D arrays; otherwise they're
+    (frames, channels). PCM WAV keeps its native rate and channel layout;
+    anything else is converted by ffmpeg to sample_rate and `channels`. WAV
+    variants the wave module can't read (float, WAVE_FORMAT_EXTENSIBLE) also
+    fall back to ffmpeg.
+    """
+    path = Path(path)
+    if path.suffix.lower() in (".wav", ".wave"):
+        try:
+            with wave.open(str(path), "rb"):
+                pass
+        except (wave.Error, EOFError):
+            pass
+        else:
+            yield from _iter_wav_blocks(path, max_seconds, mono=channels == 1)
+            return
+    yield from _iter_ffmpeg_blocks(path, sample_rate, max_seconds, channels)
+
+
+def decode_audio(path: Path, sample_rate: int = FFMPEG_SAMPLE_RATE, max_seconds: Optional[float] = None) -> Tuple[np.ndarray, int]:
+    """Decode a whole file (or its first max_seconds) to one mono float32 array"""
+    blocks: List[np.ndarray] = []
+    rate = sample_rate
+    for block, rate in iter_audio_blocks(path, sample_rate, max_seconds):
+        blocks.append(block)
+    if not blocks:
+        return np.zeros(0, dtype=np.float32), rate
+    return np.concatenate(blocks), rate
+
+
+# ============================================
+# Waveform peaks
+# ============================================
+
+def _envelope(path: Path) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Stream the file into per-hop min/max arrays; returns (mins, maxs, duration)"""
+    mins: List[np.ndarray] = []
+    maxs: List[np.ndarray] = []
+    carry = np.zeros(0, dtype=np.float32)
+    total = 0
+    rate = FFMPEG_SAMPLE_RATE
+    hop = None
+    for block, rate in iter_audio_blocks(path):
+        if hop is None:
+            hop = max(1, rate // ENVELOPE_RATE)
+        total += len(block)
+        data = np.concatenate([carry, block]) if len(carry) else block
+        usable = len(data) - len(data) % hop
+        if usable:
+            frames = data[:usable].reshape(-1, hop)
+            mins.append(frames.min(axis=1))
+            maxs.append(frames.max(axis=1))
+        carry = data[usable:]
+    if len(carry):
+        mins.append(np.array([carry.min()], dtype=np.float32))
+        maxs.append(np.array([carry.max()], dtype=np.float32))
+    if not mins:
+        return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32), 0.0
+    return np.concatenate(mins), np.concatenate(maxs), total / rate
+
+
+def _quantize(values: np.ndarray) -> List[int]:
+    return np.clip(np.round(values * 127), -127, 127).astype(np.int8).tolist()
+
+
+def compute_peaks(path: Path) -> Dict:
+    """Multi-resolution min/max peaks for a file.
+
+    Each level holds `resolution` buckets as interleaved [min, max, ...]
+    int8 values (divide by 127 for -1..1). Levels finer than the envelope
+    itself are skipped for very short files.
+    """
+    mins, maxs, duration = _envelope(Path(path))
+    levels = {}
+    for resolution in PEAKS_RESOLUTIONS:
+        if len(mins) < resolution and levels:
+            break
+        buckets = min(resolution, len(mins))
+        if buckets == 0:
+            break
+        edges = np.linspace(0, len(mins), buckets + 1).astype(np.int64)[:-1]
+        interleaved = np.empty(buckets * 2, dtype=np.float32)
+        interleaved[0::2] = np.minimum.reduceat(mins, edges)
+        interleaved[1::2] = np.maximum.reduceat(maxs, edges)
+        levels[str(buckets)] = _quantize(interleaved)
+    return {
+        "version": PEAKS_VERSION,
+        "duration": round(duration, 3),
+        "bits": 8,
+        "levels": levels,
+    }
+
+
+def generate_peaks(source_path: str, peaks_path: str) -> Dict:
+    """Compute peaks for source_path and write them atomically as JSON"""
+    peaks = compute_peaks(Path(source_path))
+    target = Path(peaks_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.with_name(f".{target.name}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(peaks, f, separators=(",", ":"))
+    os.replace(tmp, target)
+    return {"duration": peaks["duration"], "levels": list(peaks["levels"].keys())}
+
+
+# ============================================
+# Loudness (ITU-R BS.1770-4 integrated, LUFS)
+# ============================================
+
+# Decoded audio is split into 100 ms segments; a 400 ms gating block with
+# 75% overlap is then the mean of four consecutive segment energies.
+LOUDNESS_SAMPLE_RATE = 48000
+SEGMENT_SECONDS = 0.1
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+# Channel weights for 5.1 (L, R, C, LFE, Ls, Rs); other layouts weigh all channels 1
+SURROUND_WEIGHTS = np.array([1.0, 1.0, 1.0, 0.0, 1.41, 1.41])
+
+
+def _biquad_power(b: List[float], a: List[float], w: np.ndarray) -> np.ndarray:
+    z = np.exp(-1j * w)
+    return np.abs((b[0] + b[1] * z + b[2] * z ** 2) / (a[0] + a[1] * z + a[2] * z ** 2)) ** 2
+
+
+def k_weighting_power(freqs: np.ndarray, rate: int) -> np.ndarray:
+    """|H(f)|^2 of the K-weighting pre-filter: +4 dB high shelf, then a 38 Hz high-pass"""
+    w = 2 * np.pi * freqs / rate
+
+    gain = 10 ** (4.0 / 40)
+    w0 = 2 * np.pi * 1500.0 / rate
+    cos, alpha = np.cos(w0), np.sin(w0) / (2 * (1 / np.sqrt(2)))
+    shelf = 2 * np.sqrt(gain) * alpha
+    shelf_b = [
+        gain * ((gain + 1) + (gain - 1) * cos + shelf),
+        -2 * gain * ((gain - 1) + (gain + 1) * cos),
+        gain * ((gain + 1) + (gain - 1) * cos - shelf),
+    ]
+    shelf_a = [
+        (gain + 1) - (gain - 1) * cos + shelf,
+        2 * ((gain - 1) - (gain + 1) * cos),
+        (gain + 1) - (gain - 1) * cos - shelf,
+    ]
+
+    w0 = 2 * np.pi * 38.0 / rate
+    cos, alpha = np.cos(w0), np.sin(w0) / (2 * 0.5)
+    highpass_b = [(1 + cos) / 2, -(1 + cos), (1 + cos) / 2]
+    highpass_a = [1 + alpha, -2 * cos, 1 - alpha]
+
+    return _biquad_power(shelf_b, shelf_a, w) * _biquad_power(highpass_b, highpass_a, w)
+
+
+def _segment_energies(path: Path, channels: int) -> Tuple[np.ndarray, float]:
+    """K-weighted mean-square energy per 100 ms segment and channel, plus decoded duration.
+
+    The filter is applied in the frequency domain per segment (Parseval),
+    which matches time-domain filtering up to segment-edge effects and keeps
+    the whole pass vectorized.
+    """
+    energies: List[np.ndarray] = []
+    carry = None
+    weights = None
+    segment = 0
+    total = 0
+    rate = LOUDNESS_SAMPLE_RATE
+    for block, rate in iter_audio_blocks(path, LOUDNESS_SAMPLE_RATE, channels=channels):
+        if block.ndim == 1:
+            block = block[:, None]
+        total += len(block)
+        if weights is None:
+            segment = int(round(rate * SEGMENT_SECONDS))
+            weights = k_weighting_power(np.fft.rfftfreq(segment, 1 / rate), rate)
+            # Interior bins of a real FFT stand for two conjugate bins
+            weights[1:(segment + 1) // 2] *= 2
+            weights /= segment * segment
+        data = np.concatenate([carry, block]) if carry is not None and len(carry) else block
+        usable = len(data) - len(data) % segment
+        if usable:
+            frames = data[:usable].reshape(-1, segment, data.shape[1])
+            spectrum = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+            energies.append(np.einsum("nbc,b->nc", spectrum, weights))
+        carry = data[usable:]
+    duration = total / rate if rate else 0.0
+    if not energies:
+        return np.zeros((0, 1)), duration
+    return np.concatenate(energies), duration
+
+
+def integrated_loudness(energies: np.ndarray) -> Optional[float]:
+    """Gated integrated loudness from segment energies; None for silence or under 400 ms"""
+    if len(energies) < 4:
+        return None
+    blocks = (energies[:-3] + energies[1:-2] + energies[2:-1] + energies[3:]) / 4
+    weights = SURROUND_WEIGHTS if blocks.shape[1] == len(SURROUND_WEIGHTS) else np.ones(blocks.shape[1])
+    z = blocks @ weights
+    with np.errstate(divide="ignore"):
+        loudness = -0.691 + 10 * np.log10(z)
+    above_absolute = loudness > ABSOLUTE_GATE_LUFS
+    if not above_absolute.any():
+        return None
+    relative_gate = -0.691 + 10 * np.log10(z[above_absolute].mean()) + RELATIVE_GATE_LU
+    gated = z[above_absolute & (loudness > relative_gate)]
+    return round(float(-0.691 + 10 * np.log10(gated.mean())), 2)
+
+
+# ============================================
+# Per-file and per-pack metadata
+# ============================================
+
+METADATA_FIELDS = ("codec", "sample_rate", "channels", "bit_depth")
+
+
+def analyze_audio_file(path: Path, filename: Optional[str] = None) -> Dict:
+    """Header fields plus decoded duration and integrated loudness for one file.
+
+    The decoded duration wins over the header's (MP3 durations without a
+    Xing tag are estimates). If the file can't be decoded, header values
+    are kept and loudness is None.
+    """
+    path = Path(path)
+    name = filename or path.name
+    try:
+        with open(path, "rb") as f:
+            info = read_audio_info(f, path.stat().st_size, name)
+    except AudioHeaderError:
+        info = None
+    result = {field: (info or {}).get(field) for field in METADATA_FIELDS}
+    result["duration"] = (info or {}).get("duration")
+    result["loudness_lufs"] = None
+
+    channels = result["channels"] if result["channels"] in (1, 2) else 2
+    try:
+        energies, decoded_duration = _segment_energies(path, channels)
+    except AudioDecodeError:
+        if info is None:
+            raise
+        return result
+    result["duration"] = round(decoded_duration, 3)
+    result["loudness_lufs"] = integrated_loudness(energies)
+    return result
+
+
+def is_audio_member(name: str) -> bool:
+    basename = os.path.basename(name)
+    return (
+        not name.startswith("__MACOSX/")
+        and not basename.startswith("._")
+        and os.path.splitext(basename)[1].lower() in AUDIO_EXTENSIONS
+    )
+
+
+def analyze_zip(path: Path) -> List[Dict]:
+    """Analyze every audio member of a ZIP; failures are recorded per member"""
+    members = []
+    with zipfile.ZipFile(path) as zf, tempfile.TemporaryDirectory() as tmp:
+        for info in zf.infolist():
+            if info.is_dir() or not is_audio_member(info.filename):
+                continue
+            member_path = Path(tmp) / f"member{os.path.splitext(info.filename)[1].lower()}"
+            try:
+                with zf.open(info) as src, open(member_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                result = analyze_audio_file(member_path, info.filename)
+            except (AudioDecodeError, AudioHeaderError, RuntimeError, NotImplementedError, zipfile.BadZipFile) as e:
+                result = {"error": str(e)}
+            finally:
+                member_path.unlink(missing_ok=True)
+            result["name"] = info.filename
+            members.append(result)
+    return members
+
+
+def _most_common(members: List[Dict], field: str):
+    values = [m[field] for m in members if m.get(field) is not None]
+    return Counter(values).most_common(1)[0][0] if values else None
+
+
+def summarize_members(members: List[Dict]) -> Dict:
+    """Pack-level metadata for a ZIP: the most common format, the loudest member"""
+    ok = [m for m in members if "error" not in m]
+    loudness = [m["loudness_lufs"] for m in ok if m.get("loudness_lufs") is not None]
+    summary = {field: _most_common(ok, field) for field in METADATA_FIELDS}
+    summary["loudness_lufs"] = max(loudness) if loudness else None
+    summary["file_count"] = len(ok)
+    summary["failed_count"] = len(members) - len(ok)
+    return summary
+
+
+# Per-member results of analyze_pack_file() copied into a ZIP's zip_manifest
+MEMBER_AUDIO_FIELDS = ("duration", "loudness_lufs")
+
+
+def analyze_pack_file(path: str) -> Dict:
+    """Metadata for a pack's main file (worker process entry point).
+
+    Returns {"duration", "audio_metadata"}, plus "members" for a ZIP, whose
+    duration is the total of its audio members.
+    """
+    path = Path(path)
+    if path.suffix.lower() == ".zip":
+        members = analyze_zip(path)
+        return {
+            "duration": round(sum(m.get("duration") or 0.0 for m in members if "error" not in m), 3),
+            "audio_metadata": summarize_members(members),
+            "members": members,
+        }
+    result = analyze_audio_file(path)
+    duration = result.pop("duration")
+    return {"duration": duration or 0.0, "audio_metadata": result}
@@ -0,0 +1,251 @@
+"""Container header parsing for WAV, AIFF, FLAC and MP3.
+
+Reads just enough of a (seekable) binary stream to report codec, sample
+rate, channels, bit depth and duration, without decoding any audio. Works
+on plain files and on ZipFile.open() members alike.
+"""
+import os
+import struct
+from typing import BinaryIO, Dict, Optional
+
+
+class AudioHeaderError(ValueError):
+    pass
+
+
+def _info(codec: str, sample_rate: int, channels: int, bit_depth: Optional[int], duration: Optional[float]) -> Dict:
+    return {
+        "codec": codec,
+        "sample_rate": sample_rate,
+        "channels": channels,
+        "bit_depth": bit_depth,
+        "duration": round(duration, 3) if duration is not None else None,
+    }
+
+
+def _read_exact(f: BinaryIO, n: int) -> bytes:
+    data = f.read(n)
+    if len(data) < n:
+        raise AudioHeaderError("Unexpected end of file")
+    return data
+
+
+# ============================================
+# WAV (RIFF / RF64)
+# ============================================
+
+WAV_CODECS = {1: "pcm", 3: "pcm_float", 6: "alaw", 7: "mulaw"}
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _read_wav(f: BinaryIO, size: int) -> Dict:
+    header = _read_exact(f, 12)
+    if header[:4] not in (b"RIFF", b"RF64") or header[8:12] != b"WAVE":
+        raise AudioHeaderError("Not a WAV file")
+
+    fmt = None
+    data_size = None
+    ds64_data_size = None
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, chunk_size = chunk[:4], struct.unpack("<I", chunk[4:])[0]
+        if chunk_id == b"data":
+            data_size = ds64_data_size if chunk_size == 0xFFFFFFFF and ds64_data_size else chunk_size
+            # Writers that never patched the header leave 0 or a bogus size
+            data_size = min(data_size or size, size - f.tell())
+            break
+        if chunk_id in (b"fmt ", b"ds64"):
+            body = _read_exact(f, chunk_size)
+            if chunk_size & 1:
+                f.read(1)
+            if chunk_id == b"ds64":
+                ds64_data_size = struct.unpack("<Q", body[8:16])[0]
+            else:
+                tag, channels, rate, _byte_rate, block_align, bits = struct.unpack("<HHIIHH", body[:16])
+                if tag == WAVE_FORMAT_EXTENSIBLE and len(body) >= 26:
+                    tag = struct.unpack("<H", body[24:26])[0]
+                fmt = (tag, channels, rate, block_align, bits)
+        else:
+            f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+
+    if fmt is None or data_size is None:
+        raise AudioHeaderError("WAV file has no fmt or data chunk")
+    tag, channels, rate, block_align, bits = fmt
+    frames = data_size // block_align if block_align else 0
+    return _info(WAV_CODECS.get(tag, f"wav_0x{tag:04x}"), rate, channels, bits, frames / rate if rate else None)
+
+
+# ============================================
+# AIFF / AIFF-C
+# ============================================
+
+def _extended_float(data: bytes) -> float:
+    """80-bit IEEE 754 extended precision, as used for the AIFF sample rate"""
+    exponent = ((data[0] & 0x7F) << 8) | data[1]
+    mantissa = int.from_bytes(data[2:10], "big")
+    if exponent == 0 and mantissa == 0:
+        return 0.0
+    value = mantissa * 2.0 ** (exponent - 16383 - 63)
+    return -value if data[0] & 0x80 else value
+
+
+def _read_aiff(f: BinaryIO, size: int) -> Dict:
+    header = _read_exact(f, 12)
+    if header[:4] != b"FORM" or header[8:12] not in (b"AIFF", b"AIFC"):
+        raise AudioHeaderError("Not an AIFF file")
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, chunk_size = chunk[:4], struct.unpack(">I", chunk[4:])[0]
+        if chunk_id == b"COMM":
+            body = _read_exact(f, chunk_size)
+            channels, frames, bits = struct.unpack(">hIh", body[:8])
+            rate = _extended_float(body[8:18])
+            codec = "pcm"
+            if header[8:12] == b"AIFC" and len(body) >= 22:
+                codec = body[18:22].decode("latin-1").strip().lower() or "pcm"
+                codec = {"none": "pcm", "sowt": "pcm", "fl32": "pcm_float", "fl64": "pcm_float"}.get(codec, codec)
+            return _info(codec, int(rate), channels, bits, frames / rate if rate else None)
+        f.seek(chunk_size + (chunk_size & 1), os.SEEK_CUR)
+    raise AudioHeaderError("AIFF file has no COMM chunk")
+
+
+# ============================================
+# FLAC
+# ============================================
+
+def _skip_id3v2(f: BinaryIO) -> int:
+    """Skip a leading ID3v2 tag; returns the offset of the audio stream"""
+    start = f.tell()
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == b"ID3":
+        tag_size = (header[6] << 21) | (header[7] << 14) | (header[8] << 7) | header[9]
+        offset = start + 10 + tag_size + (10 if header[5] & 0x10 else 0)
+    else:
+        offset = start
+    f.seek(offset)
+    return offset
+
+
+def _read_flac(f: BinaryIO, size: int) -> Dict:
+    _skip_id3v2(f)
+    if f.read(4) != b"fLaC":
+        raise AudioHeaderError("Not a FLAC file")
+    block_header = _read_exact(f, 4)
+    if block_header[0] & 0x7F != 0:
+        raise AudioHeaderError("FLAC stream does not start with STREAMINFO")
+    body = _read_exact(f, 34)
+    packed = int.from_bytes(body[10:18], "big")
+    rate = packed >> 44
+    channels = ((packed >> 41) & 0x7) + 1
+    bits = ((packed >> 36) & 0x1F) + 1
+    total_samples = packed & ((1 << 36) - 1)
+    duration = total_samples / rate if rate and total_samples else None
+    return _info("flac", rate, channels, bits, duration)
+
+
+# ============================================
+# MP3 (MPEG audio layers I-III)
+# ============================================
+
+_MPEG_BITRATES = {
+    (1, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (1, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (1, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (2, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (2, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (2, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MPEG_SAMPLE_RATES = {1: [44100, 48000, 32000], 2: [22050, 24000, 16000], 25: [11025, 12000, 8000]}
+MP3_SCAN_BYTES = 64 * 1024
+
+
+def _parse_mpeg_header(b: bytes) -> Optional[Dict]:
+    if b[0] != 0xFF or (b[1] & 0xE0) != 0xE0:
+        return None
+    version_bits = (b[1] >> 3) & 0x3
+    layer_bits = (b[1] >> 1) & 0x3
+    bitrate_index = b[2] >> 4
+    rate_index = (b[2] >> 2) & 0x3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    version = {3: 1, 2: 2, 0: 25}[version_bits]
+    layer = 4 - layer_bits
+    bitrate = _MPEG_BITRATES[(1 if version == 1 else 2, layer)][bitrate_index] * 1000
+    rate = _MPEG_SAMPLE_RATES[version][rate_index]
+    if layer == 1:
+        samples_per_frame = 384
+    elif layer == 2 or version == 1:
+        samples_per_frame = 1152
+    else:
+        samples_per_frame = 576
+    return {
+        "version": version,
+        "layer": layer,
+        "bitrate": bitrate,
+        "sample_rate": rate,
+        "channels": 1 if (b[3] >> 6) == 3 else 2,
+        "samples_per_frame": samples_per_frame,
+    }
+
+
+def _read_mp3(f: BinaryIO, size: int) -> Dict:
+    start = _skip_id3v2(f)
+    buf = f.read(MP3_SCAN_BYTES)
+    for i in range(max(0, len(buf) - 4)):
+        header = _parse_mpeg_header(buf[i:i + 4])
+        if header:
+            break
+    else:
+        raise AudioHeaderError("No MPEG audio frame found")
+
+    # A Xing/Info or VBRI tag in the first frame gives the exact frame count
+    frames = None
+    mono = header["channels"] == 1
+    if header["version"] == 1:
+        side_info = 17 if mono else 32
+    else:
+        side_info = 9 if mono else 17
+    xing_at = i + 4 + side_info
+    if buf[xing_at:xing_at + 4] in (b"Xing", b"Info") and len(buf) >= xing_at + 12:
+        flags = struct.unpack(">I", buf[xing_at + 4:xing_at + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack(">I", buf[xing_at + 8:xing_at + 12])[0]
+    elif buf[i + 36:i + 40] == b"VBRI" and len(buf) >= i + 54:
+        frames = struct.unpack(">I", buf[i + 50:i + 54])[0]
+
+    if frames:
+        duration = frames * header["samples_per_frame"] / header["sample_rate"]
+    else:
+        # Constant bitrate: estimate from the audio payload size
+        duration = (size - start - i) * 8 / header["bitrate"]
+    codec = "mp3" if header["layer"] == 3 else f"mp{header['layer']}"
+    return _info(codec, header["sample_rate"], header["channels"], None, duration)
+
+
+READERS = {
+    ".wav": _read_wav,
+    ".wave": _read_wav,
+    ".aif": _read_aiff,
+    ".aiff": _read_aiff,
+    ".aifc": _read_aiff,
+    ".flac": _read_flac,
+    ".mp3": _read_mp3,
+}
+
+
+def read_audio_info(f: BinaryIO, size: int, filename: str) -> Optional[Dict]:
+    """Header info for an audio stream, or None for formats without a header reader.
+
+    Raises AudioHeaderError if the stream doesn't match its extension.
+    """
+    reader = READERS.get(os.path.splitext(filename)[1].lower())
+    if reader is None:
+        return None
+    try:
+        return reader(f, size)
+    except (struct.error, IndexError) as e:
+        raise AudioHeaderError(f"Malformed {filename}: {e}") from e
@@ -0,0 +1,106 @@
+"""Benchmark /api/auth/me session resolution against a local mongod.
+
+Compares the old two-query lookup (user_sessions.find_one + users.find_one)
+with the single $lookup aggregation. The session cache is cleared before each
+request so every call measures the Mongo path.
+
+    cd backend && python benchmarks/bench_auth_me.py --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "sounddrops_bench")
+os.environ.setdefault("STRIPE_API_KEY", "sk_test_bench")
+
+import httpx  # noqa: E402
+import server  # noqa: E402
+
+
+async def legacy_resolve_session_user(token):
+    """The pre-aggregation resolution path: two sequential round trips"""
+    session_doc = await server.db.user_sessions.find_one({"session_token": token}, {"_id": 0})
+    if not session_doc:
+        return None
+    expires_at = session_doc["expires_at"]
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at < datetime.now(timezone.utc):
+        return None
+    user_doc = await server.db.users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
+    if not user_doc:
+        return None
+    return user_doc, expires_at
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def measure(client, token, requests):
+    latencies = []
+    for _ in range(requests):
+        server.session_cache.clear()
+        start = time.perf_counter()
+        resp = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert resp.status_code == 200, resp.text
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=100)
+    args = parser.parse_args()
+
+    user_id = f"user_bench_{uuid.uuid4().hex[:8]}"
+    token = f"bench_{uuid.uuid4().hex}"
+    now = datetime.now(timezone.utc)
+    await server.db.users.insert_one({
+        "user_id": user_id,
+        "email": f"{user_id}@bench.local",
+        "name": "Bench User",
+        "role": "user",
+        "created_at": now
+    })
+    await server.db.user_sessions.insert_one({
+        "user_id": user_id,
+        "session_token": token,
+        "expires_at": now + timedelta(days=1),
+        "created_at": now
+    })
+
+    transport = httpx.ASGITransport(app=server.app)
+    resolvers = {
+        "two-query": legacy_resolve_session_user,
+        "aggregation": server.resolve_session_user,
+    }
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, resolver in resolvers.items():
+                server.resolve_session_user = resolver
+                await measure(client, token, args.warmup)
+                latencies = await measure(client, token, args.requests)
+                print(
+                    f"{name:<12} p50={statistics.median(latencies):7.3f}ms "
+                    f"p99={percentile(latencies, 99):7.3f}ms n={len(latencies)}"
+                )
+    finally:
+        server.resolve_session_user = resolvers["aggregation"]
+        await server.db.user_sessions.delete_one({"session_token": token})
+        await server.db.users.delete_one({"user_id": user_id})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,156 @@
+"""Benchmark media throughput with and without front-proxy file offload.
+
+Starts two API servers behind one local nginx (benchmarks/nginx_offload.conf):
+one serving files itself (FILE_OFFLOAD=none, the current mode) and one
+answering with X-Accel-Redirect (FILE_OFFLOAD=x-accel). The same pack audio
+is then downloaded through each by concurrent clients. Needs nginx and
+uvicorn on PATH and a local mongod.
+
+    cd backend && python benchmarks/bench_file_offload.py --size-mb 50 --concurrency 32 --seconds 15
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "sounddrops_bench")
+os.environ.setdefault("STRIPE_API_KEY", "sk_test_bench")
+
+import httpx  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+PORTS = {"DIRECT_PORT": 8180, "OFFLOAD_PORT": 8181, "DIRECT_API_PORT": 8190, "OFFLOAD_API_PORT": 8191}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def write_test_file(path: Path, size_mb: int):
+    path.parent.mkdir(exist_ok=True)
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+
+def render_nginx_conf(tmp_dir: Path) -> Path:
+    conf = (BACKEND_DIR / "benchmarks" / "nginx_offload.conf").read_text()
+    for name, value in {**PORTS, "TMP_DIR": tmp_dir, "BACKEND_DIR": BACKEND_DIR}.items():
+        conf = conf.replace(f"@{name}@", str(value))
+    path = tmp_dir / "nginx.conf"
+    path.write_text(conf)
+    return path
+
+
+def start_api(port: int, offload: str, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "FILE_OFFLOAD": offload, "STORAGE_BACKEND": "local"}
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            resp = await client.head(url)
+            if resp.status_code < 500:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def measure(client: httpx.AsyncClient, url: str, concurrency: int, seconds: float):
+    latencies = []
+    total_bytes = 0
+    deadline = time.monotonic() + seconds
+
+    async def worker():
+        nonlocal total_bytes
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            async with client.stream("GET", url) as resp:
+                assert resp.status_code == 200, resp.status_code
+                async for chunk in resp.aiter_raw():
+                    total_bytes += len(chunk)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return total_bytes / elapsed / (1024 * 1024), len(latencies) / elapsed, latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--workers", type=int, default=2, help="uvicorn workers per API server")
+    args = parser.parse_args()
+
+    if not shutil.which("nginx"):
+        sys.exit("nginx not found on PATH")
+
+    db = AsyncIOMotorClient(os.environ["MONGO_URL"])[os.environ["DB_NAME"]]
+    pack_id = f"pack_bench_{uuid.uuid4().hex[:8]}"
+    key = f"bench/{pack_id}.wav"
+    write_test_file(BACKEND_DIR / key, args.size_mb)
+    await db.sample_packs.insert_one({
+        "pack_id": pack_id,
+        "title": "Offload bench",
+        "audio_file_path": key,
+        "file_type": "audio",
+        "price": 0.0,
+        "is_free": True,
+        "download_count": 0,
+        "created_at": datetime.now(timezone.utc)
+    })
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix="offload_bench_"))
+    processes = [
+        start_api(PORTS["DIRECT_API_PORT"], "none", args.workers),
+        start_api(PORTS["OFFLOAD_API_PORT"], "x-accel", args.workers),
+        subprocess.Popen(["nginx", "-p", str(tmp_dir), "-c", str(render_nginx_conf(tmp_dir)), "-g", "daemon off;"]),
+    ]
+    path = f"/api/samples/{pack_id}/audio"
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(timeout=None, limits=limits) as client:
+            for mode, port in (("direct", PORTS["DIRECT_PORT"]), ("x-accel", PORTS["OFFLOAD_PORT"])):
+                url = f"http://127.0.0.1:{port}{path}"
+                await wait_ready(client, url)
+                await measure(client, url, args.concurrency, min(3, args.seconds))
+                mb_per_s, req_per_s, latencies = await measure(client, url, args.concurrency, args.seconds)
+                print(
+                    f"{mode:<8} {mb_per_s:9.1f} MB/s {req_per_s:8.1f} req/s "
+                    f"p50={statistics.median(latencies):8.1f}ms p99={percentile(latencies, 99):8.1f}ms n={len(latencies)}"
+                )
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+        await db.sample_packs.delete_one({"pack_id": pack_id})
+        (BACKEND_DIR / key).unlink(missing_ok=True)
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
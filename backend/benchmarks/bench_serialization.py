@@ -0,0 +1,102 @@
+"""Compare JSON serialization paths for pack listings.
+
+    legacy:  serialize_doc() + jsonable_encoder + JSONResponse (stdlib json)
+    default: jsonable_encoder + JSONResponse (what un-wrapped routes did)
+    orjson:  FastJSONResponse rendering the raw documents
+
+    cd backend && python benchmarks/bench_serialization.py --packs 50 100
+"""
+import argparse
+import os
+import sys
+import timeit
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "sounddrops_bench")
+os.environ.setdefault("STRIPE_API_KEY", "sk_test_bench")
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+import server  # noqa: E402
+
+
+def serialize_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The recursive serializer the routes used before FastJSONResponse"""
+    if doc is None:
+        return None
+    result = {}
+    for key, value in doc.items():
+        if key == "_id":
+            continue
+        elif isinstance(value, ObjectId):
+            result[key] = str(value)
+        elif isinstance(value, datetime):
+            result[key] = value.isoformat()
+        elif isinstance(value, dict):
+            result[key] = serialize_doc(value)
+        elif isinstance(value, list):
+            result[key] = [serialize_doc(item) if isinstance(item, dict) else (str(item) if isinstance(item, ObjectId) else item) for item in value]
+        else:
+            result[key] = value
+    return result
+
+
+def make_pack(i: int) -> Dict[str, Any]:
+    pack_id = f"pack_{uuid.uuid4().hex[:12]}"
+    return {
+        "pack_id": pack_id,
+        "title": f"Cinematic Drums Vol. {i}",
+        "description": "Punchy, processed drum hits and loops recorded through vintage outboard gear. " * 3,
+        "category": ["Drums", "Bass", "Synths", "FX", "Vocals", "Loops"][i % 6],
+        "tags": ["cinematic", "trailer", "drums", "hybrid", "epic"],
+        "price": 19.99,
+        "is_free": False,
+        "is_featured": i % 7 == 0,
+        "is_sync_ready": i % 3 == 0,
+        "sync_type": "Film" if i % 3 == 0 else None,
+        "bpm": 90 + i % 60,
+        "key": "Am",
+        "key_normalized": "Am",
+        "creator_id": f"user_{uuid.uuid4().hex[:12]}",
+        "creator_name": "Some Producer",
+        "audio_file_path": f"zip_files/{pack_id}.zip",
+        "cover_image_path": f"covers/{pack_id}.png",
+        "preview_audio_path": f"previews/{pack_id}_preview.mp3",
+        "file_type": "zip",
+        "duration": 184.2,
+        "file_size": 523_001_337,
+        "download_count": i * 13,
+        "created_at": datetime.now(timezone.utc) - timedelta(days=i),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pack list serialization paths")
+    parser.add_argument("--packs", type=int, nargs="+", default=[50, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    for count in args.packs:
+        packs = [make_pack(i) for i in range(count)]
+        paths = {
+            "legacy": lambda: JSONResponse(jsonable_encoder([serialize_doc(p) for p in packs])).body,
+            "default": lambda: JSONResponse(jsonable_encoder(packs)).body,
+            "orjson": lambda: server.json_response(packs).body,
+        }
+        print(f"{count} packs ({len(paths['orjson']())} bytes):")
+        baseline = None
+        for name, fn in paths.items():
+            best = min(timeit.repeat(fn, repeat=args.repeat, number=args.number)) / args.number
+            baseline = baseline or best
+            print(f"  {name:<8} {best * 1e6:9.1f} us/response  {baseline / best:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
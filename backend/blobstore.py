@@ -0,0 +1,175 @@
+"""Content-addressed file storage with reference counts.
+
+Each distinct file is stored once, under blobs/<aa>/<sha256><ext> in the
+storage backend, and pack documents hold that relative path. The blobs
+collection counts references per blob: every pack that uses a blob holds
+one, whatever number of its fields point at it. The file is removed when
+the last reference goes.
+"""
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from ingest import COPY_CHUNK_SIZE, StagedFile
+
+BLOB_DIR = "blobs"
+ACQUIRE_ATTEMPTS = 20
+# Pack fields that may point at files
+PACK_FILE_PATH_FIELDS = ("audio_file_path", "cover_image_path", "preview_audio_path")
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_blob_path(path: Optional[str]) -> bool:
+    return bool(path) and path.startswith(f"{BLOB_DIR}/")
+
+
+def pack_file_paths(pack: Dict) -> Set[str]:
+    """Distinct file paths a pack document refers to"""
+    return {pack[field] for field in PACK_FILE_PATH_FIELDS if pack.get(field)}
+
+
+class BlobStore:
+    """Blobs live in a storage backend (see storage.py) under their blob path.
+    Incoming files are staged on local disk under staging_dir first."""
+
+    def __init__(self, storage, collection, staging_dir: Path):
+        self.storage = storage
+        self.collection = collection
+        self.staging_dir = staging_dir
+        staging_dir.mkdir(exist_ok=True)
+
+    @staticmethod
+    def blob_path(sha256: str, extension: str) -> str:
+        """Relative path of a blob; the extension is kept so media types can be guessed"""
+        extension = extension.lower()
+        if extension and not extension.startswith("."):
+            extension = f".{extension}"
+        return f"{BLOB_DIR}/{sha256[:2]}/{sha256}{extension}"
+
+    def staging_path(self, name: str) -> Path:
+        """Where to stage an incoming file; for local storage this is on the
+        same filesystem as the blobs, so storing it is a rename"""
+        return self.staging_dir / name
+
+    async def _acquire(self, path: str, size: int) -> bool:
+        """Take a reference; True if this created the blob's record.
+
+        A record marked deleting belongs to a release() that is removing the
+        file: the upsert then collides on the unique path index, and is
+        retried until that release has finished.
+        """
+        now = datetime.now(timezone.utc)
+        for attempt in range(ACQUIRE_ATTEMPTS):
+            try:
+                result = await self.collection.update_one(
+                    {"path": path, "deleting": {"$ne": True}},
+                    {"$inc": {"refcount": 1}, "$set": {"updated_at": now}, "$setOnInsert": {"size": size, "created_at": now}},
+                    upsert=True
+                )
+                return result.upserted_id is not None
+            except DuplicateKeyError:
+                await asyncio.sleep(0.05 * (attempt + 1))
+        raise RuntimeError(f"Blob {path} is still being deleted")
+
+    async def _store(self, source: Path, path: str, created: bool, move: bool) -> bool:
+        """Write source to the storage unless the blob is already there; True if it was"""
+        if not created and await asyncio.to_thread(self.storage.exists, path):
+            if move:
+                await asyncio.to_thread(source.unlink, missing_ok=True)
+            return True
+        await asyncio.to_thread(self.storage.put_file, path, source, move)
+        return False
+
+    async def put(self, staged: StagedFile, extension: str) -> str:
+        """Store a staged upload and take a reference to it; returns the blob path"""
+        path = self.blob_path(staged.sha256, extension)
+        # Referenced before it's written, so a concurrent release can't remove it
+        created = await self._acquire(path, staged.size)
+        try:
+            await self._store(staged.temp_path, path, created, move=True)
+        except BaseException:
+            await self.release(path)
+            raise
+        return path
+
+    async def put_all(self, items: List[Tuple[StagedFile, str]]) -> List[str]:
+        """put() each (staged, extension), taking one reference per distinct
+        blob: files with the same content and extension share it, as
+        release_pack() gives back one per distinct path. If one fails, release
+        the ones already stored and discard the rest, so a pack gets all of
+        its files or none."""
+        paths = []
+        acquired = []
+        try:
+            for staged, extension in items:
+                path = self.blob_path(staged.sha256, extension)
+                if path in acquired:
+                    staged.discard()
+                else:
+                    path = await self.put(staged, extension)
+                    acquired.append(path)
+                paths.append(path)
+        except BaseException:
+            for path in acquired:
+                await self.release(path)
+            for staged, _ in items[len(paths):]:
+                staged.discard()
+            raise
+        return paths
+
+    async def put_file(self, source: Path, extension: str) -> Tuple[str, int, bool]:
+        """Take a reference to a local file's content, copying it into the
+        store if it isn't there yet. Returns (blob path, size, deduplicated)."""
+        sha256 = await asyncio.to_thread(file_sha256, source)
+        size = (await asyncio.to_thread(source.stat)).st_size
+        path = self.blob_path(sha256, extension)
+        created = await self._acquire(path, size)
+        try:
+            deduplicated = await self._store(source, path, created, move=False)
+        except BaseException:
+            await self.release(path)
+            raise
+        return path, size, deduplicated
+
+    async def release(self, path: str) -> bool:
+        """Drop one reference; removes the blob with its last one. True if removed."""
+        blob = await self.collection.find_one_and_update(
+            {"path": path}, {"$inc": {"refcount": -1}}, projection={"_id": 0, "refcount": 1}, return_document=ReturnDocument.AFTER
+        )
+        if blob is None or blob["refcount"] > 0:
+            return False
+        # Claim the removal; put() waits for it rather than reusing the file
+        claimed = await self.collection.update_one(
+            {"path": path, "refcount": {"$lte": 0}, "deleting": {"$ne": True}},
+            {"$set": {"deleting": True}}
+        )
+        if not claimed.modified_count:
+            return False
+        try:
+            await asyncio.to_thread(self.storage.delete, path)
+        finally:
+            await self.collection.delete_one({"path": path, "deleting": True})
+        return True
+
+    async def release_pack(self, pack: Dict) -> int:
+        """Release every blob a pack refers to; returns how many were removed"""
+        removed = 0
+        for path in pack_file_paths(pack):
+            if is_blob_path(path) and await self.release(path):
+                removed += 1
+        return removed
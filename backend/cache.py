@@ -0,0 +1,157 @@
+"""In-process caches used by the API (per worker, bounded, TTL + LRU)"""
+import asyncio
+import threading
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from cachetools import TTLCache
+
+
+class LRUTTLCache:
+    """Size-bounded LRU cache with a global TTL and hit/miss counters"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drop every entry matching predicate(key, value); returns the number removed"""
+        with self._lock:
+            keys = [k for k, v in self._data.items() if predicate(k, v)]
+            for k in keys:
+                self._data.pop(k, None)
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+
+class SessionCache(LRUTTLCache):
+    """Session token -> (User, session expiry)
+
+    Entries never outlive the session itself, and are dropped explicitly on
+    logout or when the user's record changes. The TTL bounds how long another
+    worker's stale copy can survive a change made elsewhere.
+    """
+
+    def get_user(self, token: str) -> Optional[Any]:
+        entry: Optional[Tuple[Any, datetime]] = self.get(token)
+        if entry is None:
+            return None
+        user, expires_at = entry
+        if expires_at < datetime.now(timezone.utc):
+            self.invalidate(token)
+            return None
+        return user
+
+    def put_user(self, token: str, user: Any, expires_at: datetime) -> None:
+        self.set(token, (user, expires_at))
+
+    def invalidate_user(self, user_id: str) -> int:
+        return self.invalidate_where(lambda _token, entry: entry[0].user_id == user_id)
+
+
+class LoadingCache(LRUTTLCache):
+    """Read-through cache that collapses concurrent misses for a key (single-flight)
+
+    Missing values (loader returns None) are not cached. A load that overlaps
+    an invalidation is returned to its callers but not stored, so a mutation
+    can't be overwritten by a read that started before it.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        super().__init__(maxsize, ttl)
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._version = 0
+        self.coalesced = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Optional[Any]:
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The leading request was cancelled, not us: load it ourselves
+                return await self.get_or_load(key, loader)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        version = self._version
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an exception nobody else awaited isn't logged
+            future.exception()
+            raise
+        else:
+            if value is not None and version == self._version:
+                self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def invalidate(self, key: Hashable) -> None:
+        self._version += 1
+        self._inflight.pop(key, None)
+        super().invalidate(key)
+
+    def clear(self) -> None:
+        self._version += 1
+        self._inflight.clear()
+        super().clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["coalesced"] = self.coalesced
+        return stats
@@ -0,0 +1,54 @@
+"""Shared catalog version, with a log of the packs each version changed.
+
+catalog_meta holds one document, {_id: "catalog", version, changes}. A pack
+mutation increments version and appends the ids of the packs it touched to
+changes in the same update, trimmed to the last CHANGE_LOG_SIZE entries, so
+the last entry always belongs to the current version. A worker that is
+behind by no more versions than the log holds evicts and reindexes just
+those packs. Further behind, or past a bump that cleared the log (bulk
+changes from manage.py), it has to rebuild everything.
+"""
+from typing import Any, Dict, Iterable, Optional, Set
+
+from pymongo import ReturnDocument
+
+CATALOG_ID = "catalog"
+CHANGE_LOG_SIZE = 256
+
+
+def current_version(doc: Optional[Dict[str, Any]]) -> int:
+    return doc["version"] if doc else 0
+
+
+async def bump_version(collection, pack_ids: Iterable[str]) -> Dict[str, Any]:
+    """Record a change to these packs; returns the updated catalog document"""
+    return await collection.find_one_and_update(
+        {"_id": CATALOG_ID},
+        {
+            "$inc": {"version": 1},
+            "$push": {"changes": {"$each": [sorted(set(pack_ids))], "$slice": -CHANGE_LOG_SIZE}},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def bump_version_all(collection) -> None:
+    """Record a change that may touch any pack, so every worker rebuilds"""
+    await collection.update_one(
+        {"_id": CATALOG_ID},
+        {"$inc": {"version": 1}, "$set": {"changes": []}},
+        upsert=True
+    )
+
+
+def changed_since(doc: Optional[Dict[str, Any]], version: int) -> Optional[Set[str]]:
+    """Pack ids changed after `version` up to the document's version, or None
+    when the log no longer covers that range"""
+    behind = current_version(doc) - version
+    if behind == 0:
+        return set()
+    changes = doc.get("changes", []) if doc else []
+    if behind < 0 or behind > len(changes):
+        return None
+    return {pack_id for entry in changes[-behind:] for pack_id in entry}
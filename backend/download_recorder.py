@@ -0,0 +1,275 @@
+"""Write-behind recording of download events.
+
+Requests queue their events in memory; a background task writes them in
+batches, with one insert_many into downloads and one $inc per pack per
+batch, so a popular pack's document takes one update per flush instead of
+one per download. The queue is bounded: when it is full, record() waits
+for the flusher.
+
+With a journal directory, every event is also appended to a segment file
+there before it is queued. A segment is closed once it holds
+SEGMENT_MAX_EVENTS events or SEGMENT_MAX_BYTES bytes (or the flusher
+catches up with the queue), and deleted once all of its events are in
+Mongo. On startup, segments left by a crashed worker (no process holds
+their lock) are replayed. Replays are idempotent because download_id
+is unique: events that are already stored are skipped, counts included.
+Appends are flushed to the OS but not fsynced, so they survive a worker
+crash but not a host crash.
+"""
+import asyncio
+import fcntl
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from bson import json_util
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY = 11000
+RETRY_SECONDS = 1.0
+SEGMENT_GLOB = "downloads-*.jsonl"
+# A segment is closed at whichever of these it reaches first, so under
+# sustained load the journal stays bounded by the events not yet written
+SEGMENT_MAX_EVENTS = 10000
+SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+
+
+class _Segment:
+    """One journal file, locked for as long as this worker writes to it"""
+
+    def __init__(self, directory: Path):
+        name = f"downloads-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        temp = directory / f".{name}.tmp"
+        self.file = open(temp, "a", encoding="utf-8")
+        fcntl.flock(self.file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        # Locked before it gets a name recovery looks at
+        self.path = directory / f"{name}.jsonl"
+        os.rename(temp, self.path)
+        self.events = 0
+        self.size = 0
+        self.outstanding = 0
+        self.closed = False
+
+    @property
+    def full(self) -> bool:
+        return self.events >= SEGMENT_MAX_EVENTS or self.size >= SEGMENT_MAX_BYTES
+
+    def append(self, item: Dict) -> None:
+        line = json_util.dumps(item) + "\n"
+        self.file.write(line)
+        self.file.flush()
+        self.events += 1
+        self.size += len(line)
+        self.outstanding += 1
+
+    def close(self) -> None:
+        self.file.close()
+        self.closed = True
+
+    def remove(self) -> None:
+        self.path.unlink(missing_ok=True)
+        if not self.closed:
+            self.close()
+
+
+class _Event:
+    __slots__ = ("doc", "counted", "segment")
+
+    def __init__(self, doc: Dict, counted: bool, segment: Optional[_Segment] = None):
+        self.doc = doc
+        self.counted = counted
+        self.segment = segment
+
+
+class _Batch:
+    """Events written together, with how far the write got: a batch resumed
+    after a cancelled write doesn't repeat the steps that completed"""
+
+    def __init__(self, events: List[_Event]):
+        self.events = events
+        # Newly stored pack downloads, once the insert has gone through
+        self.counted: Optional[List[Dict]] = None
+        self.counts_done = False
+        self.hook_done = False
+
+
+class DownloadRecorder:
+    def __init__(
+        self,
+        downloads,
+        packs,
+        max_queue: int = 10000,
+        batch_size: int = 500,
+        flush_seconds: float = 1.0,
+        journal_dir: Optional[Path] = None,
+        on_flush: Optional[Callable[[List[Dict]], Awaitable[None]]] = None
+    ):
+        self.downloads = downloads
+        self.packs = packs
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.journal_dir = journal_dir
+        # Called with the newly stored pack downloads of each batch
+        self.on_flush = on_flush
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._segment: Optional[_Segment] = None
+        self._batch: Optional[_Batch] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self.journal_dir:
+            self.journal_dir.mkdir(parents=True, exist_ok=True)
+            await self._recover()
+            self._segment = _Segment(self.journal_dir)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Stop the flusher and write whatever is still queued"""
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        # The batch the flusher was writing resumes where it was cancelled
+        batches = [self._batch] if self._batch else []
+        self._batch = None
+        queued = [self._queue.get_nowait() for _ in range(self._queue.qsize())]
+        if queued:
+            batches.append(_Batch(queued))
+        if batches:
+            try:
+                await asyncio.wait_for(self._write_all(batches), timeout)
+            except Exception as e:
+                kept = " (kept in the journal)" if self.journal_dir else ""
+                pending = sum(len(batch.events) for batch in batches)
+                logger.error(f"Failed to write {pending} download events on shutdown{kept}: {e}")
+                return
+        if self._segment:
+            self._segment.remove()
+
+    async def record(self, user_id: str, pack_id: str, file: Optional[str] = None) -> None:
+        """Queue a download. A whole-pack download counts towards the pack's
+        download_count; a single file from inside a ZIP (file) doesn't."""
+        doc = {
+            "download_id": f"dl_{uuid.uuid4().hex[:12]}",
+            "user_id": user_id,
+            "pack_id": pack_id,
+            "downloaded_at": datetime.now(timezone.utc)
+        }
+        if file is not None:
+            doc["file"] = file
+        event = _Event(doc, counted=file is None, segment=self._segment)
+        if event.segment:
+            event.segment.append({"doc": doc, "counted": event.counted})
+            if event.segment.full:
+                self._rotate()
+        await self._queue.put(event)
+
+    def _rotate(self) -> None:
+        """Close the current segment (removed once its events are written) and
+        journal later events to a new one"""
+        self._segment.close()
+        self._segment = _Segment(self.journal_dir)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            events = [await self._queue.get()]
+            deadline = loop.time() + self.flush_seconds
+            while len(events) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    events.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            if self._segment and self._segment.outstanding and self._queue.empty():
+                # Everything journaled so far is in this batch: later events
+                # start a new segment, and this one can go once it's written
+                self._rotate()
+            self._batch = _Batch(events)
+            await self._write(self._batch)
+            self._batch = None
+
+    async def _write_all(self, batches: List[_Batch]) -> None:
+        for batch in batches:
+            await self._write(batch)
+
+    async def _write(self, batch: _Batch) -> None:
+        """Write a batch, retrying until Mongo takes it. Each step runs once,
+        so a retry after a failed step doesn't repeat the ones before it."""
+        events = batch.events
+        while True:
+            try:
+                if batch.counted is None:
+                    batch.counted = await self._insert(events)
+                if not batch.counts_done:
+                    increments = Counter(doc["pack_id"] for doc in batch.counted)
+                    if increments:
+                        await self.packs.bulk_write(
+                            [UpdateOne({"pack_id": pack_id}, {"$inc": {"download_count": n}}) for pack_id, n in increments.items()],
+                            ordered=False
+                        )
+                    batch.counts_done = True
+                if self.on_flush and not batch.hook_done:
+                    # Marked before the call: a hook that failed part way
+                    # through may have applied some of its writes, so it
+                    # isn't run again (the analytics rollups can be rebuilt)
+                    batch.hook_done = True
+                    try:
+                        await self.on_flush(batch.counted)
+                    except Exception as e:
+                        logger.error(f"Download flush hook failed: {e}")
+                break
+            except PyMongoError as e:
+                logger.error(f"Failed to write {len(events)} download events, retrying: {e}")
+                await asyncio.sleep(RETRY_SECONDS)
+        segments = {id(e.segment): e.segment for e in events if e.segment}
+        for event in events:
+            if event.segment:
+                event.segment.outstanding -= 1
+        for segment in segments.values():
+            if segment.closed and segment.outstanding <= 0:
+                segment.remove()
+
+    async def _insert(self, events: List[_Event]) -> List[Dict]:
+        """Insert the events' documents; returns the pack downloads among
+        them that weren't already stored"""
+        stored = set()
+        try:
+            await self.downloads.insert_many([e.doc for e in events], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error["code"] != DUPLICATE_KEY for error in errors):
+                raise
+            stored = {error["index"] for error in errors}
+        return [event.doc for i, event in enumerate(events) if event.counted and i not in stored]
+
+    async def _recover(self) -> None:
+        """Replay segments whose worker is gone"""
+        for path in sorted(self.journal_dir.glob(SEGMENT_GLOB)):
+            with open(path, "r", encoding="utf-8") as f:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # A live worker's segment
+                    continue
+                events = []
+                for line in f:
+                    try:
+                        item = json_util.loads(line)
+                    except ValueError:
+                        # Torn final line from the crash
+                        continue
+                    events.append(_Event(item["doc"], item["counted"]))
+                for start in range(0, len(events), self.batch_size):
+                    await self._write(_Batch(events[start:start + self.batch_size]))
+                path.unlink(missing_ok=True)
+            if events:
+                logger.info(f"Replayed {len(events)} download events from {path.name}")
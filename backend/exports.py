@@ -0,0 +1,160 @@
+"""Full-dataset exports for admin tooling, streamed as NDJSON or CSV.
+
+Rows are read from a Mongo cursor in _id order and encoded as they
+arrive, so memory stays flat however large the collection. Each row
+carries an export_cursor token; passing the last one received as `after`
+resumes an interrupted export right after that row.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import orjson
+from bson import ObjectId
+
+from pagination import decode_cursor, encode_cursor
+
+CURSOR_FIELD = "export_cursor"
+BATCH_SIZE = 1000
+# CSV rows are buffered into chunks of about this many bytes
+CSV_CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+}
+
+
+class ExportSpec:
+    def __init__(self, collection: str, columns: List[str], time_field: str, filters: Dict[str, type]):
+        self.collection = collection
+        self.columns = columns
+        # since/until apply to this field
+        self.time_field = time_field
+        # Query parameters that filter on a field, with the value's type
+        self.filters = filters
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "users": ExportSpec(
+        "users",
+        ["user_id", "email", "name", "role", "creator_approved", "payout_frequency", "created_at"],
+        "created_at",
+        {"role": str, "creator_approved": bool}
+    ),
+    "packs": ExportSpec(
+        "sample_packs",
+        [
+            "pack_id", "title", "creator_id", "creator_name", "category", "price", "is_free",
+            "file_type", "bpm", "key", "duration", "download_count", "created_at"
+        ],
+        "created_at",
+        {"creator_id": str, "category": str, "is_free": bool}
+    ),
+    "purchases": ExportSpec(
+        "purchases",
+        ["purchase_id", "user_id", "pack_id", "amount", "stripe_session_id", "created_at"],
+        "created_at",
+        {"user_id": str, "pack_id": str}
+    ),
+    "downloads": ExportSpec(
+        "downloads",
+        ["download_id", "user_id", "pack_id", "file", "downloaded_at"],
+        "downloaded_at",
+        {"user_id": str, "pack_id": str}
+    ),
+    "payouts": ExportSpec(
+        "payouts",
+        ["payout_id", "creator_id", "amount", "method", "status", "is_instant", "created_at"],
+        "created_at",
+        {"creator_id": str, "status": str}
+    ),
+    "invitations": ExportSpec(
+        "creator_invitations",
+        ["invitation_id", "email", "invited_by", "status", "created_at", "accepted_at"],
+        "created_at",
+        {"status": str}
+    ),
+}
+
+
+def _parse_value(value: str, kind: type) -> Any:
+    if kind is bool:
+        if value.lower() not in ("true", "false"):
+            raise ValueError(f"expected true or false, not {value!r}")
+        return value.lower() == "true"
+    return value
+
+
+def export_query(
+    name: str,
+    params: Dict[str, str],
+    after: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """Mongo filter for an export; raises ValueError on an unknown filter,
+    a bad value or an invalid resume token"""
+    spec = EXPORTS[name]
+    query: Dict[str, Any] = {}
+    for key, value in params.items():
+        if key not in spec.filters:
+            raise ValueError(f"Unknown filter '{key}' for {name}; supported: {', '.join(spec.filters) or 'none'}")
+        try:
+            query[key] = _parse_value(value, spec.filters[key])
+        except ValueError as e:
+            raise ValueError(f"Invalid {key}: {e}")
+    if since or until:
+        query[spec.time_field] = {
+            **({"$gte": since} if since else {}),
+            **({"$lt": until} if until else {}),
+        }
+    if after:
+        (last_id,) = decode_cursor(after, f"export:{name}")
+        if not ObjectId.is_valid(last_id):
+            raise ValueError("Invalid cursor")
+        query["_id"] = {"$gt": ObjectId(last_id)}
+    return query
+
+
+def _row(name: str, doc: Dict[str, Any]) -> Dict[str, Any]:
+    row = {column: doc.get(column) for column in EXPORTS[name].columns}
+    row[CURSOR_FIELD] = encode_cursor(f"export:{name}", [str(doc["_id"])])
+    return row
+
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return value
+
+
+async def iter_export(collection, name: str, query: Dict[str, Any], fmt: str) -> AsyncIterator[bytes]:
+    """Encoded export rows matching query, in _id order"""
+    spec = EXPORTS[name]
+    projection = {column: 1 for column in spec.columns}
+    cursor = collection.find(query, projection).sort("_id", 1).batch_size(BATCH_SIZE)
+    try:
+        if fmt == "ndjson":
+            async for doc in cursor:
+                yield orjson.dumps(_row(name, doc)) + b"\n"
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(spec.columns + [CURSOR_FIELD])
+        async for doc in cursor:
+            row = _row(name, doc)
+            writer.writerow([_csv_value(row[column]) for column in spec.columns + [CURSOR_FIELD]])
+            if buffer.tell() >= CSV_CHUNK_SIZE:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+    finally:
+        await cursor.close()
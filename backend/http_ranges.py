@@ -0,0 +1,95 @@
+"""HTTP Range requests (RFC 9110 single byte ranges) and partial responses"""
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Parse a Range header into an inclusive (start, end) for a body of `size` bytes.
+
+    Returns None when the whole body should be sent: no header, a unit
+    other than bytes, a malformed value, or several ranges (answering those
+    with the full body is allowed and avoids multipart responses). Raises
+    RangeNotSatisfiable if the range lies entirely past the end.
+    """
+    if not header or size == 0:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, sep, last = spec.strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first == "":
+            # Suffix range: the last N bytes
+            suffix = int(last)
+            if suffix <= 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    if end < start:
+        return None
+    return start, min(end, size - 1)
+
+
+def requested_range(request: Request, size: int, etag: Optional[str] = None) -> Optional[Tuple[int, int]]:
+    """The single byte range a request asks for, or None for the whole body (416 if unsatisfiable)"""
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range.strip() != etag:
+        # The client's partial copy is stale: send the whole body
+        return None
+    try:
+        return parse_range(range_header, size)
+    except RangeNotSatisfiable:
+        raise HTTPException(
+            status_code=416,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"}
+        )
+
+
+def stream_range_response(chunks, size: int, byte_range: Optional[Tuple[int, int]], media_type: str, headers: Dict[str, str]) -> StreamingResponse:
+    """200 with the whole body, or 206 with Content-Range when byte_range is set"""
+    headers = {"Accept-Ranges": "bytes", **headers}
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(max(0, end - start + 1))
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(chunks, status_code=206 if byte_range else 200, media_type=media_type, headers=headers)
+
+
+def content_disposition(filename: str, inline: bool = False) -> str:
+    """Content-Disposition value with an RFC 5987 fallback for non-ASCII names"""
+    disposition = "inline" if inline else "attachment"
+    if filename.isascii() and '"' not in filename:
+        return f'{disposition}; filename="{filename}"'
+    return f"{disposition}; filename*=utf-8''{quote(filename)}"
+
+
+def iter_file_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    """Yield bytes [start, end] (inclusive) of a file"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
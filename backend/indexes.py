@@ -0,0 +1,264 @@
+"""Declarative index manifest and query-plan report for the SoundDrops collections"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+# collection -> indexes. Applied idempotently on every startup.
+INDEX_MANIFEST: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("role", ASCENDING), ("creator_approved", ASCENDING)], name="role_approved"),
+        # Admin user listing, in signup order
+        IndexModel([("created_at", ASCENDING), ("user_id", ASCENDING)], name="created_user"),
+    ],
+    "user_sessions": [
+        IndexModel([("session_token", ASCENDING)], name="session_token_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+        # Mongo removes sessions once expires_at has passed
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "sample_packs": [
+        IndexModel([("pack_id", ASCENDING)], name="pack_id_unique", unique=True),
+        # Keyset sort orders; each ends in pack_id so pages are stable
+        IndexModel([("created_at", DESCENDING), ("pack_id", DESCENDING)], name="recent"),
+        IndexModel([("download_count", DESCENDING), ("pack_id", DESCENDING)], name="popular"),
+        IndexModel([("price", ASCENDING), ("pack_id", ASCENDING)], name="price"),
+        IndexModel([("duration", ASCENDING), ("pack_id", ASCENDING)], name="duration"),
+        IndexModel([("creator_id", ASCENDING), ("created_at", DESCENDING), ("pack_id", DESCENDING)], name="creator_recent"),
+        IndexModel([("category", ASCENDING), ("created_at", DESCENDING), ("pack_id", DESCENDING)], name="category_recent"),
+        IndexModel([("is_featured", ASCENDING), ("created_at", DESCENDING), ("pack_id", DESCENDING)], name="featured_recent"),
+        IndexModel([("is_sync_ready", ASCENDING), ("sync_type", ASCENDING)], name="sync_ready_type"),
+        IndexModel([("is_free", ASCENDING), ("created_at", DESCENDING), ("pack_id", DESCENDING)], name="free_recent"),
+        # Faceted browse filters
+        IndexModel([("key_normalized", ASCENDING), ("bpm", ASCENDING)], name="key_bpm"),
+        IndexModel([("category", ASCENDING), ("bpm", ASCENDING)], name="category_bpm"),
+        IndexModel([("bpm", ASCENDING), ("pack_id", ASCENDING)], name="bpm"),
+    ],
+    "purchases": [
+        IndexModel([("user_id", ASCENDING), ("pack_id", ASCENDING)], name="user_pack"),
+        IndexModel([("pack_id", ASCENDING)], name="pack_id"),
+        # One purchase per checkout session, however often its status is checked
+        IndexModel(
+            [("stripe_session_id", ASCENDING)], name="stripe_session_unique", unique=True,
+            partialFilterExpression={"stripe_session_id": {"$exists": True}}
+        ),
+    ],
+    "subscriptions": [
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)], name="user_status"),
+        IndexModel([("subscription_id", ASCENDING)], name="subscription_id_unique", unique=True),
+        IndexModel([("status", ASCENDING)], name="status"),
+    ],
+    "favorites": [
+        IndexModel([("user_id", ASCENDING), ("pack_id", ASCENDING)], name="user_pack_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING), ("favorite_id", ASCENDING)], name="user_created"),
+    ],
+    "collections": [
+        IndexModel([("collection_id", ASCENDING)], name="collection_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING), ("collection_id", ASCENDING)], name="user_created"),
+    ],
+    "downloads": [
+        # Makes replaying a download journal idempotent
+        IndexModel([("download_id", ASCENDING)], name="download_id_unique", unique=True),
+        IndexModel([("pack_id", ASCENDING)], name="pack_id"),
+        IndexModel([("user_id", ASCENDING)], name="user_id"),
+    ],
+    "payouts": [
+        IndexModel([("creator_id", ASCENDING), ("status", ASCENDING)], name="creator_status"),
+        IndexModel([("creator_id", ASCENDING), ("created_at", DESCENDING), ("payout_id", DESCENDING)], name="creator_recent"),
+        IndexModel([("payout_id", ASCENDING)], name="payout_id_unique", unique=True),
+    ],
+    "payment_transactions": [
+        IndexModel([("session_id", ASCENDING)], name="session_id_unique", unique=True),
+    ],
+    "creator_invitations": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    "blobs": [
+        IndexModel([("path", ASCENDING)], name="path_unique", unique=True),
+    ],
+    "ledger_entries": [
+        # Each purchase and payout is entered once
+        IndexModel([("type", ASCENDING), ("ref_id", ASCENDING)], name="type_ref_unique", unique=True),
+        IndexModel([("creator_id", ASCENDING), ("created_at", DESCENDING)], name="creator_recent"),
+    ],
+    "creator_balances": [
+        IndexModel([("creator_id", ASCENDING)], name="creator_id_unique", unique=True),
+    ],
+    "analytics_rollups": [
+        # One document per bucket; also serves the range queries
+        IndexModel(
+            [("scope", ASCENDING), ("scope_id", ASCENDING), ("granularity", ASCENDING), ("bucket", ASCENDING)],
+            name="bucket_unique", unique=True
+        ),
+    ],
+    "uploads": [
+        IndexModel([("upload_id", ASCENDING)], name="upload_id_unique", unique=True),
+        # Not a TTL index: expired uploads also have a file to remove
+        IndexModel([("expires_at", ASCENDING)], name="expires_at"),
+    ],
+}
+
+
+# Query shapes issued by the routes, with representative values. The
+# unfiltered admin invitation listing is a full scan by design and is left
+# out.
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"name": "session by token", "collection": "user_sessions", "filter": {"session_token": "tok"}},
+    {"name": "user by id", "collection": "users", "filter": {"user_id": "user_x"}},
+    {"name": "user by email", "collection": "users", "filter": {"email": "a@b.c"}},
+    {"name": "pending creators", "collection": "users", "filter": {"role": "creator", "creator_approved": False}},
+    {"name": "admin users page", "collection": "users", "filter": {}, "sort": [("created_at", ASCENDING), ("user_id", ASCENDING)]},
+    {"name": "pack by id", "collection": "sample_packs", "filter": {"pack_id": "pack_x"}},
+    {
+        "name": "packs by creator",
+        "collection": "sample_packs",
+        "filter": {"creator_id": "user_x"},
+        "sort": [("created_at", DESCENDING), ("pack_id", DESCENDING)]
+    },
+    {
+        "name": "packs by category",
+        "collection": "sample_packs",
+        "filter": {"category": "Drums"},
+        "sort": [("created_at", DESCENDING), ("pack_id", DESCENDING)]
+    },
+    {
+        "name": "newest packs page",
+        "collection": "sample_packs",
+        "filter": {"$or": [
+            {"created_at": {"$lt": datetime(2026, 1, 1)}},
+            {"created_at": datetime(2026, 1, 1), "pack_id": {"$lt": "pack_x"}}
+        ]},
+        "sort": [("created_at", DESCENDING), ("pack_id", DESCENDING)]
+    },
+    {"name": "most downloaded packs", "collection": "sample_packs", "filter": {}, "sort": [("download_count", DESCENDING), ("pack_id", DESCENDING)]},
+    {"name": "featured packs", "collection": "sample_packs", "filter": {"is_featured": True}},
+    {"name": "sync-ready packs", "collection": "sample_packs", "filter": {"is_sync_ready": True}},
+    {"name": "free packs", "collection": "sample_packs", "filter": {"is_free": True}},
+    {"name": "packs by bpm range", "collection": "sample_packs", "filter": {"bpm": {"$gte": 120, "$lte": 130}}},
+    {
+        "name": "packs by length",
+        "collection": "sample_packs",
+        "filter": {"duration": {"$gte": 5, "$lte": 30}},
+        "sort": [("duration", ASCENDING), ("pack_id", ASCENDING)]
+    },
+    {
+        "name": "packs by compatible keys",
+        "collection": "sample_packs",
+        "filter": {"key_normalized": {"$in": ["Am", "C"]}, "bpm": {"$gte": 90}}
+    },
+    {
+        "name": "packs by categories",
+        "collection": "sample_packs",
+        "filter": {"category": {"$in": ["Drums", "Bass"]}, "bpm": {"$lte": 140}}
+    },
+    {"name": "packs by ids", "collection": "sample_packs", "filter": {"pack_id": {"$in": ["pack_x", "pack_y"]}}},
+    {"name": "purchase by user+pack", "collection": "purchases", "filter": {"user_id": "user_x", "pack_id": "pack_x"}},
+    {"name": "purchase by session", "collection": "purchases", "filter": {"stripe_session_id": "cs_x"}},
+    {"name": "purchases by packs", "collection": "purchases", "filter": {"pack_id": {"$in": ["pack_x", "pack_y"]}}},
+    {"name": "active subscription", "collection": "subscriptions", "filter": {"user_id": "user_x", "status": "active"}},
+    {"name": "subscription by id", "collection": "subscriptions", "filter": {"subscription_id": "sub_x"}},
+    {"name": "active subscriptions", "collection": "subscriptions", "filter": {"status": "active"}},
+    {"name": "favorite by user+pack", "collection": "favorites", "filter": {"user_id": "user_x", "pack_id": "pack_x"}},
+    {
+        "name": "favorites page",
+        "collection": "favorites",
+        "filter": {"user_id": "user_x"},
+        "sort": [("created_at", ASCENDING), ("favorite_id", ASCENDING)]
+    },
+    {"name": "collection by id+owner", "collection": "collections", "filter": {"collection_id": "col_x", "user_id": "user_x"}},
+    {
+        "name": "collections page",
+        "collection": "collections",
+        "filter": {"user_id": "user_x"},
+        "sort": [("created_at", ASCENDING), ("collection_id", ASCENDING)]
+    },
+    {"name": "downloads by packs", "collection": "downloads", "filter": {"pack_id": {"$in": ["pack_x", "pack_y"]}}},
+    {
+        "name": "payouts by creator+status",
+        "collection": "payouts",
+        "filter": {"creator_id": "user_x", "status": {"$in": ["completed", "pending"]}}
+    },
+    {
+        "name": "payout history",
+        "collection": "payouts",
+        "filter": {"creator_id": "user_x"},
+        "sort": [("created_at", DESCENDING), ("payout_id", DESCENDING)]
+    },
+    {"name": "transaction by session", "collection": "payment_transactions", "filter": {"session_id": "cs_x"}},
+    {"name": "invitation by email", "collection": "creator_invitations", "filter": {"email": "a@b.c"}},
+    {
+        "name": "pending invitation by email",
+        "collection": "creator_invitations",
+        "filter": {"email": "a@b.c", "status": "pending"}
+    },
+    {"name": "blob by path", "collection": "blobs", "filter": {"path": "blobs/ab/abc.wav"}},
+    {"name": "ledger entry by ref", "collection": "ledger_entries", "filter": {"type": "payout", "ref_id": "payout_x"}},
+    {"name": "creator balance", "collection": "creator_balances", "filter": {"creator_id": "user_x"}},
+    {
+        "name": "analytics range",
+        "collection": "analytics_rollups",
+        "filter": {
+            "scope": "creator", "scope_id": "user_x", "granularity": "day",
+            "bucket": {"$gte": datetime(2026, 1, 1), "$lt": datetime(2026, 2, 1)}
+        }
+    },
+    {"name": "upload by id", "collection": "uploads", "filter": {"upload_id": "upl_x", "user_id": "user_x"}},
+    {"name": "expired uploads", "collection": "uploads", "filter": {"expires_at": {"$lte": datetime(2026, 1, 1)}}},
+]
+
+
+async def ensure_indexes(db) -> None:
+    """Create every index in INDEX_MANIFEST; existing identical indexes are a no-op.
+
+    Each index is created on its own so one conflict (e.g. a unique index over
+    data that already has duplicates) doesn't block the rest.
+    """
+    for collection_name, models in INDEX_MANIFEST.items():
+        collection = db[collection_name]
+        for model in models:
+            name = model.document["name"]
+            try:
+                await collection.create_indexes([model])
+            except OperationFailure as e:
+                logger.error(f"Failed to create index {collection_name}.{name}: {e}")
+    logger.info("Index bootstrap complete")
+
+
+def _plan_stages(plan: Optional[Dict[str, Any]]) -> List[str]:
+    """Flatten a winning plan tree into its stage names"""
+    if not plan:
+        return []
+    stages = [plan.get("stage", "")]
+    if "queryPlan" in plan:
+        stages += _plan_stages(plan["queryPlan"])
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return [s for s in stages if s]
+
+
+async def explain_query_shapes(db) -> List[Dict[str, Any]]:
+    """Run explain() for every entry in QUERY_SHAPES and report the winning plan"""
+    report = []
+    for shape in QUERY_SHAPES:
+        command = {"find": shape["collection"], "filter": shape["filter"]}
+        if shape.get("sort"):
+            command["sort"] = dict(shape["sort"])
+        explained = await db.command("explain", command, verbosity="queryPlanner")
+        winning_plan = explained.get("queryPlanner", {}).get("winningPlan", {})
+        stages = _plan_stages(winning_plan)
+        report.append({
+            "name": shape["name"],
+            "collection": shape["collection"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
@@ -0,0 +1,119 @@
+"""Upload ingest: stream multipart parts to disk off the event loop.
+
+Each part is copied in chunks in a worker thread, hashed (SHA-256) while
+it's copied, and written to a hidden temp file next to its destination.
+Nothing is visible under the final name until commit() moves it there
+with os.replace, which is atomic within a filesystem.
+"""
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+from typing import BinaryIO, List
+
+from starlette.datastructures import UploadFile
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, field: str, limit: int):
+        super().__init__(f"{field} exceeds the {limit // (1024 * 1024)} MB limit")
+        self.field = field
+        self.limit = limit
+
+
+class StagedFile:
+    """An upload written to a temp file, waiting to be committed or discarded"""
+
+    def __init__(self, temp_path: Path, final_path: Path, size: int, sha256: str):
+        self.temp_path = temp_path
+        self.final_path = final_path
+        self.size = size
+        self.sha256 = sha256
+
+    def commit(self) -> None:
+        os.replace(self.temp_path, self.final_path)
+
+    def discard(self) -> None:
+        self.temp_path.unlink(missing_ok=True)
+
+
+def _copy_hashed(src: BinaryIO, temp_path: Path, final_path: Path, field: str, max_bytes: int) -> StagedFile:
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as dst:
+            while True:
+                chunk = src.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(field, max_bytes)
+                digest.update(chunk)
+                dst.write(chunk)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return StagedFile(temp_path, final_path, size, digest.hexdigest())
+
+
+async def stage_upload(upload: UploadFile, final_path: Path, field: str, max_bytes: int) -> StagedFile:
+    """Copy an upload next to final_path, enforcing max_bytes.
+
+    The declared part size is checked before any copying, and the running
+    total while copying, so oversized parts fail as early as possible.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(field, max_bytes)
+    await upload.seek(0)
+    temp_path = final_path.with_name(f".{final_path.name}.{uuid.uuid4().hex[:8]}.part")
+    return await asyncio.to_thread(_copy_hashed, upload.file, temp_path, final_path, field, max_bytes)
+
+
+def _link_hashed(source: Path, temp_path: Path, final_path: Path, field: str, max_bytes: int) -> StagedFile:
+    size = source.stat().st_size
+    if size > max_bytes:
+        raise UploadTooLarge(field, max_bytes)
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+    digest = hashlib.sha256()
+    with open(temp_path, "rb") as f:
+        while True:
+            chunk = f.read(COPY_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return StagedFile(temp_path, final_path, size, digest.hexdigest())
+
+
+async def stage_file(source: Path, final_path: Path, field: str, max_bytes: int) -> StagedFile:
+    """Stage a file already on disk, such as a completed resumable upload.
+
+    It is hard-linked (copied across filesystems), so the source survives
+    if the staged file is discarded.
+    """
+    temp_path = final_path.with_name(f".{final_path.name}.{uuid.uuid4().hex[:8]}.part")
+    return await asyncio.to_thread(_link_hashed, source, temp_path, final_path, field, max_bytes)
+
+
+async def stage_all(*jobs) -> List[StagedFile]:
+    """Run stage_upload coroutines concurrently; on any failure discard the
+    parts that did succeed and re-raise the first error"""
+    results = await asyncio.gather(*jobs, return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if errors:
+        discard_all(r for r in results if isinstance(r, StagedFile))
+        raise errors[0]
+    return list(results)
+
+
+def discard_all(staged) -> None:
+    for s in staged:
+        if s is not None:
+            s.discard()
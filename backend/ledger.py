@@ -0,0 +1,208 @@
+"""Per-creator earnings ledger.
+
+ledger_entries is append-only, with one entry per sale (ref_id = the
+purchase_id) and per payout (ref_id = the payout_id), unique on
+(type, ref_id), so recording the same event twice is a no-op.
+creator_balances holds each creator's running totals, which are moved by
+$inc in the same step as the entry is written, so reading a balance is one
+document fetch. Amounts are whole cents.
+
+The two collections aren't updated in one transaction: a crash between
+the entry and its $inc leaves the balance behind its entries, which
+reconcile() reports and, with fix, repairs.
+"""
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+# Creators get 90% of each sale, the platform keeps the rest. The one place
+# the split is set: sales, analytics and platform stats all use it.
+CREATOR_SHARE = 0.9
+
+BALANCE_FIELDS = ("revenue_cents", "earned_cents", "paid_cents", "available_cents", "sales")
+
+
+def to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def creator_cut(gross_cents: int) -> int:
+    return int(round(gross_cents * CREATOR_SHARE))
+
+
+class InsufficientBalance(Exception):
+    def __init__(self, available_cents: int):
+        super().__init__(f"Available: ${available_cents / 100:.2f}")
+        self.available_cents = available_cents
+
+
+class CreatorLedger:
+    def __init__(self, db):
+        self.db = db
+        self.entries = db.ledger_entries
+        self.balances = db.creator_balances
+
+    async def _apply(self, creator_id: str, increments: Dict[str, int]) -> None:
+        await self.balances.update_one(
+            {"creator_id": creator_id},
+            {"$inc": increments, "$set": {"updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    async def _append(self, entry_type: str, ref_id: str, creator_id: str, amount_cents: int, **fields) -> bool:
+        """Write an entry; False if one for ref_id already exists"""
+        try:
+            await self.entries.insert_one({
+                "entry_id": f"le_{uuid.uuid4().hex[:12]}",
+                "type": entry_type,
+                "ref_id": ref_id,
+                "creator_id": creator_id,
+                "amount_cents": amount_cents,
+                "created_at": datetime.now(timezone.utc),
+                **fields
+            })
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def create_purchase(self, stripe_session_id: str, purchase: Dict) -> bool:
+        """Insert the purchase for a paid checkout session; False if the
+        session already has one, so a repeated status check records nothing"""
+        try:
+            result = await self.db.purchases.update_one(
+                {"stripe_session_id": stripe_session_id},
+                {"$setOnInsert": purchase},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return result.upserted_id is not None
+
+    async def record_sale(self, creator_id: str, purchase: Dict) -> bool:
+        """Credit a creator with a purchase of their pack; False if it already was"""
+        gross = to_cents(purchase["amount"])
+        earned = creator_cut(gross)
+        if not await self._append(
+            "sale", purchase["purchase_id"], creator_id, earned,
+            gross_cents=gross, pack_id=purchase["pack_id"]
+        ):
+            return False
+        await self._apply(creator_id, {
+            "revenue_cents": gross, "earned_cents": earned, "available_cents": earned, "sales": 1
+        })
+        return True
+
+    async def reserve_payout(self, creator_id: str, payout_id: str, amount_cents: int) -> None:
+        """Take a payout out of the available balance, or raise InsufficientBalance.
+
+        The check and the deduction are one conditional update, so
+        concurrent requests can't pay out the same money twice.
+        """
+        balance = await self.balances.find_one_and_update(
+            {"creator_id": creator_id, "available_cents": {"$gte": amount_cents}},
+            {"$inc": {"paid_cents": amount_cents, "available_cents": -amount_cents},
+             "$set": {"updated_at": datetime.now(timezone.utc)}},
+            projection={"available_cents": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if balance is None:
+            raise InsufficientBalance((await self.balance(creator_id))["available_cents"])
+        await self._append("payout", payout_id, creator_id, -amount_cents)
+
+    async def cancel_payout(self, creator_id: str, payout_id: str, amount_cents: int) -> None:
+        """Undo reserve_payout() for a payout that was never created"""
+        deleted = await self.entries.delete_one({"type": "payout", "ref_id": payout_id})
+        if deleted.deleted_count:
+            await self._apply(creator_id, {"paid_cents": -amount_cents, "available_cents": amount_cents})
+
+    async def balance(self, creator_id: str) -> Dict[str, int]:
+        doc = await self.balances.find_one({"creator_id": creator_id}, {"_id": 0})
+        return {field: (doc or {}).get(field, 0) for field in BALANCE_FIELDS}
+
+    async def reconcile(self, fix: bool = False) -> Dict:
+        """Check the ledger against purchases and payouts.
+
+        Reports purchases and payouts without an entry, entries whose source
+        document is gone, sales of packs that no longer exist (which can't
+        be attributed to a creator), and balances that don't match the sum
+        of their entries. With fix, missing entries are written and balances
+        are moved by the difference.
+        """
+        report = {
+            "missing_sales": 0, "missing_payouts": 0, "orphan_entries": 0,
+            "unattributed_purchases": 0, "balance_mismatches": []
+        }
+        recorded = defaultdict(set)
+        async for entry in self.entries.find({}, {"_id": 0, "type": 1, "ref_id": 1}):
+            recorded[entry["type"]].add(entry["ref_id"])
+
+        creators = {}
+        async for pack in self.db.sample_packs.find({}, {"_id": 0, "pack_id": 1, "creator_id": 1}):
+            creators[pack["pack_id"]] = pack.get("creator_id")
+        purchase_ids = set()
+        async for purchase in self.db.purchases.find({}, {"_id": 0, "purchase_id": 1, "pack_id": 1, "amount": 1}):
+            purchase_ids.add(purchase["purchase_id"])
+            if purchase["purchase_id"] in recorded["sale"]:
+                continue
+            creator_id = creators.get(purchase["pack_id"])
+            if not creator_id:
+                report["unattributed_purchases"] += 1
+                continue
+            report["missing_sales"] += 1
+            if fix:
+                await self.record_sale(creator_id, purchase)
+
+        payout_ids = set()
+        async for payout in self.db.payouts.find({}, {"_id": 0, "payout_id": 1, "creator_id": 1, "amount": 1}):
+            payout_ids.add(payout["payout_id"])
+            if payout["payout_id"] in recorded["payout"]:
+                continue
+            report["missing_payouts"] += 1
+            if fix:
+                amount = to_cents(payout["amount"])
+                if await self._append("payout", payout["payout_id"], payout["creator_id"], -amount):
+                    await self._apply(payout["creator_id"], {"paid_cents": amount, "available_cents": -amount})
+
+        report["orphan_entries"] = len(recorded["sale"] - purchase_ids) + len(recorded["payout"] - payout_ids)
+
+        # Balances against the sum of their entries
+        expected = defaultdict(lambda: dict.fromkeys(BALANCE_FIELDS, 0))
+        async for entry in self.entries.find({}, {"_id": 0, "type": 1, "creator_id": 1, "amount_cents": 1, "gross_cents": 1}):
+            totals = expected[entry["creator_id"]]
+            totals["available_cents"] += entry["amount_cents"]
+            if entry["type"] == "sale":
+                totals["revenue_cents"] += entry["gross_cents"]
+                totals["earned_cents"] += entry["amount_cents"]
+                totals["sales"] += 1
+            else:
+                totals["paid_cents"] -= entry["amount_cents"]
+        actual = {}
+        async for balance in self.balances.find({}, {"_id": 0}):
+            actual[balance["creator_id"]] = balance
+        for creator_id in expected.keys() | actual.keys():
+            have = actual.get(creator_id, {})
+            delta = {
+                field: expected[creator_id][field] - have.get(field, 0)
+                for field in BALANCE_FIELDS
+                if expected[creator_id][field] != have.get(field, 0)
+            }
+            if delta:
+                report["balance_mismatches"].append({"creator_id": creator_id, "delta": delta})
+                if fix:
+                    await self._apply(creator_id, delta)
+        return report
+
+
+def balance_summary(balance: Dict[str, int]) -> Dict[str, float]:
+    """A balance in dollars, as the creator endpoints report it"""
+    return {
+        "total_revenue": balance["revenue_cents"] / 100,
+        "total_earned": balance["earned_cents"] / 100,
+        "total_paid": balance["paid_cents"] / 100,
+        "available_balance": balance["available_cents"] / 100,
+        "total_purchases": balance["sales"],
+    }
@@ -0,0 +1,352 @@
+"""SoundDrops maintenance commands.
+
+    cd backend && python manage.py <command> [options]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from catalog import bump_version_all
+from blobstore import PACK_FILE_PATH_FIELDS, BlobStore, file_sha256, is_blob_path, pack_file_paths
+from audio_analysis import MEMBER_AUDIO_FIELDS, analyze_pack_file, generate_peaks, pack_audio_key, peaks_key
+from storage import local_copy, storage_from_env
+from zip_manifest import member_updates, read_zip_manifest
+from indexes import ensure_indexes, explain_query_shapes
+from ledger import CreatorLedger
+from analytics import Analytics
+from music_keys import normalize_key
+
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+
+def get_db():
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    return client[os.environ['DB_NAME']]
+
+
+async def cmd_ensure_indexes(db, args) -> int:
+    await ensure_indexes(db)
+    return 0
+
+
+async def cmd_explain_queries(db, args) -> int:
+    """Print the winning plan of every route query shape; exit 1 on any COLLSCAN"""
+    report = await explain_query_shapes(db)
+    for entry in report:
+        status = "COLLSCAN" if entry["collscan"] else "ok"
+        print(f"{status:<9} {entry['collection']:<22} {entry['name']:<30} {' <- '.join(entry['stages'])}")
+    collscans = [e for e in report if e["collscan"]]
+    print(f"\n{len(report)} query shapes, {len(collscans)} collection scan(s)")
+    return 1 if collscans else 0
+
+
+async def cmd_backfill_key_normalized(db, args) -> int:
+    """Fill key_normalized for packs that predate it"""
+    updated = 0
+    unrecognized = 0
+    async for pack in db.sample_packs.find({"key_normalized": {"$exists": False}}, {"_id": 0, "pack_id": 1, "key": 1}):
+        normalized = normalize_key(pack.get("key"))
+        if pack.get("key") and not normalized:
+            unrecognized += 1
+        await db.sample_packs.update_one({"pack_id": pack["pack_id"]}, {"$set": {"key_normalized": normalized}})
+        updated += 1
+    if updated:
+        # Key filters and facets read key_normalized: make API workers drop cached pages
+        await bump_version_all(db.catalog_meta)
+    print(f"Updated {updated} packs ({unrecognized} with unrecognized keys)")
+    return 0
+
+
+async def run_pack_jobs(packs, prepare, workers: int, storage) -> dict:
+    """Run one worker-process job per pack, keeping every worker busy.
+
+    prepare(pack) returns (key, func, args, on_done) or None to skip the
+    pack. The stored file at key is fetched to a local path (downloaded
+    from remote storage) and the job runs func(path, *args); on_done(result)
+    is awaited with the job's result. Packs whose file is missing are skipped.
+    """
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(workers * 2)
+    counts = {"done": 0, "skipped": 0, "failed": 0}
+
+    async def run(pack, executor):
+        job = prepare(pack)
+        if job is None:
+            counts["skipped"] += 1
+            return
+        key, func, func_args, on_done = job
+        async with semaphore:
+            try:
+                if not await asyncio.to_thread(storage.exists, key):
+                    counts["skipped"] += 1
+                    return
+                async with local_copy(storage, key) as path:
+                    result = await loop.run_in_executor(executor, func, str(path), *func_args)
+            except Exception as e:
+                print(f"{pack['pack_id']}: {e}", file=sys.stderr)
+                counts["failed"] += 1
+                return
+        await on_done(result)
+        counts["done"] += 1
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+        await asyncio.gather(*(run(pack, executor) for pack in packs))
+    return counts
+
+
+PACK_FILE_FIELDS = {"_id": 0, "pack_id": 1, "file_type": 1, "audio_file_path": 1, "preview_audio_path": 1}
+
+
+async def cmd_backfill_peaks(db, args) -> int:
+    """Compute waveform peaks for packs that don't have them (all packs with --force)"""
+    storage = storage_from_env(ROOT_DIR)
+    query = {} if args.force else {"peaks_path": {"$exists": False}}
+    packs = await db.sample_packs.find(query, PACK_FILE_FIELDS).to_list(None)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        def prepare(pack):
+            source_key = pack_audio_key(pack)
+            if not source_key:
+                return None
+            key = peaks_key(pack["pack_id"])
+            peaks_file = Path(tmp) / Path(key).name
+
+            async def on_done(_result):
+                # Stored under the key the peaks endpoint serves
+                await asyncio.to_thread(storage.put_file, key, peaks_file)
+                await db.sample_packs.update_one({"pack_id": pack["pack_id"]}, {"$set": {"peaks_path": key}})
+            return source_key, generate_peaks, (str(peaks_file),), on_done
+
+        counts = await run_pack_jobs(packs, prepare, args.workers, storage)
+    print(f"Peaks written for {counts['done']} packs ({counts['skipped']} without audio, {counts['failed']} failed)")
+    return 1 if counts["failed"] else 0
+
+
+async def cmd_backfill_audio_metadata(db, args) -> int:
+    """Analyze the main file of packs missing duration and audio metadata"""
+    query = {} if args.force else {"audio_metadata": {"$exists": False}}
+    packs = await db.sample_packs.find(query, PACK_FILE_FIELDS).to_list(None)
+
+    def prepare(pack):
+        if not pack.get("audio_file_path"):
+            return None
+
+        async def on_done(result):
+            fields = {
+                "duration": result["duration"],
+                "audio_metadata": {**result["audio_metadata"], "analyzed_at": datetime.now(timezone.utc)},
+            }
+            if "members" in result:
+                # Per-member duration and loudness, as uploads get them
+                doc = await db.sample_packs.find_one({"pack_id": pack["pack_id"]}, {"_id": 0, "zip_manifest.name": 1})
+                fields.update(member_updates((doc or {}).get("zip_manifest") or [], result["members"], MEMBER_AUDIO_FIELDS))
+            await db.sample_packs.update_one({"pack_id": pack["pack_id"]}, {"$set": fields})
+        return pack["audio_file_path"], analyze_pack_file, (), on_done
+
+    counts = await run_pack_jobs(packs, prepare, args.workers, storage_from_env(ROOT_DIR))
+    if counts["done"]:
+        # Listings and sorts depend on duration: make API workers drop cached pages
+        await bump_version_all(db.catalog_meta)
+    print(f"Analyzed {counts['done']} packs ({counts['skipped']} with missing files, {counts['failed']} failed)")
+    return 1 if counts["failed"] else 0
+
+
+async def cmd_backfill_zip_manifests(db, args) -> int:
+    """Index the central directory of ZIP packs that have no manifest yet"""
+    query = {"file_type": "zip"}
+    if not args.force:
+        query["zip_manifest"] = {"$exists": False}
+    packs = await db.sample_packs.find(query, PACK_FILE_FIELDS).to_list(None)
+
+    def prepare(pack):
+        if not pack.get("audio_file_path"):
+            return None
+
+        async def on_done(manifest):
+            await db.sample_packs.update_one(
+                {"pack_id": pack["pack_id"]},
+                {"$set": {
+                    "zip_manifest": manifest["entries"],
+                    "zip_file_count": manifest["file_count"],
+                    "zip_total_size": manifest["total_size"],
+                    "zip_manifest_truncated": manifest["truncated"],
+                }}
+            )
+        return pack["audio_file_path"], read_zip_manifest, (), on_done
+
+    counts = await run_pack_jobs(packs, prepare, args.workers, storage_from_env(ROOT_DIR))
+    if counts["done"]:
+        # /contents ETags and cached packs depend on the manifest
+        await bump_version_all(db.catalog_meta)
+    print(f"Indexed {counts['done']} ZIP packs ({counts['skipped']} with missing files, {counts['failed']} failed)")
+    return 1 if counts["failed"] else 0
+
+
+def format_bytes(n: int) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}" if unit != "B" else f"{n} B"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+async def cmd_migrate_blobs(db, args) -> int:
+    """Move pack files from audio_files/, zip_files/, covers/ and previews/ into
+    the content-addressed blob store, deduplicating identical content"""
+    storage = storage_from_env(ROOT_DIR)
+    store = BlobStore(storage, db.blobs, ROOT_DIR / "blobs")
+    fields = {"_id": 0, "pack_id": 1, **{field: 1 for field in PACK_FILE_PATH_FIELDS}}
+    packs = await db.sample_packs.find({}, fields).to_list(None)
+    counts = {"packs": 0, "files": 0, "deduplicated": 0, "missing": 0, "failed": 0}
+    reclaimed = 0
+    seen = {}
+    legacy_files = []
+
+    for pack in packs:
+        legacy = [path for path in pack_file_paths(pack) if not is_blob_path(path)]
+        if not legacy:
+            continue
+        mapping = {}
+        sizes = {}
+        try:
+            for path in legacy:
+                source = ROOT_DIR / path
+                if not source.exists():
+                    counts["missing"] += 1
+                    continue
+                if args.dry_run:
+                    sha256 = await asyncio.to_thread(file_sha256, source)
+                    size = source.stat().st_size
+                    blob = store.blob_path(sha256, source.suffix)
+                    deduplicated = blob in seen or await asyncio.to_thread(storage.exists, blob)
+                    seen[blob] = True
+                else:
+                    blob, size, deduplicated = await store.put_file(source, source.suffix)
+                mapping[path] = blob
+                sizes[path] = (size, deduplicated)
+        except Exception as e:
+            print(f"{pack['pack_id']}: {e}", file=sys.stderr)
+            counts["failed"] += 1
+            if not args.dry_run:
+                for blob in set(mapping.values()):
+                    await store.release(blob)
+            continue
+        if not mapping:
+            continue
+
+        if not args.dry_run:
+            # A pack holds one reference per distinct blob, even if two of its
+            # files turned out to be identical
+            for blob, n in Counter(mapping.values()).items():
+                for _ in range(n - 1):
+                    await store.release(blob)
+            await db.sample_packs.update_one(
+                {"pack_id": pack["pack_id"]},
+                {"$set": {field: mapping[pack[field]] for field in PACK_FILE_PATH_FIELDS if pack.get(field) in mapping}}
+            )
+            legacy_files.extend(ROOT_DIR / path for path in mapping)
+        counts["packs"] += 1
+        counts["files"] += len(mapping)
+        for size, deduplicated in sizes.values():
+            if deduplicated:
+                counts["deduplicated"] += 1
+                reclaimed += size
+
+    if legacy_files:
+        # Let API workers see the new paths (they poll the catalog version)
+        # before the old files disappear
+        await bump_version_all(db.catalog_meta)
+        await asyncio.sleep(args.grace_seconds)
+        for path in legacy_files:
+            path.unlink(missing_ok=True)
+
+    verb = "Would reclaim" if args.dry_run else "Reclaimed"
+    print(
+        f"{'Checked' if args.dry_run else 'Migrated'} {counts['files']} files from {counts['packs']} packs: "
+        f"{counts['deduplicated']} duplicates, {counts['missing']} missing, {counts['failed']} packs failed"
+    )
+    print(f"{verb} {format_bytes(reclaimed)}")
+    return 1 if counts["failed"] else 0
+
+
+def add_migrate_blobs_args(parser):
+    parser.add_argument("--dry-run", action="store_true", help="Only report how much space would be reclaimed")
+    parser.add_argument("--grace-seconds", type=float, default=10, help="Wait before deleting the old files")
+
+
+async def cmd_reconcile_ledger(db, args) -> int:
+    """Compare creator balances with purchases and payouts; exit 1 on any
+    discrepancy. The first --fix run builds the ledger for existing data."""
+    report = await CreatorLedger(db).reconcile(fix=args.fix)
+    mismatches = report["balance_mismatches"]
+    for mismatch in mismatches[:50]:
+        print(f"{mismatch['creator_id']}: {mismatch['delta']}")
+    if len(mismatches) > 50:
+        print(f"... and {len(mismatches) - 50} more")
+    print(
+        f"{report['missing_sales']} purchases and {report['missing_payouts']} payouts without entries, "
+        f"{report['orphan_entries']} orphan entries, {report['unattributed_purchases']} purchases of deleted packs, "
+        f"{len(mismatches)} balance mismatches" + (" (fixed)" if args.fix else "")
+    )
+    found = report["missing_sales"] or report["missing_payouts"] or report["orphan_entries"] or mismatches
+    return 1 if found and not args.fix else 0
+
+
+async def cmd_backfill_analytics(db, args) -> int:
+    """Rebuild the hourly and daily rollups from the downloads and purchases
+    collections. Buckets are overwritten, so it can be rerun; run it while
+    traffic is low, as events landing during the rebuild can be lost from
+    their bucket."""
+    counts = await Analytics(db.analytics_rollups, db.sample_packs).rebuild(db.downloads, db.purchases)
+    print(f"Wrote {counts['buckets']} buckets from {counts['downloads']} downloads and {counts['purchases']} purchases")
+    return 0
+
+
+def add_reconcile_ledger_args(parser):
+    parser.add_argument("--fix", action="store_true", help="Write missing entries and correct balances")
+
+
+def add_pack_job_args(parser):
+    parser.add_argument("--force", action="store_true", help="Reprocess packs that were already processed")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="Analysis worker processes")
+
+
+COMMANDS = {
+    "ensure-indexes": (cmd_ensure_indexes, "Create all indexes from the manifest"),
+    "explain-queries": (cmd_explain_queries, "Explain every route query shape and flag COLLSCANs"),
+    "backfill-key-normalized": (cmd_backfill_key_normalized, "Fill key_normalized on existing packs"),
+    "backfill-peaks": (cmd_backfill_peaks, "Compute waveform peaks for existing packs", add_pack_job_args),
+    "backfill-audio-metadata": (cmd_backfill_audio_metadata, "Analyze duration, format and loudness of existing packs", add_pack_job_args),
+    "backfill-zip-manifests": (cmd_backfill_zip_manifests, "Index the contents of existing ZIP packs", add_pack_job_args),
+    "migrate-blobs": (cmd_migrate_blobs, "Move pack files into the deduplicating blob store", add_migrate_blobs_args),
+    "backfill-analytics": (cmd_backfill_analytics, "Build analytics rollups from download and purchase history"),
+    "reconcile-ledger": (cmd_reconcile_ledger, "Verify creator balances against purchases and payouts", add_reconcile_ledger_args),
+}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="SoundDrops maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text, *add_args) in COMMANDS.items():
+        command_parser = subparsers.add_parser(name, help=help_text)
+        for register in add_args:
+            register(command_parser)
+    args = parser.parse_args()
+
+    handler = COMMANDS[args.command][0]
+    return asyncio.run(handler(get_db(), args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
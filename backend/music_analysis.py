@@ -0,0 +1,216 @@
+"""Tempo and key estimation for uploaded loops.
+
+Tempo: spectral-flux onset envelope, autocorrelation, and a log-normal
+prior around 120 BPM to settle octave errors. Key: a chroma profile
+correlated against the 24 rotated Krumhansl-Kessler key profiles.
+Both come with a 0-1 confidence; callers decide what's confident enough.
+
+Like audio_analysis, everything here runs in the media worker processes.
+Only the first ANALYSIS_SECONDS of each file are decoded, so the cost per
+file is bounded no matter how long it is.
+"""
+import os
+import shutil
+import tempfile
+import zipfile
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from audio_analysis import AudioDecodeError, decode_audio, is_audio_member
+from audio_headers import AudioHeaderError
+from music_keys import key_name
+
+ANALYSIS_SECONDS = 30.0
+ANALYSIS_SAMPLE_RATE = 22050
+# Shorter files are one-shots: no meaningful tempo
+MIN_TEMPO_SECONDS = 3.0
+
+MIN_BPM = 60
+MAX_BPM = 200
+TEMPO_PRIOR_BPM = 120.0
+TEMPO_PRIOR_OCTAVES = 1.0
+
+# Key-profile correlations closer than this to the runner-up are ambiguous
+KEY_MARGIN = 0.1
+CHROMA_MIN_HZ = 65.0
+CHROMA_MAX_HZ = 2100.0
+
+KK_MAJOR = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+KK_MINOR = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+
+def _next_pow2(n: float) -> int:
+    return 1 << max(0, int(np.ceil(np.log2(max(n, 1)))))
+
+
+def _magnitude_spectrogram(y: np.ndarray, n_fft: int, hop: int) -> np.ndarray:
+    """|STFT| as (frames, bins) with a Hann window"""
+    if len(y) < n_fft:
+        y = np.pad(y, (0, n_fft - len(y)))
+    frames = np.lib.stride_tricks.sliding_window_view(y, n_fft)[::hop]
+    return np.abs(np.fft.rfft(frames * np.hanning(n_fft), axis=1))
+
+
+# ============================================
+# Tempo
+# ============================================
+
+def onset_envelope(y: np.ndarray, rate: int) -> Tuple[np.ndarray, float]:
+    """Spectral flux of the log-compressed spectrogram; returns (envelope, frames per second)"""
+    n_fft = _next_pow2(rate * 0.046)
+    hop = n_fft // 4
+    spectrum = np.log1p(1000.0 * _magnitude_spectrogram(y, n_fft, hop))
+    flux = np.maximum(0.0, np.diff(spectrum, axis=0)).mean(axis=1)
+    frame_rate = rate / hop
+    # Remove the slowly varying level so the autocorrelation sees onsets only
+    window = max(1, int(frame_rate * 0.5))
+    local_mean = np.convolve(flux, np.ones(window) / window, mode="same")
+    return np.maximum(0.0, flux - local_mean), frame_rate
+
+
+def estimate_tempo(y: np.ndarray, rate: int) -> Tuple[Optional[float], float]:
+    """(BPM, confidence) from the autocorrelation of the onset envelope"""
+    if len(y) < rate * MIN_TEMPO_SECONDS:
+        return None, 0.0
+    envelope, frame_rate = onset_envelope(y, rate)
+    envelope = envelope - envelope.mean()
+    n = len(envelope)
+    autocorr = np.fft.irfft(np.abs(np.fft.rfft(envelope, 2 * n)) ** 2)[:n]
+    if autocorr[0] <= 0:
+        return None, 0.0
+    autocorr /= autocorr[0]
+
+    min_lag = max(1, int(np.floor(frame_rate * 60 / MAX_BPM)))
+    max_lag = min(n - 2, int(np.ceil(frame_rate * 60 / MIN_BPM)))
+    if max_lag <= min_lag:
+        return None, 0.0
+    lags = np.arange(min_lag, max_lag + 1)
+    prior = np.exp(-0.5 * (np.log2(60 * frame_rate / lags / TEMPO_PRIOR_BPM) / TEMPO_PRIOR_OCTAVES) ** 2)
+    best = lags[np.argmax(autocorr[lags] * prior)]
+
+    # Parabolic interpolation around the peak for sub-frame lag precision
+    left, mid, right = autocorr[best - 1], autocorr[best], autocorr[best + 1]
+    denominator = left - 2 * mid + right
+    offset = 0.5 * (left - right) / denominator if denominator < 0 else 0.0
+    bpm = 60 * frame_rate / (best + offset)
+
+    # How much the beat period stands out from the rest of the tempo range
+    baseline = float(np.mean(autocorr[lags]))
+    confidence = (mid - baseline) / (1 - baseline) if baseline < 1 else 0.0
+    return round(float(bpm), 1), round(float(np.clip(confidence, 0.0, 1.0)), 3)
+
+
+# ============================================
+# Key
+# ============================================
+
+def chroma_profile(y: np.ndarray, rate: int) -> Optional[np.ndarray]:
+    """Average per-frame-normalized energy of each pitch class; None for silence"""
+    n_fft = _next_pow2(rate * 0.37)
+    spectrum = _magnitude_spectrogram(y, n_fft, n_fft // 2) ** 2
+    freqs = np.fft.rfftfreq(n_fft, 1 / rate)
+    band = (freqs >= CHROMA_MIN_HZ) & (freqs <= CHROMA_MAX_HZ)
+    pitch_classes = (np.round(12 * np.log2(freqs[band] / 440.0)).astype(int) + 9) % 12
+    mapping = np.zeros((band.sum(), 12))
+    mapping[np.arange(band.sum()), pitch_classes] = 1.0
+    chroma = spectrum[:, band] @ mapping
+    peaks = chroma.max(axis=1)
+    voiced = peaks > peaks.max() * 1e-3 if peaks.size and peaks.max() > 0 else np.zeros(0, dtype=bool)
+    if not voiced.any():
+        return None
+    return (chroma[voiced] / peaks[voiced, None]).mean(axis=0)
+
+
+def _zscore(values: np.ndarray) -> np.ndarray:
+    std = values.std()
+    return (values - values.mean()) / std if std > 0 else np.zeros_like(values)
+
+
+def estimate_key(y: np.ndarray, rate: int) -> Tuple[Optional[str], float]:
+    """(key in music_keys canonical spelling, confidence)"""
+    chroma = chroma_profile(y, rate)
+    if chroma is None:
+        return None, 0.0
+    z = _zscore(chroma)
+    candidates = []
+    for tonic in range(12):
+        for is_minor, profile in ((False, KK_MAJOR), (True, KK_MINOR)):
+            correlation = float(z @ _zscore(np.roll(profile, tonic)) / 12)
+            candidates.append((correlation, tonic, is_minor))
+    candidates.sort(reverse=True)
+    (best, tonic, is_minor), (runner_up, _, _) = candidates[0], candidates[1]
+    confidence = max(best, 0.0) * min(1.0, (best - runner_up) / KEY_MARGIN)
+    return key_name(tonic, is_minor), round(confidence, 3)
+
+
+# ============================================
+# Files, ZIP batches and pack-level votes
+# ============================================
+
+def analyze_music_file(path: Path) -> Dict:
+    y, rate = decode_audio(Path(path), ANALYSIS_SAMPLE_RATE, max_seconds=ANALYSIS_SECONDS)
+    bpm, bpm_confidence = estimate_tempo(y, rate)
+    key, key_confidence = estimate_key(y, rate)
+    return {"bpm": bpm, "bpm_confidence": bpm_confidence, "key": key, "key_confidence": key_confidence}
+
+
+def audio_member_names(zip_path: str) -> List[str]:
+    with zipfile.ZipFile(zip_path) as zf:
+        return [info.filename for info in zf.infolist() if not info.is_dir() and is_audio_member(info.filename)]
+
+
+def analyze_music_batch(zip_path: str, names: Sequence[str]) -> List[Dict]:
+    """Analyze one batch of ZIP members (one worker-process task per batch)"""
+    results = []
+    with zipfile.ZipFile(zip_path) as zf, tempfile.TemporaryDirectory() as tmp:
+        for name in names:
+            member_path = Path(tmp) / f"member{os.path.splitext(name)[1].lower()}"
+            try:
+                with zf.open(name) as src, open(member_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst, 1 << 20)
+                result = analyze_music_file(member_path)
+            except (AudioDecodeError, AudioHeaderError, RuntimeError, NotImplementedError, KeyError, zipfile.BadZipFile) as e:
+                result = {"error": str(e)}
+            finally:
+                member_path.unlink(missing_ok=True)
+            result["name"] = name
+            results.append(result)
+    return results
+
+
+def batched(items: Sequence, size: int) -> List[Sequence]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def sample_members(names: List[str], limit: int) -> List[str]:
+    """At most `limit` names, spread evenly across the archive"""
+    if len(names) <= limit:
+        return names
+    step = len(names) / limit
+    return [names[int(i * step)] for i in range(limit)]
+
+
+def _vote(results: List[Dict], field: str, normalize) -> Tuple[Optional[object], float]:
+    """Confidence-weighted vote; the pack confidence is the winner's share of all estimates"""
+    weights: Dict[object, float] = defaultdict(float)
+    estimates = 0
+    for result in results:
+        value = result.get(field)
+        if value is None:
+            continue
+        estimates += 1
+        weights[normalize(value)] += result.get(f"{field}_confidence", 0.0)
+    if not weights:
+        return None, 0.0
+    winner = max(weights, key=weights.get)
+    return winner, round(weights[winner] / estimates, 3)
+
+
+def combine_results(results: List[Dict]) -> Dict:
+    """Pack-level tempo and key from per-member estimates (loops in a pack usually share both)"""
+    bpm, bpm_confidence = _vote(results, "bpm", lambda value: int(round(value)))
+    key, key_confidence = _vote(results, "key", lambda value: value)
+    return {"bpm": bpm, "bpm_confidence": bpm_confidence, "key": key, "key_confidence": key_confidence}
@@ -0,0 +1,59 @@
+"""Musical key parsing and compatibility.
+
+Creators type keys free-form ("C#m", "Db minor", "A Maj", "bbm"). Packs also
+store a canonical spelling in `key_normalized` so keys can be filtered and
+faceted: sharps only, with an "m" suffix for minor ("C#m", "F", "A#m").
+"""
+import re
+from typing import List, Optional, Tuple
+
+PITCH_CLASSES = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+_NATURALS = {"C": 0, "D": 2, "E": 4, "F": 5, "G": 7, "A": 9, "B": 11}
+
+_KEY_RE = re.compile(
+    r"^\s*([A-G])\s*(#|sharp|b|flat)?\s*(m|min|minor|maj|major)?\s*$", re.IGNORECASE
+)
+
+
+def parse_key(text: Optional[str]) -> Optional[Tuple[int, bool]]:
+    """Parse a free-form key into (pitch class, is_minor); None if unrecognized"""
+    if not text:
+        return None
+    cleaned = text.replace("♯", "#").replace("♭", "b").strip()
+    match = _KEY_RE.match(cleaned)
+    if not match:
+        return None
+    letter, accidental, mode = match.groups()
+    pitch = _NATURALS[letter.upper()]
+    accidental = (accidental or "").lower()
+    if accidental in ("#", "sharp"):
+        pitch += 1
+    elif accidental in ("b", "flat"):
+        pitch -= 1
+    # A bare lowercase "m" means minor; a bare "M" means major
+    is_minor = mode is not None and (mode == "m" or mode.lower() in ("min", "minor"))
+    return pitch % 12, is_minor
+
+
+def key_name(pitch: int, is_minor: bool) -> str:
+    return PITCH_CLASSES[pitch % 12] + ("m" if is_minor else "")
+
+
+def normalize_key(text: Optional[str]) -> Optional[str]:
+    parsed = parse_key(text)
+    return key_name(*parsed) if parsed else None
+
+
+def relative_key(pitch: int, is_minor: bool) -> Tuple[int, bool]:
+    """Relative minor of a major key is 3 semitones down, and vice versa"""
+    if is_minor:
+        return (pitch + 3) % 12, False
+    return (pitch - 3) % 12, True
+
+
+def compatible_keys(text: Optional[str]) -> List[str]:
+    """The key itself plus its relative major/minor, in canonical spelling"""
+    parsed = parse_key(text)
+    if not parsed:
+        return []
+    return [key_name(*parsed), key_name(*relative_key(*parsed))]
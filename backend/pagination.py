@@ -0,0 +1,119 @@
+"""Keyset (cursor) pagination helpers.
+
+A cursor is an opaque, URL-safe token holding the sort name and the sort-key
+values of the last document on the previous page. The next page starts
+strictly after that position, so pages don't shift when documents are
+inserted and the cost doesn't grow with the page number.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+SortSpec = List[Tuple[str, int]]
+
+# Catalog sort orders; every spec ends in pack_id so the order is total
+PACK_SORTS: Dict[str, SortSpec] = {
+    "newest": [("created_at", -1), ("pack_id", -1)],
+    "oldest": [("created_at", 1), ("pack_id", 1)],
+    "downloads": [("download_count", -1), ("pack_id", -1)],
+    "price_asc": [("price", 1), ("pack_id", 1)],
+    "price_desc": [("price", -1), ("pack_id", -1)],
+    "shortest": [("duration", 1), ("pack_id", 1)],
+    "longest": [("duration", -1), ("pack_id", -1)],
+}
+
+# Per-user listings, in the order they were previously returned
+FAVORITES_SORT: SortSpec = [("created_at", 1), ("favorite_id", 1)]
+COLLECTIONS_SORT: SortSpec = [("created_at", 1), ("collection_id", 1)]
+PAYOUTS_SORT: SortSpec = [("created_at", -1), ("payout_id", -1)]
+USERS_SORT: SortSpec = [("created_at", 1), ("user_id", 1)]
+
+MAX_PAGE_SIZE = 200
+
+
+def clamp_limit(limit: int, default: int) -> int:
+    if limit is None or limit <= 0:
+        return default
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$date" in value:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(sort_name: str, values: List[Any]) -> str:
+    payload = json.dumps({"s": sort_name, "v": [_encode_value(v) for v in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_name: str) -> List[Any]:
+    """Decode a cursor issued for sort_name; raises ValueError if it's invalid"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = [_decode_value(v) for v in payload["v"]]
+        issued_for = payload["s"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if issued_for != sort_name:
+        raise ValueError(f"Cursor was issued for sort '{issued_for}'")
+    return values
+
+
+def decode_position_cursor(cursor: str, sort_name: str) -> int:
+    """Decode a cursor holding one position in a list (relevance order);
+    raises ValueError unless that is a single non-negative integer"""
+    values = decode_cursor(cursor, sort_name)
+    if len(values) != 1 or type(values[0]) is not int or values[0] < 0:
+        raise ValueError("Invalid cursor")
+    return values[0]
+
+
+def cursor_for(doc: Dict[str, Any], sort_name: str, sort_spec: SortSpec) -> str:
+    return encode_cursor(sort_name, [doc.get(field) for field, _ in sort_spec])
+
+
+def keyset_filter(sort_spec: SortSpec, values: List[Any]) -> Dict[str, Any]:
+    """Filter matching documents strictly after `values` in sort_spec order.
+
+    For keys (a, b) this is: a beyond v_a, or a == v_a and b beyond v_b.
+    """
+    if len(values) != len(sort_spec):
+        raise ValueError("Cursor does not match sort order")
+    clauses = []
+    for i, (field, direction) in enumerate(sort_spec):
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort_spec[:i])}
+        clause[field] = {"$lt" if direction < 0 else "$gt": values[i]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    sort_name: str,
+    sort_spec: SortSpec,
+    limit: int,
+    cursor: Optional[str] = None,
+    projection: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Fetch one page; returns (docs, next_cursor or None on the last page)"""
+    if cursor:
+        after = keyset_filter(sort_spec, decode_cursor(cursor, sort_name))
+        query = {"$and": [query, after]} if query else after
+
+    docs = await collection.find(query, projection or {"_id": 0}).sort(sort_spec).limit(limit + 1).to_list(limit + 1)
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = cursor_for(docs[-1], sort_name, sort_spec)
+    return docs, next_cursor
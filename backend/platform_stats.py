@@ -0,0 +1,65 @@
+"""Platform-wide counters for the admin dashboard.
+
+One document in platform_stats holds the counts the dashboard shows. Write
+paths move it with $inc as they change users, packs, purchases and
+subscriptions, so reading it is one fetch. A periodic recompute() counts
+everything from the source collections again and overwrites the counters,
+correcting any drift (a crash between a write and its $inc, or changes
+made outside the API).
+"""
+from datetime import datetime, timezone
+from typing import Dict
+
+from ledger import CREATOR_SHARE
+
+STATS_ID = "platform"
+
+COUNTERS = ("users", "creators", "packs", "purchases", "active_subscriptions", "revenue_cents", "creator_earnings_cents")
+
+
+class PlatformStats:
+    def __init__(self, db):
+        self.db = db
+        self.collection = db.platform_stats
+
+    async def increment(self, **counters: int) -> None:
+        await self.collection.update_one(
+            {"_id": STATS_ID},
+            {"$inc": counters, "$set": {"updated_at": datetime.now(timezone.utc)}},
+            upsert=True
+        )
+
+    async def recompute(self) -> Dict:
+        """Count everything from scratch and store it; returns the new snapshot"""
+        # Same rounding as the ledger: whole cents per purchase, then the creator's cut
+        gross = {"$round": [{"$multiply": ["$amount", 100]}, 0]}
+        revenue = await self.db.purchases.aggregate([
+            {"$group": {
+                "_id": None,
+                "count": {"$sum": 1},
+                "revenue_cents": {"$sum": gross},
+                "creator_earnings_cents": {"$sum": {"$round": [{"$multiply": [gross, CREATOR_SHARE]}, 0]}}
+            }}
+        ]).to_list(1)
+        revenue = revenue[0] if revenue else {"count": 0, "revenue_cents": 0, "creator_earnings_cents": 0}
+        now = datetime.now(timezone.utc)
+        snapshot = {
+            "users": await self.db.users.count_documents({}),
+            "creators": await self.db.users.count_documents({"role": "creator", "creator_approved": True}),
+            "packs": await self.db.sample_packs.count_documents({}),
+            "purchases": revenue["count"],
+            "active_subscriptions": await self.db.subscriptions.count_documents({"status": "active"}),
+            "revenue_cents": int(revenue["revenue_cents"]),
+            "creator_earnings_cents": int(revenue["creator_earnings_cents"]),
+            "updated_at": now,
+            "recomputed_at": now,
+        }
+        await self.collection.update_one({"_id": STATS_ID}, {"$set": snapshot}, upsert=True)
+        return snapshot
+
+    async def snapshot(self) -> Dict:
+        """The stored counters; computed on first use"""
+        doc = await self.collection.find_one({"_id": STATS_ID}, {"_id": 0})
+        if not doc or "recomputed_at" not in doc:
+            return await self.recompute()
+        return {**dict.fromkeys(COUNTERS, 0), **doc}
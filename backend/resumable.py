@@ -0,0 +1,97 @@
+"""Resumable uploads, following the tus 1.0 protocol (creation, checksum and
+expiration extensions).
+
+An upload is a pre-sized .part file that PATCH requests append to at the
+offset recorded in Mongo. The offset in the upload document is the source
+of truth: anything in the file past it is left over from an interrupted
+request and is overwritten by the next PATCH.
+"""
+import base64
+import binascii
+import hashlib
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,checksum,expiration"
+CHECKSUM_ALGORITHMS = ("sha1", "sha256", "md5")
+# Not a standard HTTP status; tus defines it for a failed Upload-Checksum
+CHECKSUM_MISMATCH_STATUS = 460
+
+
+class ChecksumMismatch(Exception):
+    pass
+
+
+class UploadOverflow(Exception):
+    """The request body runs past the declared Upload-Length"""
+
+
+def parse_metadata(header: Optional[str]) -> Dict[str, str]:
+    """Upload-Metadata: comma-separated "key base64value" pairs (the value may be omitted)"""
+    metadata = {}
+    for pair in (header or "").split(","):
+        key, _, value = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value.strip(), validate=True).decode("utf-8") if value else ""
+        except (binascii.Error, UnicodeDecodeError):
+            raise ValueError(f"Invalid Upload-Metadata value for {key}")
+    return metadata
+
+
+def parse_checksum(header: Optional[str]) -> Optional[Tuple[str, bytes]]:
+    """Upload-Checksum: "<algorithm> <base64 digest>" -> (algorithm, digest)"""
+    if not header:
+        return None
+    algorithm, _, value = header.strip().partition(" ")
+    algorithm = algorithm.lower()
+    if algorithm not in CHECKSUM_ALGORITHMS:
+        raise ValueError(f"Unsupported checksum algorithm: {algorithm}")
+    try:
+        return algorithm, base64.b64decode(value.strip(), validate=True)
+    except binascii.Error:
+        raise ValueError("Invalid Upload-Checksum digest")
+
+
+class ChunkWriter:
+    """Writes one PATCH body into an upload file, starting at `offset`.
+
+    Blocking; call each method from a worker thread.
+    """
+
+    def __init__(self, path: Path, offset: int, length: int, checksum: Optional[Tuple[str, bytes]] = None):
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.written = 0
+        self._checksum = checksum
+        self._digest = hashlib.new(checksum[0]) if checksum else None
+        self._file: Optional[BinaryIO] = None
+
+    def open(self) -> None:
+        self._file = open(self.path, "r+b")
+        self._file.truncate(self.offset)
+        self._file.seek(self.offset)
+
+    def write(self, data: bytes) -> None:
+        if self.offset + self.written + len(data) > self.length:
+            raise UploadOverflow()
+        self._file.write(data)
+        if self._digest:
+            self._digest.update(data)
+        self.written += len(data)
+
+    def verify(self) -> None:
+        if self._digest and self._digest.digest() != self._checksum[1]:
+            raise ChecksumMismatch()
+
+    def close(self, keep: bool) -> int:
+        """Close the file and return the new offset; unless `keep`, the chunk is dropped"""
+        if not keep:
+            self.written = 0
+        if self._file:
+            self._file.truncate(self.offset + self.written)
+            self._file.close()
+        return self.offset + self.written
@@ -0,0 +1,232 @@
+"""In-memory full-text search over sample packs.
+
+An inverted index over the pack text fields, ranked with BM25 (field-weighted
+term frequencies), with prefix matching for search-as-you-type and typo
+tolerance via a symmetric-delete dictionary. The index is updated
+incrementally as packs are created, edited and deleted.
+"""
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+# Field -> weight applied to term frequencies from that field
+SEARCH_FIELDS: Dict[str, float] = {
+    "title": 3.0,
+    "tags": 2.0,
+    "creator_name": 1.5,
+    "category": 1.5,
+    "key": 1.0,
+    "description": 1.0,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Expansions are down-weighted relative to an exact term hit
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = {1: 0.6, 2: 0.35}
+MAX_PREFIX_EXPANSIONS = 50
+MIN_PREFIX_LENGTH = 2
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+#?")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, strip accents and split into alphanumeric tokens"""
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _TOKEN_RE.findall(text)
+
+
+def max_edits(term: str) -> int:
+    """Allowed typo distance for a term of this length"""
+    if len(term) >= 8:
+        return 2
+    if len(term) >= 4:
+        return 1
+    return 0
+
+
+def _deletes(term: str, distance: int) -> Set[str]:
+    """All strings reachable from term by up to `distance` single-char deletions"""
+    results = {term}
+    frontier = {term}
+    for _ in range(distance):
+        next_frontier = set()
+        for word in frontier:
+            for i in range(len(word)):
+                next_frontier.add(word[:i] + word[i + 1:])
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Damerau-Levenshtein (optimal string alignment) distance, capped at limit + 1"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev_prev: List[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], prev_prev[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        prev_prev, prev = prev, current
+    return prev[-1]
+
+
+class SearchIndex:
+    """Incrementally maintained BM25 inverted index keyed by pack_id"""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._total_len = 0.0
+        self._vocab: List[str] = []  # sorted, for prefix lookups
+        self._delete_map: Dict[str, Set[str]] = {}  # delete variant -> vocab terms
+
+    def __len__(self) -> int:
+        return len(self._doc_terms)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def add(self, pack: Dict[str, Any]) -> None:
+        """Index (or re-index) a pack document"""
+        doc_id = pack["pack_id"]
+        self.remove(doc_id)
+
+        term_freqs: Dict[str, float] = {}
+        length = 0.0
+        for field, weight in SEARCH_FIELDS.items():
+            value = pack.get(field)
+            if isinstance(value, list):
+                value = " ".join(str(v) for v in value)
+            for token in tokenize(value or ""):
+                term_freqs[token] = term_freqs.get(token, 0.0) + weight
+                length += weight
+
+        if not term_freqs:
+            return
+        for term, tf in term_freqs.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._add_vocab_term(term)
+            postings[doc_id] = tf
+        self._doc_terms[doc_id] = term_freqs
+        self._doc_len[doc_id] = length
+        self._total_len += length
+
+    def remove(self, doc_id: str) -> None:
+        term_freqs = self._doc_terms.pop(doc_id, None)
+        if term_freqs is None:
+            return
+        self._total_len -= self._doc_len.pop(doc_id, 0.0)
+        for term in term_freqs:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[term]
+                self._remove_vocab_term(term)
+
+    def rebuild(self, packs: Iterable[Dict[str, Any]]) -> None:
+        self.__init__()
+        for pack in packs:
+            self.add(pack)
+
+    def _add_vocab_term(self, term: str) -> None:
+        insort(self._vocab, term)
+        for variant in _deletes(term, max_edits(term)):
+            self._delete_map.setdefault(variant, set()).add(term)
+
+    def _remove_vocab_term(self, term: str) -> None:
+        i = bisect_left(self._vocab, term)
+        if i < len(self._vocab) and self._vocab[i] == term:
+            del self._vocab[i]
+        for variant in _deletes(term, max_edits(term)):
+            terms = self._delete_map.get(variant)
+            if terms is not None:
+                terms.discard(term)
+                if not terms:
+                    del self._delete_map[variant]
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Index terms a query token may match, with a weight per match type"""
+        expansions: Dict[str, float] = {}
+        if token in self._postings:
+            expansions[token] = 1.0
+
+        if len(token) >= MIN_PREFIX_LENGTH:
+            i = bisect_left(self._vocab, token)
+            count = 0
+            while i < len(self._vocab) and count < MAX_PREFIX_EXPANSIONS:
+                term = self._vocab[i]
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    expansions.setdefault(term, PREFIX_WEIGHT)
+                    count += 1
+                i += 1
+
+        limit = max_edits(token)
+        if limit:
+            candidates: Set[str] = set()
+            for variant in _deletes(token, limit):
+                candidates |= self._delete_map.get(variant, set())
+            for term in candidates:
+                if term in expansions:
+                    continue
+                distance = edit_distance(token, term, min(limit, max_edits(term)))
+                if 0 < distance <= limit and distance in FUZZY_WEIGHT:
+                    expansions[term] = FUZZY_WEIGHT[distance]
+        return expansions
+
+    def _idf(self, term: str) -> float:
+        n = len(self._doc_terms)
+        df = len(self._postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int = 1000) -> List[Tuple[str, float]]:
+        """Return (pack_id, score) pairs in descending relevance order"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._doc_terms:
+            return []
+
+        avg_len = self._total_len / len(self._doc_terms)
+        scores: Dict[str, float] = {}
+        for token in tokens:
+            # Best-matching expansion per document, so a token can't score
+            # more than once for a document through several expansions
+            token_scores: Dict[str, float] = {}
+            for term, weight in self._expand(token).items():
+                idf = self._idf(term)
+                for doc_id, tf in self._postings[term].items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_len[doc_id] / avg_len)
+                    score = weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    if score > token_scores.get(doc_id, 0.0):
+                        token_scores[doc_id] = score
+            for doc_id, score in token_scores.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
@@ -1,50 +1,95 @@
 from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Cookie, UploadFile, File, Form, Query
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, StreamingResponse
+from starlette.requests import ClientDisconnect
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Awaitable, Callable
+from functools import partial
 import uuid
 from datetime import datetime, timezone, timedelta
 import aiohttp
 import base64
-import shutil
 import zipfile
+import mimetypes
+from urllib.parse import quote
+import tempfile
+import asyncio
+import hashlib
+import orjson
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from bson import ObjectId
 from emergentintegrations.payments.stripe.checkout import StripeCheckout, CheckoutSessionResponse, CheckoutStatusResponse, CheckoutSessionRequest
+from cache import SessionCache, LoadingCache
+from catalog import CATALOG_ID, bump_version, changed_since, current_version
+from indexes import ensure_indexes
+from search_index import SearchIndex, SEARCH_FIELDS
+from pagination import (
+    PACK_SORTS, FAVORITES_SORT, COLLECTIONS_SORT, PAYOUTS_SORT, USERS_SORT,
+    clamp_limit, decode_cursor, decode_position_cursor, encode_cursor, fetch_page, keyset_filter
+)
+from music_keys import normalize_key, compatible_keys
+from audio_analysis import MEMBER_AUDIO_FIELDS, analyze_pack_file, generate_peaks, pack_audio_key, peaks_key
+from zip_manifest import iter_member_range, member_updates, read_zip_manifest
+from zip_bundle import iter_zip_bundle, safe_name, unique_names
+from ingest import StagedFile, UploadTooLarge, discard_all, stage_all, stage_file, stage_upload
+from blobstore import BlobStore, is_blob_path, pack_file_paths
+from resumable import (
+    CHECKSUM_ALGORITHMS, CHECKSUM_MISMATCH_STATUS, TUS_EXTENSIONS, TUS_VERSION,
+    ChecksumMismatch, ChunkWriter, UploadOverflow, parse_checksum, parse_metadata
+)
+from http_ranges import content_disposition, requested_range, stream_range_response
+from storage import local_copy, storage_from_env
+from download_recorder import DownloadRecorder
+from ledger import CreatorLedger, InsufficientBalance, balance_summary, creator_cut, to_cents
+from platform_stats import PlatformStats
+from analytics import GRANULARITIES, Analytics, in_dollars, summarize
+from exports import EXPORTS, FORMATS, export_query, iter_export
+from music_analysis import analyze_music_batch, analyze_music_file, audio_member_names, batched, combine_results, sample_members
 
 
 # ============================================
-# HELPER: ObjectId Serialization
+# HELPER: Fast JSON responses
 # ============================================
-def serialize_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
-    """Convert MongoDB document to JSON-serializable dict by handling ObjectId"""
-    if doc is None:
-        return None
-    result = {}
-    for key, value in doc.items():
-        if key == "_id":
-            continue  # Skip _id field
-        elif isinstance(value, ObjectId):
-            result[key] = str(value)
-        elif isinstance(value, datetime):
-            result[key] = value.isoformat()
-        elif isinstance(value, dict):
-            result[key] = serialize_doc(value)
-        elif isinstance(value, list):
-            result[key] = [serialize_doc(item) if isinstance(item, dict) else (str(item) if isinstance(item, ObjectId) else item) for item in value]
-        else:
-            result[key] = value
+def _orjson_default(value: Any) -> Any:
+    """Encode the types orjson doesn't handle natively"""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (native datetime, ObjectId via default)"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(content: Any, response: Optional[Response] = None, status_code: int = 200) -> FastJSONResponse:
+    """Serialize straight to JSON, skipping FastAPI's jsonable_encoder pass.
+
+    Headers set on the route's injected `response` are carried over, since
+    FastAPI only merges them into responses it builds itself.
+    """
+    result = FastJSONResponse(content, status_code=status_code)
+    if response is not None:
+        result.headers.raw.extend(response.headers.raw)
     return result
 
 
-def serialize_docs(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Convert list of MongoDB documents to JSON-serializable list"""
-    return [serialize_doc(doc) for doc in docs]
+def without_id(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop the _id insert_one adds to the document it was given"""
+    doc.pop("_id", None)
+    return doc
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -57,10 +102,86 @@ db = client[os.environ['DB_NAME']]
 # Stripe setup
 STRIPE_API_KEY = os.environ['STRIPE_API_KEY']
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@sounddrops.com')
-PLATFORM_FEE_PERCENT = float(os.environ.get('PLATFORM_FEE_PERCENT', '10'))
+
+# In-process session cache (per worker)
+SESSION_CACHE_SIZE = int(os.environ.get('SESSION_CACHE_SIZE', '10000'))
+SESSION_CACHE_TTL_SECONDS = float(os.environ.get('SESSION_CACHE_TTL_SECONDS', '60'))
+session_cache = SessionCache(maxsize=SESSION_CACHE_SIZE, ttl=SESSION_CACHE_TTL_SECONDS)
+
+# Read-through pack document cache (per worker). Download counts in cached
+# docs may lag by up to the TTL; every other pack mutation invalidates.
+PACK_CACHE_SIZE = int(os.environ.get('PACK_CACHE_SIZE', '5000'))
+PACK_CACHE_TTL_SECONDS = float(os.environ.get('PACK_CACHE_TTL_SECONDS', '30'))
+pack_cache = LoadingCache(maxsize=PACK_CACHE_SIZE, ttl=PACK_CACHE_TTL_SECONDS)
+
+# Catalog version: bumped by every pack mutation and polled from Mongo so
+# ETags and in-process caches follow changes made by other workers
+CATALOG_VERSION_POLL_SECONDS = float(os.environ.get('CATALOG_VERSION_POLL_SECONDS', '2'))
+# Download counts change without bumping the version; ETags roll over every
+# window so cached listings show counts at most this stale
+CATALOG_ETAG_WINDOW_SECONDS = int(os.environ.get('CATALOG_ETAG_WINDOW_SECONDS', '60'))
+CATALOG_CACHE_CONTROL = os.environ.get(
+    'CATALOG_CACHE_CONTROL',
+    'public, max-age=0, must-revalidate, s-maxage=30, stale-while-revalidate=30'
+)
+catalog_state = {"version": 0}
+
+# Full-text search over packs (per worker; the packs another worker changed
+# are reindexed when it bumps the catalog version, and the whole index is
+# rebuilt periodically as a safety net)
+SEARCH_INDEX_REFRESH_SECONDS = float(os.environ.get('SEARCH_INDEX_REFRESH_SECONDS', '300'))
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', '1000'))
+search_index = SearchIndex()
+
+# Worker processes for audio analysis after upload (decoding, peaks). Spawned
+# rather than forked so children don't inherit the event loop or Mongo client.
+MEDIA_WORKERS = int(os.environ.get('MEDIA_WORKERS', '2'))
+media_executor = ProcessPoolExecutor(max_workers=MEDIA_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+PEAKS_CACHE_CONTROL = os.environ.get('PEAKS_CACHE_CONTROL', 'public, max-age=3600')
+
+# Tempo/key detection: empty bpm/key are filled only at or above these
+# confidences; anything else is stored as bpm_suggestion/key_suggestion.
+# ZIP members are analyzed in batches (one worker task each), at most
+# MUSIC_ANALYSIS_MAX_MEMBERS per pack.
+BPM_CONFIDENCE_THRESHOLD = float(os.environ.get('BPM_CONFIDENCE_THRESHOLD', '0.5'))
+KEY_CONFIDENCE_THRESHOLD = float(os.environ.get('KEY_CONFIDENCE_THRESHOLD', '0.6'))
+MUSIC_ANALYSIS_BATCH_SIZE = int(os.environ.get('MUSIC_ANALYSIS_BATCH_SIZE', '25'))
+MUSIC_ANALYSIS_MAX_MEMBERS = int(os.environ.get('MUSIC_ANALYSIS_MAX_MEMBERS', '500'))
+
+# Per-part upload size limits, enforced while the part is copied to disk
+MB = 1024 * 1024
+UPLOAD_LIMITS = {
+    "zip": int(os.environ.get('MAX_ZIP_UPLOAD_MB', '4096')) * MB,
+    "audio": int(os.environ.get('MAX_AUDIO_UPLOAD_MB', '1024')) * MB,
+    "cover": int(os.environ.get('MAX_COVER_UPLOAD_MB', '10')) * MB,
+    "preview": int(os.environ.get('MAX_PREVIEW_UPLOAD_MB', '100')) * MB,
+}
+
+# Resumable uploads expire this long after their last PATCH and are then
+# garbage-collected. A PATCH holds the upload for at most UPLOAD_LOCK_SECONDS,
+# so a crashed request can't block the upload forever.
+UPLOAD_EXPIRY_HOURS = float(os.environ.get('UPLOAD_EXPIRY_HOURS', '24'))
+UPLOAD_GC_INTERVAL_SECONDS = float(os.environ.get('UPLOAD_GC_INTERVAL_SECONDS', '3600'))
+UPLOAD_LOCK_SECONDS = float(os.environ.get('UPLOAD_LOCK_SECONDS', '900'))
+UPLOAD_WRITE_BUFFER = 1024 * 1024
+
+# Download events are written behind the request in batches (see
+# download_recorder.py). DOWNLOAD_JOURNAL_DIR turns on the on-disk journal
+# that keeps queued events across a worker crash.
+DOWNLOAD_QUEUE_SIZE = int(os.environ.get('DOWNLOAD_QUEUE_SIZE', '10000'))
+DOWNLOAD_BATCH_SIZE = int(os.environ.get('DOWNLOAD_BATCH_SIZE', '500'))
+DOWNLOAD_FLUSH_SECONDS = float(os.environ.get('DOWNLOAD_FLUSH_SECONDS', '1.0'))
+DOWNLOAD_JOURNAL_DIR = os.environ.get('DOWNLOAD_JOURNAL_DIR', '')
+
+# The admin dashboard's counters are kept up to date by the write paths and
+# recounted from scratch this often to correct drift
+PLATFORM_STATS_RECOMPUTE_SECONDS = float(os.environ.get('PLATFORM_STATS_RECOMPUTE_SECONDS', '900'))
+
+# Longest series an analytics query may return (hourly buckets for ~6 weeks)
+MAX_ANALYTICS_BUCKETS = int(os.environ.get('MAX_ANALYTICS_BUCKETS', '1000'))
 
 # Create the main app
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Create router with /api prefix
 api_router = APIRouter(prefix="/api")
@@ -88,6 +209,52 @@ COVERS_STORAGE_PATH.mkdir(exist_ok=True)
 PREVIEWS_STORAGE_PATH = ROOT_DIR / "previews"
 PREVIEWS_STORAGE_PATH.mkdir(exist_ok=True)
 
+# Precomputed waveform peaks, one JSON file per pack
+PEAKS_STORAGE_PATH = ROOT_DIR / "peaks"
+PEAKS_STORAGE_PATH.mkdir(exist_ok=True)
+
+# Where pack files and peaks live: this directory, or an S3-compatible
+# bucket (STORAGE_BACKEND=s3, see storage.py). With object storage, media
+# and downloads are answered with a redirect to a presigned URL unless
+# STORAGE_REDIRECTS is off, so their bytes never pass through this process.
+storage = storage_from_env(ROOT_DIR)
+STORAGE_REDIRECTS = os.environ.get('STORAGE_REDIRECTS', 'true').lower() == 'true'
+
+# Front-proxy offload for local files. "x-accel" (nginx) answers with an
+# X-Accel-Redirect to FILE_OFFLOAD_PREFIX + key, which nginx maps onto this
+# directory as an internal location; "x-sendfile" (Apache mod_xsendfile,
+# lighttpd) answers with the file's absolute path. The proxy then sends the
+# file, Range requests included, and the worker is free right away.
+FILE_OFFLOAD = os.environ.get('FILE_OFFLOAD', 'none').lower()
+FILE_OFFLOAD_PREFIX = os.environ.get('FILE_OFFLOAD_PREFIX', '/protected/')
+if FILE_OFFLOAD not in ("none", "x-accel", "x-sendfile"):
+    raise ValueError(f"FILE_OFFLOAD must be none, x-accel or x-sendfile, not {FILE_OFFLOAD!r}")
+
+# Content-addressed pack files (audio, ZIPs, covers, previews), reference
+# counted in the blobs collection. Older packs still point into the
+# per-type directories above until `manage.py migrate-blobs` runs.
+blob_store = BlobStore(storage, db.blobs, ROOT_DIR / "blobs")
+
+# Creator earnings and payouts, kept as running balances (see ledger.py)
+ledger = CreatorLedger(db)
+platform_stats = PlatformStats(db)
+# Hourly and daily downloads, purchases and revenue (see analytics.py)
+analytics = Analytics(db.analytics_rollups, db.sample_packs)
+
+download_recorder = DownloadRecorder(
+    db.downloads,
+    db.sample_packs,
+    max_queue=DOWNLOAD_QUEUE_SIZE,
+    batch_size=DOWNLOAD_BATCH_SIZE,
+    flush_seconds=DOWNLOAD_FLUSH_SECONDS,
+    journal_dir=Path(DOWNLOAD_JOURNAL_DIR) if DOWNLOAD_JOURNAL_DIR else None,
+    on_flush=analytics.add_downloads
+)
+
+# In-progress resumable uploads, one .part file per upload
+UPLOADS_STORAGE_PATH = ROOT_DIR / "uploads"
+UPLOADS_STORAGE_PATH.mkdir(exist_ok=True)
+
 # ============================================
 # PYDANTIC MODELS
 # ============================================
@@ -122,10 +289,13 @@ class SamplePack(BaseModel):
     sync_type: Optional[str] = None  # Sports, Film, Cinematic, Broadcast
     bpm: Optional[int] = None  # Tempo
     key: Optional[str] = None  # Musical key
+    bpm_suggestion: Optional[Dict[str, Any]] = None  # {"value", "confidence"} from detection
+    key_suggestion: Optional[Dict[str, Any]] = None
     creator_id: str
     creator_name: str
     audio_file_path: str
-    duration: float = 0.0  # in seconds
+    duration: float = 0.0  # in seconds (total of audio members for ZIPs)
+    audio_metadata: Optional[Dict[str, Any]] = None  # codec, sample_rate, channels, bit_depth, loudness_lufs
     file_size: int = 0  # in bytes
     download_count: int = 0
     created_at: datetime
@@ -180,6 +350,46 @@ class PaymentTransaction(BaseModel):
 # HELPER FUNCTIONS
 # ============================================
 
+# Fields the User model is built from; the session join projects only these
+USER_FIELDS = list(User.model_fields.keys())
+
+async def resolve_session_user(token: str) -> Optional[tuple]:
+    """Resolve a session token to (user_doc, expires_at) in a single round trip.
+
+    Joins user_sessions to users with $lookup and filters expired sessions in
+    the database. Sessions whose expires_at was stored as a string can't be
+    compared server-side, so they're matched loosely and checked here.
+    """
+    now = datetime.now(timezone.utc)
+    pipeline = [
+        {"$match": {
+            "session_token": token,
+            "$or": [{"expires_at": {"$gt": now}}, {"expires_at": {"$type": "string"}}]
+        }},
+        {"$limit": 1},
+        {"$lookup": {
+            "from": "users",
+            "localField": "user_id",
+            "foreignField": "user_id",
+            "as": "user"
+        }},
+        {"$unwind": "$user"},
+        {"$project": {"_id": 0, "expires_at": 1, **{f"user.{field}": 1 for field in USER_FIELDS}}}
+    ]
+    results = await db.user_sessions.aggregate(pipeline).to_list(1)
+    if not results:
+        return None
+    
+    expires_at = results[0]["expires_at"]
+    if isinstance(expires_at, str):
+        expires_at = datetime.fromisoformat(expires_at)
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    if expires_at < now:
+        return None
+    
+    return results[0]["user"], expires_at
+
 async def get_current_user(request: Request, session_token: Optional[str] = Cookie(None)) -> Optional[User]:
     """Authenticate user from cookie or Authorization header"""
     token = session_token
@@ -193,26 +403,18 @@ async def get_current_user(request: Request, session_token: Optional[str] = Cook
     if not token:
         return None
     
-    # Check session in database
-    session_doc = await db.user_sessions.find_one({"session_token": token}, {"_id": 0})
-    if not session_doc:
-        return None
-    
-    # Check expiry
-    expires_at = session_doc["expires_at"]
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
-    if expires_at < datetime.now(timezone.utc):
-        return None
+    cached_user = session_cache.get_user(token)
+    if cached_user:
+        return cached_user
     
-    # Get user
-    user_doc = await db.users.find_one({"user_id": session_doc["user_id"]}, {"_id": 0})
-    if not user_doc:
+    resolved = await resolve_session_user(token)
+    if not resolved:
         return None
     
-    return User(**user_doc)
+    user_doc, expires_at = resolved
+    user = User(**user_doc)
+    session_cache.put_user(token, user, expires_at)
+    return user
 
 async def require_auth(request: Request, session_token: Optional[str] = Cookie(None)) -> User:
     """Require authentication"""
@@ -257,14 +459,372 @@ async def check_subscription(user_id: str) -> bool:
             expires_at = expires_at.replace(tzinfo=timezone.utc)
         if expires_at < datetime.now(timezone.utc):
             # Update status to expired
-            await db.subscriptions.update_one(
-                {"subscription_id": sub_doc["subscription_id"]},
+            result = await db.subscriptions.update_one(
+                {"subscription_id": sub_doc["subscription_id"], "status": "active"},
                 {"$set": {"status": "expired"}}
             )
+            if result.modified_count:
+                await platform_stats.increment(active_subscriptions=-1)
             return False
     
     return True
 
+async def accessible_pack_ids(user: User, packs: List[Dict[str, Any]]) -> set:
+    """Ids of the packs a user may download (free, purchased, or covered by a
+    subscription), checked in bulk: one purchases query and at most one
+    subscription lookup however many packs there are"""
+    accessible = {pack["pack_id"] for pack in packs if pack["is_free"]}
+    paid_ids = [pack["pack_id"] for pack in packs if pack["pack_id"] not in accessible]
+    if not paid_ids:
+        return accessible
+    purchases = await db.purchases.find(
+        {"user_id": user.user_id, "pack_id": {"$in": paid_ids}},
+        {"_id": 0, "pack_id": 1}
+    ).to_list(None)
+    accessible.update(purchase["pack_id"] for purchase in purchases)
+    if len(accessible) < len(packs) and await check_subscription(user.user_id):
+        accessible.update(paid_ids)
+    return accessible
+
+async def check_pack_access(user: User, pack: Dict[str, Any]) -> bool:
+    """Whether a user may download a pack"""
+    return pack["pack_id"] in await accessible_pack_ids(user, [pack])
+
+# Pack fields returned by the API; the ZIP manifest is only served through
+# /samples/{pack_id}/contents
+PACK_PROJECTION = {"_id": 0, "zip_manifest": 0}
+
+def public_pack(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in doc.items() if k not in PACK_PROJECTION}
+
+async def get_pack(pack_id: str) -> Optional[Dict[str, Any]]:
+    """Fetch a pack document through the pack cache"""
+    pack = await pack_cache.get_or_load(
+        pack_id,
+        lambda: db.sample_packs.find_one({"pack_id": pack_id}, PACK_PROJECTION)
+    )
+    return dict(pack) if pack else None
+
+async def bump_catalog_version(pack_id: str) -> int:
+    """Increment the shared catalog version after a mutation of pack_id"""
+    doc = await bump_version(db.catalog_meta, [pack_id])
+    if doc["version"] == catalog_state["version"] + 1:
+        # Only this worker's own change, which is already applied
+        catalog_state["version"] = doc["version"]
+    else:
+        # Another worker bumped in between; its change isn't reflected here yet
+        await catch_up_catalog(doc)
+    return doc["version"]
+
+async def catch_up_catalog(doc: Optional[Dict[str, Any]]):
+    """Bring per-worker catalog state up to the version in doc: reindex just
+    the packs changed since, or everything if the change log doesn't reach back"""
+    since = catalog_state["version"]
+    if current_version(doc) == since:
+        return
+    changed = changed_since(doc, since)
+    catalog_state["version"] = current_version(doc)
+    if changed is None:
+        pack_cache.clear()
+        await rebuild_search_index()
+    elif changed:
+        await reindex_packs(changed)
+
+async def poll_catalog_version():
+    while True:
+        try:
+            await catch_up_catalog(await db.catalog_meta.find_one({"_id": CATALOG_ID}))
+        except Exception as e:
+            logger.error(f"Catalog version poll failed: {e}")
+        await asyncio.sleep(CATALOG_VERSION_POLL_SECONDS)
+
+async def reindex_packs(pack_ids):
+    """Evict packs from the pack cache and refresh their search index entries"""
+    pack_ids = list(pack_ids)
+    for pack_id in pack_ids:
+        pack_cache.invalidate(pack_id)
+    projection = {"_id": 0, "pack_id": 1, **{field: 1 for field in SEARCH_FIELDS}}
+    packs = await db.sample_packs.find({"pack_id": {"$in": pack_ids}}, projection).to_list(None)
+    for pack in packs:
+        search_index.add(pack)
+    for pack_id in set(pack_ids) - {pack["pack_id"] for pack in packs}:
+        search_index.remove(pack_id)
+
+async def pack_changed(pack_id: str, deleted: bool = False):
+    """Propagate a pack insert/update/delete to the caches, search index and catalog version"""
+    if deleted:
+        pack_cache.invalidate(pack_id)
+        search_index.remove(pack_id)
+    else:
+        await reindex_packs([pack_id])
+    await bump_catalog_version(pack_id)
+
+def catalog_etag(request: Request) -> str:
+    """Strong ETag for a catalog response: catalog version + time window + URL"""
+    window = int(time.time() // CATALOG_ETAG_WINDOW_SECONDS)
+    query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{catalog_state['version']}:{window}:{request.url.path}?{query}".encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+def check_not_modified(request: Request, response: Response) -> Optional[Response]:
+    """Return a 304 if the client's copy is current; otherwise tag the response"""
+    etag = catalog_etag(request)
+    headers = {"ETag": etag, "Cache-Control": CATALOG_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+async def rebuild_search_index():
+    """Rebuild the in-memory search index from every pack"""
+    projection = {"_id": 0, "pack_id": 1, **{field: 1 for field in SEARCH_FIELDS}}
+    packs = await db.sample_packs.find({}, projection).to_list(None)
+    search_index.rebuild(packs)
+    logger.info(f"Search index rebuilt with {len(search_index)} packs")
+
+# Response header carrying the cursor for the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def resolve_pack_sort(sort: str):
+    """Map a sort name from the query string to its keyset sort spec"""
+    if sort not in PACK_SORTS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort. Use one of: {', '.join(PACK_SORTS)}")
+    return PACK_SORTS[sort]
+
+async def paginate(response: Response, collection, query: dict, sort_name: str, sort_spec, limit: int, cursor: Optional[str], projection: Optional[dict] = None) -> list:
+    """Fetch one keyset page and expose the next cursor as a response header"""
+    try:
+        docs, next_cursor = await fetch_page(collection, query, sort_name, sort_spec, limit, cursor, projection)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return docs
+
+def offload_response(key: str, path: Path, media_type: str, headers: Dict[str, str]) -> Response:
+    """Empty response telling the front proxy which file to send. nginx keeps
+    Content-Type, Content-Disposition and Cache-Control from it."""
+    if FILE_OFFLOAD == "x-accel":
+        headers = {**headers, "X-Accel-Redirect": FILE_OFFLOAD_PREFIX + quote(key)}
+    else:
+        headers = {**headers, "X-Sendfile": str(path.resolve())}
+    return Response(status_code=200, media_type=media_type, headers=headers)
+
+def starts_download(request: Request, response: Response) -> bool:
+    """Whether a file response is the start of a download, so each one is
+    counted once and not again for every resumed range of it"""
+    if response.status_code == 206:
+        return response.headers["content-range"].startswith("bytes 0-")
+    if "x-accel-redirect" in response.headers or "x-sendfile" in response.headers:
+        # The proxy answers the Range header itself
+        requested = request.headers.get("range", "").replace(" ", "")
+        return not requested or requested.startswith("bytes=0-")
+    return True
+
+async def serve_stored(
+    request: Request,
+    key: str,
+    media_type: str,
+    headers: Optional[Dict[str, str]] = None,
+    filename: Optional[str] = None,
+    inline: bool = True,
+    not_found: str = "File not found"
+) -> Response:
+    """Serve a stored file with single-range support.
+
+    Object storage answers with a redirect to a presigned URL, so the
+    client gets the bytes (and its Range requests) straight from the
+    bucket. Local files are handed to the front proxy when FILE_OFFLOAD
+    is set; otherwise whole files go out as FileResponse, and ranges are
+    streamed (FileResponse ignores Range in this Starlette).
+    """
+    if storage.presigns and STORAGE_REDIRECTS:
+        if not await asyncio.to_thread(storage.exists, key):
+            raise HTTPException(status_code=404, detail=not_found)
+        url = await asyncio.to_thread(storage.presigned_url, key, filename, inline, media_type)
+        return RedirectResponse(url, status_code=307, headers={"Cache-Control": "private, no-store"})
+    
+    stored = await asyncio.to_thread(storage.stat, key)
+    if stored is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    headers = {"Accept-Ranges": "bytes", "ETag": stored.etag, **(headers or {})}
+    if filename:
+        headers["Content-Disposition"] = content_disposition(filename, inline=inline)
+    local_path = storage.local_path(key)
+    if FILE_OFFLOAD != "none" and local_path is not None:
+        return offload_response(key, local_path, media_type, headers)
+    byte_range = requested_range(request, stored.size, stored.etag)
+    if byte_range is None and local_path is not None:
+        return FileResponse(path=local_path, media_type=media_type, headers=headers)
+    start, end = byte_range or (0, stored.size - 1)
+    chunks = storage.iter_range(key, start, end) if stored.size else iter(())
+    return stream_range_response(chunks, stored.size, byte_range, media_type, headers)
+
+async def get_zip_entry(pack_id: str, index: int) -> tuple:
+    """(pack, manifest entry) for member `index` of a ZIP pack; 404 if either is missing"""
+    pack = await get_pack(pack_id)
+    if not pack:
+        raise HTTPException(status_code=404, detail="Sample pack not found")
+    if pack.get("file_type") != "zip":
+        raise HTTPException(status_code=404, detail="Pack is not a ZIP archive")
+    doc = None
+    if index >= 0:
+        doc = await db.sample_packs.find_one(
+            {"pack_id": pack_id},
+            {"_id": 0, "pack_id": 1, "zip_manifest": {"$slice": [index, 1]}}
+        )
+    entries = (doc or {}).get("zip_manifest") or []
+    if not entries:
+        raise HTTPException(status_code=404, detail="File not found in pack")
+    return pack, entries[0]
+
+async def serve_zip_member(request: Request, pack: Dict[str, Any], entry: Dict[str, Any], inline: bool) -> Response:
+    """Stream one member out of a stored ZIP, honoring Range"""
+    if entry.get("encrypted"):
+        raise HTTPException(status_code=400, detail="File is encrypted")
+    archive_key = pack["audio_file_path"]
+    if not await asyncio.to_thread(storage.exists, archive_key):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    size = entry["size"]
+    etag = f'"{entry["crc"]}-{size:x}"'
+    byte_range = requested_range(request, size, etag)
+    start, end = byte_range or (0, size - 1)
+    chunks = iter_member_range(partial(storage.open, archive_key), entry, start, end) if size else iter(())
+    filename = entry["name"].rsplit("/", 1)[-1]
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    headers = {"ETag": etag, "Content-Disposition": content_disposition(filename, inline=inline)}
+    return stream_range_response(chunks, size, byte_range, media_type, headers)
+
+async def refresh_search_index_periodically():
+    while True:
+        await asyncio.sleep(SEARCH_INDEX_REFRESH_SECONDS)
+        try:
+            await rebuild_search_index()
+        except Exception as e:
+            logger.error(f"Search index refresh failed: {e}")
+
+# Post-upload work runs as tasks held here so they aren't garbage collected
+background_tasks: set = set()
+
+def spawn_background(coro) -> asyncio.Task:
+    task = asyncio.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def run_in_media_pool(func, *args):
+    """Run a CPU-bound audio function in the media worker processes"""
+    return await asyncio.get_running_loop().run_in_executor(media_executor, func, *args)
+
+async def generate_pack_peaks(pack: Dict[str, Any]) -> bool:
+    """Compute and store waveform peaks for a pack; False if it has no playable audio"""
+    source_key = pack_audio_key(pack)
+    if not source_key or not await asyncio.to_thread(storage.exists, source_key):
+        return False
+    key = peaks_key(pack["pack_id"])
+    async with local_copy(storage, source_key) as source:
+        with tempfile.TemporaryDirectory() as tmp:
+            peaks_file = Path(tmp) / "peaks.json"
+            await run_in_media_pool(generate_peaks, str(source), str(peaks_file))
+            await asyncio.to_thread(storage.put_file, key, peaks_file)
+    await db.sample_packs.update_one({"pack_id": pack["pack_id"]}, {"$set": {"peaks_path": key}})
+    # Listings don't depend on peaks_path, so no catalog version bump
+    pack_cache.invalidate(pack["pack_id"])
+    return True
+
+async def analyze_pack_audio(pack: Dict[str, Any], path: Path) -> Dict[str, Any]:
+    """Record duration and audio metadata (format, loudness) for a pack's main file, at `path` locally"""
+    result = await run_in_media_pool(analyze_pack_file, str(path))
+    await db.sample_packs.update_one(
+        {"pack_id": pack["pack_id"]},
+        {"$set": {
+            "duration": result["duration"],
+            "audio_metadata": {**result["audio_metadata"], "analyzed_at": datetime.now(timezone.utc)},
+        }}
+    )
+    if "members" in result:
+        await merge_into_manifest(pack["pack_id"], result["members"], MEMBER_AUDIO_FIELDS)
+    await pack_changed(pack["pack_id"])
+    return result
+
+async def merge_into_manifest(pack_id: str, results: List[Dict[str, Any]], fields):
+    """Copy per-member analysis results into the pack's zip_manifest entries"""
+    doc = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0, "zip_manifest.name": 1})
+    updates = member_updates((doc or {}).get("zip_manifest") or [], results, fields)
+    if updates:
+        await db.sample_packs.update_one({"pack_id": pack_id}, {"$set": updates})
+
+def music_analysis_update(pack: Dict[str, Any], estimate: Dict[str, Any]) -> Dict[str, Any]:
+    """$set fields for a tempo/key estimate: fill empty fields when confident, else suggest"""
+    fields = {"music_analysis": {**estimate, "analyzed_at": datetime.now(timezone.utc)}}
+    bpm = estimate["bpm"]
+    if bpm is not None:
+        if pack.get("bpm") is None and estimate["bpm_confidence"] >= BPM_CONFIDENCE_THRESHOLD:
+            fields["bpm"] = bpm
+        elif bpm != pack.get("bpm"):
+            fields["bpm_suggestion"] = {"value": bpm, "confidence": estimate["bpm_confidence"]}
+    key = estimate["key"]
+    if key is not None:
+        if not pack.get("key") and estimate["key_confidence"] >= KEY_CONFIDENCE_THRESHOLD:
+            fields["key"] = key
+            fields["key_normalized"] = key
+        elif key != pack.get("key_normalized"):
+            fields["key_suggestion"] = {"value": key, "confidence": estimate["key_confidence"]}
+    return fields
+
+async def detect_pack_music(pack: Dict[str, Any], path: Path) -> Dict[str, Any]:
+    """Estimate tempo and key for a pack's main file, at `path` locally; ZIP
+    members are analyzed in parallel batches"""
+    path = str(path)
+    if pack.get("file_type") == "zip":
+        names = sample_members(await run_in_media_pool(audio_member_names, path), MUSIC_ANALYSIS_MAX_MEMBERS)
+        batches = await asyncio.gather(*(
+            run_in_media_pool(analyze_music_batch, path, list(batch))
+            for batch in batched(names, MUSIC_ANALYSIS_BATCH_SIZE)
+        ))
+        results = [result for batch in batches for result in batch if "error" not in result]
+        estimate = combine_results(results)
+        await merge_into_manifest(pack["pack_id"], results, ("bpm", "bpm_confidence", "key", "key_confidence"))
+    else:
+        estimate = await run_in_media_pool(analyze_music_file, path)
+        if estimate["bpm"] is not None:
+            estimate["bpm"] = int(round(estimate["bpm"]))
+    
+    await db.sample_packs.update_one({"pack_id": pack["pack_id"]}, {"$set": music_analysis_update(pack, estimate)})
+    await pack_changed(pack["pack_id"])
+    return estimate
+
+async def process_pack_media(pack_id: str):
+    """Analysis run after an upload; failures are logged and leave the pack usable"""
+    pack = await db.sample_packs.find_one({"pack_id": pack_id}, PACK_PROJECTION)
+    if not pack:
+        return
+    try:
+        async with local_copy(storage, pack["audio_file_path"]) as path:
+            try:
+                await analyze_pack_audio(pack, path)
+            except Exception as e:
+                logger.warning(f"Audio analysis failed for {pack_id}: {e}")
+            try:
+                await detect_pack_music(pack, path)
+            except Exception as e:
+                logger.warning(f"Tempo/key detection failed for {pack_id}: {e}")
+    except Exception as e:
+        logger.warning(f"Could not read the file of {pack_id} for analysis: {e}")
+    try:
+        await generate_pack_peaks(pack)
+    except Exception as e:
+        logger.warning(f"Waveform peaks failed for {pack_id}: {e}")
+
 # ============================================
 # AUTH ENDPOINTS
 # ============================================
@@ -307,6 +867,9 @@ async def create_session(request: Request, response: Response):
             {"user_id": user_id},
             {"$set": update_data}
         )
+        session_cache.invalidate_user(user_id)
+        if update_data.get("role") == "admin" and existing_user.get("role") == "creator" and existing_user.get("creator_approved"):
+            await platform_stats.increment(creators=-1)
     else:
         # Create new user
         # Check if this is admin email
@@ -330,6 +893,10 @@ async def create_session(request: Request, response: Response):
             "created_at": datetime.now(timezone.utc)
         }
         await db.users.insert_one(user_doc)
+        await platform_stats.increment(
+            users=1,
+            creators=int(user_doc["role"] == "creator" and user_doc["creator_approved"])
+        )
         
         # Mark invitation as accepted
         if is_invited_creator:
@@ -367,13 +934,14 @@ async def create_session(request: Request, response: Response):
 async def get_me(request: Request, session_token: Optional[str] = Cookie(None)):
     """Get current user"""
     user = await require_auth(request, session_token)
-    return user
+    return json_response(user)
 
 @api_router.post("/auth/logout")
 async def logout(request: Request, response: Response, session_token: Optional[str] = Cookie(None)):
     """Logout user"""
     if session_token:
         await db.user_sessions.delete_one({"session_token": session_token})
+        session_cache.invalidate(session_token)
         response.delete_cookie(key="session_token", path="/")
     return {"message": "Logged out successfully"}
 
@@ -381,72 +949,304 @@ async def logout(request: Request, response: Response, session_token: Optional[s
 # SAMPLE PACKS ENDPOINTS
 # ============================================
 
+# Lower bounds of the BPM facet buckets (last value is the exclusive upper bound)
+BPM_FACET_BOUNDARIES = [0, 70, 90, 100, 110, 120, 130, 140, 160, 1000]
+
+def and_clauses(*clauses: dict) -> dict:
+    clauses = [c for c in clauses if c]
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": list(clauses)}
+
+def build_pack_filters(
+    categories: Optional[List[str]] = None,
+    creator_id: Optional[str] = None,
+    free_only: bool = False,
+    featured_only: bool = False,
+    sync_ready_only: bool = False,
+    sync_type: Optional[str] = None,
+    bpm_min: Optional[int] = None,
+    bpm_max: Optional[int] = None,
+    key: Optional[str] = None,
+    compatible: bool = False,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+    duration_min: Optional[float] = None,
+    duration_max: Optional[float] = None
+) -> tuple:
+    """Build catalog filters as (base clauses, {facet: clause}).
+
+    Filters on a faceted dimension are kept apart so each facet can be
+    counted with every filter except its own.
+    """
+    base = {}
+    if creator_id:
+        base["creator_id"] = creator_id
+    if featured_only:
+        base["is_featured"] = True
+    if sync_ready_only:
+        base["is_sync_ready"] = True
+    if duration_min is not None or duration_max is not None:
+        duration_range = {}
+        if duration_min is not None:
+            duration_range["$gte"] = duration_min
+        if duration_max is not None:
+            duration_range["$lte"] = duration_max
+        base["duration"] = duration_range
+    
+    facets = {}
+    if categories:
+        facets["category"] = {"category": categories[0] if len(categories) == 1 else {"$in": categories}}
+    if key:
+        keys = compatible_keys(key) if compatible else [normalize_key(key)]
+        if not keys or not keys[0]:
+            raise HTTPException(status_code=400, detail=f"Unrecognized key: {key}")
+        facets["key"] = {"key_normalized": keys[0] if len(keys) == 1 else {"$in": keys}}
+    if sync_type:
+        facets["sync_type"] = {"sync_type": sync_type}
+    if bpm_min is not None or bpm_max is not None:
+        bpm_range = {}
+        if bpm_min is not None:
+            bpm_range["$gte"] = bpm_min
+        if bpm_max is not None:
+            bpm_range["$lte"] = bpm_max
+        facets["bpm"] = {"bpm": bpm_range}
+    price_clauses = []
+    if free_only:
+        price_clauses.append({"is_free": True})
+    if price_min is not None or price_max is not None:
+        price_range = {}
+        if price_min is not None:
+            price_range["$gte"] = price_min
+        if price_max is not None:
+            price_range["$lte"] = price_max
+        price_clauses.append({"price": price_range})
+    if price_clauses:
+        facets["price"] = and_clauses(*price_clauses)
+    
+    return base, facets
+
+def facet_count_pipeline(facet_clauses: dict, dimension: str, stages: list) -> list:
+    """Sub-pipeline counting one facet under every other facet's filter"""
+    other = and_clauses(*[clause for name, clause in facet_clauses.items() if name != dimension])
+    return ([{"$match": other}] if other else []) + stages
+
+def format_facets(raw: dict) -> dict:
+    bpm_upper = dict(zip(BPM_FACET_BOUNDARIES, BPM_FACET_BOUNDARIES[1:]))
+    price_counts = {doc["_id"]: doc["count"] for doc in raw["price"]}
+    return {
+        "category": [{"value": d["_id"], "count": d["count"]} for d in raw["category"]],
+        "key": [{"value": d["_id"], "count": d["count"]} for d in raw["key"]],
+        "sync_type": [{"value": d["_id"], "count": d["count"]} for d in raw["sync_type"]],
+        "bpm": [
+            {"min": d["_id"], "max": bpm_upper.get(d["_id"]), "count": d["count"]}
+            if d["_id"] != "unknown" else {"min": None, "max": None, "count": d["count"]}
+            for d in raw["bpm"]
+        ],
+        "price": {"free": price_counts.get(True, 0), "paid": price_counts.get(False, 0)}
+    }
+
+async def faceted_pack_search(
+    base: dict,
+    facet_clauses: dict,
+    limit: int,
+    sort_name: str,
+    sort_spec=None,
+    cursor: Optional[str] = None,
+    ranked_ids: Optional[List[str]] = None
+) -> dict:
+    """One page of packs plus facet counts, computed in a single $facet aggregation"""
+    items_match = and_clauses(*facet_clauses.values())
+    if ranked_ids is not None:
+        # Relevance order: the cursor holds the position in the ranked ids
+        # the next page starts from
+        position = decode_position_cursor(cursor, "relevance") if cursor else 0
+        items = [
+            {"$match": items_match} if items_match else None,
+            {"$addFields": {"_rank": {"$indexOfArray": [ranked_ids, "$pack_id"]}}},
+            {"$match": {"_rank": {"$gte": position}}} if position else None,
+            {"$sort": {"_rank": 1}},
+            {"$limit": limit + 1},
+            {"$project": PACK_PROJECTION}
+        ]
+    else:
+        after = keyset_filter(sort_spec, decode_cursor(cursor, sort_name)) if cursor else {}
+        items_match = and_clauses(items_match, after)
+        items = [
+            {"$match": items_match} if items_match else None,
+            {"$sort": dict(sort_spec)},
+            {"$limit": limit + 1},
+            {"$project": PACK_PROJECTION}
+        ]
+    items = [stage for stage in items if stage]
+    
+    def count_by(field: str) -> list:
+        return [
+            {"$match": {field: {"$nin": [None, ""]}}},
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1, "_id": 1}}
+        ]
+    
+    pipeline = ([{"$match": base}] if base else []) + [{"$facet": {
+        "items": items,
+        "category": facet_count_pipeline(facet_clauses, "category", count_by("category")),
+        "key": facet_count_pipeline(facet_clauses, "key", count_by("key_normalized")),
+        "sync_type": facet_count_pipeline(facet_clauses, "sync_type", count_by("sync_type")),
+        "bpm": facet_count_pipeline(facet_clauses, "bpm", [
+            {"$bucket": {
+                "groupBy": "$bpm",
+                "boundaries": BPM_FACET_BOUNDARIES,
+                "default": "unknown",
+                "output": {"count": {"$sum": 1}}
+            }}
+        ]),
+        "price": facet_count_pipeline(facet_clauses, "price", [
+            {"$group": {"_id": "$is_free", "count": {"$sum": 1}}}
+        ])
+    }}]
+    
+    result = (await db.sample_packs.aggregate(pipeline).to_list(1))[0]
+    packs = result.pop("items")
+    next_cursor = None
+    if len(packs) > limit:
+        if ranked_ids is not None:
+            next_cursor = encode_cursor("relevance", [packs[limit]["_rank"]])
+        packs = packs[:limit]
+        if ranked_ids is None:
+            next_cursor = encode_cursor(sort_name, [packs[-1].get(field) for field, _ in sort_spec])
+    for pack in packs:
+        pack.pop("_rank", None)
+    return {"items": packs, "facets": format_facets(result), "next_cursor": next_cursor}
+
 @api_router.get("/samples")
 async def list_samples(
-    category: Optional[str] = None,
+    request: Request,
+    response: Response,
+    category: Optional[List[str]] = Query(None),
     search: Optional[str] = None,
     creator_id: Optional[str] = None,
     free_only: bool = False,
     featured_only: bool = False,
     sync_ready_only: bool = False,
     sync_type: Optional[str] = None,
-    skip: int = 0,
+    bpm_min: Optional[int] = None,
+    bpm_max: Optional[int] = None,
+    key: Optional[str] = None,
+    compatible_keys: bool = False,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+    duration_min: Optional[float] = None,
+    duration_max: Optional[float] = None,
+    include_facets: bool = False,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
     limit: int = 50
 ):
-    """List sample packs with filters"""
-    query = {}
+    """List sample packs with filters (cursor paginated, see X-Next-Cursor).
+
+    category may be repeated or comma-separated. With include_facets=true the
+    response is {"items", "facets", "next_cursor"} instead of a plain list.
+    """
+    not_modified = check_not_modified(request, response)
+    if not_modified:
+        return not_modified
+    
+    limit = clamp_limit(limit, 50)
+    categories = [c.strip() for value in (category or []) for c in value.split(",") if c.strip()]
+    base, facet_clauses = build_pack_filters(
+        categories=categories,
+        creator_id=creator_id,
+        free_only=free_only,
+        featured_only=featured_only,
+        sync_ready_only=sync_ready_only,
+        sync_type=sync_type,
+        bpm_min=bpm_min,
+        bpm_max=bpm_max,
+        key=key,
+        compatible=compatible_keys,
+        price_min=price_min,
+        price_max=price_max,
+        duration_min=duration_min,
+        duration_max=duration_max
+    )
     
-    if category:
-        query["category"] = category
-    if creator_id:
-        query["creator_id"] = creator_id
-    if free_only:
-        query["is_free"] = True
-    if featured_only:
-        query["is_featured"] = True
-    if sync_ready_only:
-        query["is_sync_ready"] = True
-    if sync_type:
-        query["sync_type"] = sync_type
+    ranked_ids = None
     if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}},
-            {"tags": {"$regex": search, "$options": "i"}}
-        ]
-    
-    samples = await db.sample_packs.find(query, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    return samples
+        ranked_ids = [pack_id for pack_id, _ in search_index.search(search, SEARCH_MAX_RESULTS)]
+        base["pack_id"] = {"$in": ranked_ids}
+        if sort is not None:
+            ranked_ids = None  # explicit sort overrides relevance order
+    
+    sort = sort or "newest"
+    sort_spec = resolve_pack_sort(sort) if ranked_ids is None else None
+    
+    if include_facets:
+        try:
+            result = await faceted_pack_search(base, facet_clauses, limit, sort, sort_spec, cursor, ranked_ids)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if result["next_cursor"]:
+            response.headers[NEXT_CURSOR_HEADER] = result["next_cursor"]
+        return json_response(result, response)
+    
+    if ranked_ids is not None:
+        # Relevance order: the cursor holds the position in the ranked ids the
+        # next page starts from. Windows of ranked ids from there are matched
+        # against the remaining filters in Mongo until the page is full.
+        position = 0
+        if cursor:
+            try:
+                position = decode_position_cursor(cursor, "relevance")
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+        page = []
+        window_size = limit + 1
+        while position < len(ranked_ids):
+            window = ranked_ids[position:position + window_size]
+            query = and_clauses({**base, "pack_id": {"$in": window}}, *facet_clauses.values())
+            found = await db.sample_packs.find(query, PACK_PROJECTION).to_list(len(window))
+            packs_by_id = {pack["pack_id"]: pack for pack in found}
+            for i, pack_id in enumerate(window):
+                if pack_id not in packs_by_id:
+                    continue
+                if len(page) == limit:
+                    response.headers[NEXT_CURSOR_HEADER] = encode_cursor("relevance", [position + i])
+                    return json_response(page, response)
+                page.append(packs_by_id[pack_id])
+            position += len(window)
+            # Selective filters match few packs per window: widen it
+            window_size *= 2
+        return json_response(page, response)
+    
+    query = and_clauses(base, *facet_clauses.values())
+    
+    return json_response(await paginate(response, db.sample_packs, query, sort, sort_spec, limit, cursor, PACK_PROJECTION), response)
 
 @api_router.get("/samples/{pack_id}")
-async def get_sample(pack_id: str):
+async def get_sample(pack_id: str, request: Request, response: Response):
     """Get single sample pack"""
-    pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0})
+    not_modified = check_not_modified(request, response)
+    if not_modified:
+        return not_modified
+    
+    pack = await get_pack(pack_id)
     if not pack:
         raise HTTPException(status_code=404, detail="Sample pack not found")
-    return pack
+    return json_response(pack, response)
 
 @api_router.get("/samples/{pack_id}/audio")
-async def get_sample_audio(pack_id: str):
+async def get_sample_audio(pack_id: str, request: Request):
     """Serve audio file for preview"""
-    pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0})
+    pack = await get_pack(pack_id)
     if not pack:
         raise HTTPException(status_code=404, detail="Sample pack not found")
     
-    file_path = ROOT_DIR / pack["audio_file_path"]
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Audio file not found")
-    
-    return FileResponse(
-        path=file_path,
-        media_type="audio/mpeg",
-        headers={"Accept-Ranges": "bytes"}
-    )
+    return await serve_stored(request, pack["audio_file_path"], "audio/mpeg", not_found="Audio file not found")
 
 @api_router.get("/samples/{pack_id}/cover")
-async def get_sample_cover(pack_id: str):
+async def get_sample_cover(pack_id: str, request: Request):
     """Serve cover image"""
-    pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0})
+    pack = await get_pack(pack_id)
     if not pack:
         raise HTTPException(status_code=404, detail="Sample pack not found")
     
@@ -454,21 +1254,17 @@ async def get_sample_cover(pack_id: str):
     if not cover_path:
         raise HTTPException(status_code=404, detail="Cover image not found")
     
-    file_path = ROOT_DIR / cover_path
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Cover image file not found")
-    
     # Determine media type
     ext = cover_path.split(".")[-1].lower()
     media_types = {"jpg": "image/jpeg", "jpeg": "image/jpeg", "png": "image/png", "gif": "image/gif", "webp": "image/webp"}
     media_type = media_types.get(ext, "image/jpeg")
     
-    return FileResponse(path=file_path, media_type=media_type)
+    return await serve_stored(request, cover_path, media_type, not_found="Cover image file not found")
 
 @api_router.get("/samples/{pack_id}/preview")
-async def get_sample_preview(pack_id: str):
+async def get_sample_preview(pack_id: str, request: Request):
     """Serve preview audio file"""
-    pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0})
+    pack = await get_pack(pack_id)
     if not pack:
         raise HTTPException(status_code=404, detail="Sample pack not found")
     
@@ -477,19 +1273,96 @@ async def get_sample_preview(pack_id: str):
         # Fall back to main audio file for non-zip files
         if pack.get("file_type") != "zip":
             preview_path = pack.get("audio_file_path")
+        else:
+            # ZIP packs without a preview: play their first audio file
+            doc = await db.sample_packs.find_one(
+                {"pack_id": pack_id},
+                {"_id": 0, "zip_manifest": {"$elemMatch": {"audio": {"$exists": True}, "encrypted": {"$exists": False}}}}
+            )
+            entries = (doc or {}).get("zip_manifest")
+            if entries:
+                return await serve_zip_member(request, pack, entries[0], inline=True)
         if not preview_path:
             raise HTTPException(status_code=404, detail="Preview audio not found")
     
-    file_path = ROOT_DIR / preview_path
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Preview audio file not found")
+    return await serve_stored(request, preview_path, "audio/mpeg", not_found="Preview audio file not found")
+
+@api_router.get("/samples/{pack_id}/contents/{index}/preview")
+async def get_sample_member_preview(pack_id: str, index: int, request: Request):
+    """Stream one audio file from inside a ZIP pack for auditioning (Range supported)"""
+    pack, entry = await get_zip_entry(pack_id, index)
+    if "audio" not in entry:
+        raise HTTPException(status_code=400, detail="Only audio files can be previewed")
+    return await serve_zip_member(request, pack, entry, inline=True)
+
+@api_router.get("/samples/{pack_id}/contents/{index}/download")
+async def download_sample_member(
+    pack_id: str,
+    index: int,
+    request: Request,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Download a single file from inside a ZIP pack (same access rules as the pack)"""
+    user = await require_auth(request, session_token)
+    pack, entry = await get_zip_entry(pack_id, index)
+    if not await check_pack_access(user, pack):
+        raise HTTPException(status_code=403, detail="You don't have access to this pack")
     
-    return FileResponse(
-        path=file_path,
-        media_type="audio/mpeg",
-        headers={"Accept-Ranges": "bytes"}
+    response = await serve_zip_member(request, pack, entry, inline=False)
+    if starts_download(request, response):
+        await download_recorder.record(user.user_id, pack_id, file=entry["name"])
+    return response
+
+@api_router.get("/samples/{pack_id}/peaks")
+async def get_sample_peaks(pack_id: str, request: Request):
+    """Serve precomputed waveform peaks so players can draw without fetching audio"""
+    pack = await get_pack(pack_id)
+    if not pack:
+        raise HTTPException(status_code=404, detail="Sample pack not found")
+    
+    return await serve_stored(
+        request, peaks_key(pack_id), "application/json",
+        headers={"Cache-Control": PEAKS_CACHE_CONTROL},
+        not_found="Waveform peaks not available"
     )
 
+@api_router.get("/samples/{pack_id}/contents")
+async def get_sample_contents(
+    pack_id: str,
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100
+):
+    """List the files inside a ZIP pack from its manifest (cursor paginated)"""
+    not_modified = check_not_modified(request, response)
+    if not_modified:
+        return not_modified
+    
+    limit = clamp_limit(limit, 100)
+    offset = 0
+    if cursor:
+        try:
+            offset = decode_position_cursor(cursor, "contents")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    pack = await db.sample_packs.find_one(
+        {"pack_id": pack_id},
+        {"_id": 0, "file_type": 1, "zip_file_count": 1, "zip_manifest": {"$slice": [offset, limit]}}
+    )
+    if not pack:
+        raise HTTPException(status_code=404, detail="Sample pack not found")
+    if pack.get("file_type") != "zip":
+        raise HTTPException(status_code=404, detail="Pack is not a ZIP archive")
+    if "zip_manifest" not in pack:
+        raise HTTPException(status_code=404, detail="Contents index not available")
+    
+    entries = pack["zip_manifest"]
+    if offset + len(entries) < pack.get("zip_file_count", 0) and len(entries) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor("contents", [offset + limit])
+    return json_response(entries, response)
+
 @api_router.get("/samples/{pack_id}/download")
 async def download_sample(
     pack_id: str,
@@ -500,67 +1373,26 @@ async def download_sample(
     user = await require_auth(request, session_token)
     
     # Get pack
-    pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0})
+    pack = await get_pack(pack_id)
     if not pack:
         raise HTTPException(status_code=404, detail="Sample pack not found")
     
     # Check access
-    has_access = False
-    
-    # Free packs
-    if pack["is_free"]:
-        has_access = True
-    else:
-        # Check if user has purchased this pack
-        purchase = await db.purchases.find_one(
-            {"user_id": user.user_id, "pack_id": pack_id},
-            {"_id": 0}
-        )
-        if purchase:
-            has_access = True
-        else:
-            # Check subscription
-            has_subscription = await check_subscription(user.user_id)
-            if has_subscription:
-                has_access = True
-    
-    if not has_access:
+    if not await check_pack_access(user, pack):
         raise HTTPException(status_code=403, detail="You don't have access to this pack")
     
-    # Record download
-    download_doc = {
-        "download_id": f"dl_{uuid.uuid4().hex[:12]}",
-        "user_id": user.user_id,
-        "pack_id": pack_id,
-        "downloaded_at": datetime.now(timezone.utc)
-    }
-    await db.downloads.insert_one(download_doc)
-    
-    # Increment download count
-    await db.sample_packs.update_one(
-        {"pack_id": pack_id},
-        {"$inc": {"download_count": 1}}
-    )
-    
-    # Return file
-    file_path = ROOT_DIR / pack["audio_file_path"]
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    # Determine media type based on file type
+    # Return file, determining media type based on file type
     file_type = pack.get("file_type", "audio")
     if file_type == "zip":
-        return FileResponse(
-            path=file_path,
-            filename=f"{pack['title']}.zip",
-            media_type="application/zip"
-        )
+        filename, media_type = f"{pack['title']}.zip", "application/zip"
     else:
-        return FileResponse(
-            path=file_path,
-            filename=f"{pack['title']}.mp3",
-            media_type="audio/mpeg"
-        )
+        filename, media_type = f"{pack['title']}.mp3", "audio/mpeg"
+    response = await serve_stored(request, pack["audio_file_path"], media_type, filename=filename, inline=False)
+    
+    # Recorded once the file is known to exist; written in the background
+    if starts_download(request, response):
+        await download_recorder.record(user.user_id, pack_id)
+    return response
 
 # ============================================
 # PURCHASES & SUBSCRIPTIONS
@@ -577,7 +1409,7 @@ async def create_purchase_checkout(
     user = await require_auth(request, session_token)
     
     # Get pack
-    pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0})
+    pack = await get_pack(pack_id)
     if not pack:
         raise HTTPException(status_code=404, detail="Sample pack not found")
     
@@ -625,6 +1457,28 @@ async def create_purchase_checkout(
     
     return {"url": session.url, "session_id": session.session_id}
 
+async def record_purchase(user_id: str, transaction: Dict) -> None:
+    """Create the purchase for a paid checkout and credit the pack's creator.
+    Keyed on the checkout session, so concurrent status checks create one."""
+    pack_id = transaction["metadata"]["pack_id"]
+    purchase_doc = {
+        "purchase_id": f"pur_{uuid.uuid4().hex[:12]}",
+        "user_id": user_id,
+        "pack_id": pack_id,
+        "amount": transaction["amount"],
+        "created_at": datetime.now(timezone.utc)
+    }
+    if not await ledger.create_purchase(transaction["session_id"], purchase_doc):
+        return
+    gross = to_cents(purchase_doc["amount"])
+    await platform_stats.increment(purchases=1, revenue_cents=gross, creator_earnings_cents=creator_cut(gross))
+    
+    pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0, "creator_id": 1})
+    creator_id = pack.get("creator_id") if pack else None
+    if creator_id:
+        await ledger.record_sale(creator_id, purchase_doc)
+    await analytics.add_purchase(pack_id, creator_id, gross, purchase_doc["created_at"])
+
 @api_router.get("/purchase/status/{session_id}")
 async def check_purchase_status(
     session_id: str,
@@ -656,17 +1510,7 @@ async def check_purchase_status(
             {"$set": {"payment_status": "paid"}}
         )
         
-        # Create purchase record
-        pack_id = transaction["metadata"]["pack_id"]
-        purchase_doc = {
-            "purchase_id": f"pur_{uuid.uuid4().hex[:12]}",
-            "user_id": user.user_id,
-            "pack_id": pack_id,
-            "amount": transaction["amount"],
-            "stripe_session_id": session_id,
-            "created_at": datetime.now(timezone.utc)
-        }
-        await db.purchases.insert_one(purchase_doc)
+        await record_purchase(user.user_id, transaction)
     
     return {
         "status": checkout_status.status,
@@ -771,6 +1615,7 @@ async def check_subscription_status(
             "expires_at": datetime.now(timezone.utc) + timedelta(days=30)
         }
         await db.subscriptions.insert_one(subscription_doc)
+        await platform_stats.increment(active_subscriptions=1)
     
     return {
         "status": checkout_status.status,
@@ -831,16 +1676,28 @@ async def remove_favorite(pack_id: str, request: Request, session_token: Optiona
     return {"message": "Removed from favorites"}
 
 @api_router.get("/favorites")
-async def list_favorites(request: Request, session_token: Optional[str] = Cookie(None)):
-    """List user's favorite packs"""
+async def list_favorites(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    session_token: Optional[str] = Cookie(None)
+):
+    """List user's favorite packs (cursor paginated)"""
     user = await require_auth(request, session_token)
     
-    favorites = await db.favorites.find({"user_id": user.user_id}, {"_id": 0}).to_list(100)
+    favorites = await paginate(
+        response, db.favorites, {"user_id": user.user_id},
+        "favorites", FAVORITES_SORT, clamp_limit(limit, 100), cursor
+    )
     pack_ids = [f["pack_id"] for f in favorites]
+    if not pack_ids:
+        return []
     
-    packs = await db.sample_packs.find({"pack_id": {"$in": pack_ids}}, {"_id": 0}).to_list(100)
+    packs = await db.sample_packs.find({"pack_id": {"$in": pack_ids}}, PACK_PROJECTION).to_list(len(pack_ids))
+    packs_by_id = {pack["pack_id"]: pack for pack in packs}
     
-    return packs
+    return json_response([packs_by_id[pack_id] for pack_id in pack_ids if pack_id in packs_by_id], response)
 
 @api_router.post("/collections")
 async def create_collection(
@@ -862,16 +1719,24 @@ async def create_collection(
     }
     await db.collections.insert_one(collection_doc)
     
-    return serialize_doc(collection_doc)
+    return json_response(without_id(collection_doc))
 
 @api_router.get("/collections")
-async def list_collections(request: Request, session_token: Optional[str] = Cookie(None)):
-    """List user's collections"""
+async def list_collections(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    session_token: Optional[str] = Cookie(None)
+):
+    """List user's collections (cursor paginated)"""
     user = await require_auth(request, session_token)
     
-    collections = await db.collections.find({"user_id": user.user_id}, {"_id": 0}).to_list(100)
-    
-    return collections
+    docs = await paginate(
+        response, db.collections, {"user_id": user.user_id},
+        "collections", COLLECTIONS_SORT, clamp_limit(limit, 100), cursor
+    )
+    return json_response(docs, response)
 
 @api_router.post("/collections/{collection_id}/packs/{pack_id}")
 async def add_to_collection(
@@ -917,6 +1782,84 @@ async def remove_from_collection(
     
     return {"message": "Removed from collection"}
 
+# ============================================
+# BUNDLE DOWNLOADS
+# ============================================
+
+MAX_BUNDLE_PACKS = int(os.environ.get('MAX_BUNDLE_PACKS', '100'))
+
+async def stream_bundle(user: User, pack_ids: List[str], bundle_name: str) -> StreamingResponse:
+    """Check access to every pack at once, record the downloads, then stream one ZIP"""
+    pack_ids = list(dict.fromkeys(pack_ids))
+    if not pack_ids:
+        raise HTTPException(status_code=400, detail="No packs to download")
+    if len(pack_ids) > MAX_BUNDLE_PACKS:
+        raise HTTPException(status_code=400, detail=f"A bundle can hold at most {MAX_BUNDLE_PACKS} packs")
+    
+    packs = await db.sample_packs.find(
+        {"pack_id": {"$in": pack_ids}},
+        {"_id": 0, "pack_id": 1, "title": 1, "is_free": 1, "audio_file_path": 1}
+    ).to_list(len(pack_ids))
+    packs_by_id = {pack["pack_id"]: pack for pack in packs}
+    missing = [pack_id for pack_id in pack_ids if pack_id not in packs_by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Sample packs not found: {', '.join(missing)}")
+    packs = [packs_by_id[pack_id] for pack_id in pack_ids]
+    
+    accessible = await accessible_pack_ids(user, packs)
+    denied = [pack["pack_id"] for pack in packs if pack["pack_id"] not in accessible]
+    if denied:
+        raise HTTPException(status_code=403, detail=f"You don't have access to: {', '.join(denied)}")
+    
+    keys = [pack["audio_file_path"] for pack in packs]
+    if not all(await asyncio.gather(*(asyncio.to_thread(storage.exists, key) for key in keys))):
+        raise HTTPException(status_code=404, detail="File not found")
+    names = unique_names(
+        safe_name(pack["title"], pack["pack_id"]) + Path(key).suffix.lower()
+        for pack, key in zip(packs, keys)
+    )
+    
+    for pack in packs:
+        await download_recorder.record(user.user_id, pack["pack_id"])
+    
+    return StreamingResponse(
+        iter_zip_bundle(storage, list(zip(names, keys))),
+        media_type="application/zip",
+        headers={"Content-Disposition": content_disposition(f"{safe_name(bundle_name, 'bundle')}.zip")}
+    )
+
+@api_router.get("/bundles/download")
+async def download_bundle(
+    request: Request,
+    pack_id: List[str] = Query(...),
+    session_token: Optional[str] = Cookie(None)
+):
+    """Download several packs as one ZIP streamed while it's built.
+
+    pack_id may be repeated or comma-separated.
+    """
+    user = await require_auth(request, session_token)
+    pack_ids = [p.strip() for value in pack_id for p in value.split(",") if p.strip()]
+    return await stream_bundle(user, pack_ids, "SoundDrops bundle")
+
+@api_router.get("/collections/{collection_id}/download")
+async def download_collection(
+    collection_id: str,
+    request: Request,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Download every pack in one of the user's collections as a streamed ZIP"""
+    user = await require_auth(request, session_token)
+    
+    collection = await db.collections.find_one(
+        {"collection_id": collection_id, "user_id": user.user_id},
+        {"_id": 0, "name": 1, "pack_ids": 1}
+    )
+    if not collection:
+        raise HTTPException(status_code=404, detail="Collection not found")
+    
+    return await stream_bundle(user, collection["pack_ids"], collection["name"])
+
 # ============================================
 # CREATOR ENDPOINTS
 # ============================================
@@ -934,9 +1877,140 @@ async def apply_for_creator(request: Request, session_token: Optional[str] = Coo
         {"user_id": user.user_id},
         {"$set": {"role": "creator", "creator_approved": False}}
     )
+    session_cache.invalidate_user(user.user_id)
     
     return {"message": "Application submitted. Awaiting admin approval."}
 
+# ============================================
+# PACK UPLOAD INGEST
+# ============================================
+
+def extension_of(upload: UploadFile) -> str:
+    return upload.filename.split(".")[-1].lower()
+
+async def read_zip_fields(zip_path: Path) -> Dict[str, Any]:
+    """Index the central directory now so contents can be listed without extraction"""
+    try:
+        manifest = await asyncio.to_thread(read_zip_manifest, str(zip_path))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Invalid ZIP archive")
+    return {
+        "zip_manifest": manifest["entries"],
+        "zip_file_count": manifest["file_count"],
+        "zip_total_size": manifest["total_size"],
+        "zip_manifest_truncated": manifest["truncated"],
+    }
+
+def pack_fields(
+    title: str,
+    description: str,
+    category: str,
+    tags: str,
+    price: float,
+    is_free: bool,
+    is_featured: bool,
+    is_sync_ready: bool,
+    sync_type: Optional[str],
+    bpm: Optional[int],
+    key: Optional[str]
+) -> Dict[str, Any]:
+    """Pack fields from an upload form, validated"""
+    if price < 0:
+        raise HTTPException(status_code=400, detail="Price cannot be negative")
+    return {
+        "title": title,
+        "description": description,
+        "category": category,
+        "tags": [t.strip() for t in tags.split(",") if t.strip()],
+        "price": price if not is_free else 0.0,
+        "is_free": is_free or price == 0,
+        "is_featured": is_featured,
+        "is_sync_ready": is_sync_ready,
+        "sync_type": sync_type if is_sync_ready else None,
+        "bpm": bpm,
+        "key": key,
+        "key_normalized": normalize_key(key),
+    }
+
+async def ingest_pack(
+    fields: Dict[str, Any],
+    creator_id: str,
+    creator_name: str,
+    audio_filename: str,
+    stage_audio: Callable[[Path, str, int], Awaitable[StagedFile]],
+    cover_image: UploadFile,
+    preview_audio: Optional[UploadFile]
+):
+    """Shared by the creator and admin upload routes and resumable-upload
+    finalization. stage_audio(final_path, field, max_bytes) stages the main
+    file: from the multipart part, or from a completed resumable upload.
+
+    The audio/ZIP, cover and preview parts are staged concurrently off the
+    event loop, size-limited and hashed, then moved into the blob store
+    together only once the ZIP has been validated, so no half-written or
+    orphaned files become visible.
+    """
+    pack_id = f"pack_{uuid.uuid4().hex[:12]}"
+    file_extension = audio_filename.split(".")[-1].lower()
+    is_zip = file_extension == "zip"
+    
+    extensions = [file_extension, extension_of(cover_image)]
+    jobs = [
+        stage_audio(blob_store.staging_path(f"{pack_id}.{file_extension}"), "zip" if is_zip else "audio", UPLOAD_LIMITS["zip" if is_zip else "audio"]),
+        stage_upload(cover_image, blob_store.staging_path(f"{pack_id}.{extensions[1]}"), "cover", UPLOAD_LIMITS["cover"]),
+    ]
+    has_preview = bool(preview_audio and preview_audio.filename)
+    if has_preview:
+        extensions.append(extension_of(preview_audio))
+        jobs.append(stage_upload(preview_audio, blob_store.staging_path(f"{pack_id}_preview.{extensions[2]}"), "preview", UPLOAD_LIMITS["preview"]))
+    
+    try:
+        staged = await stage_all(*jobs)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    main = staged[0]
+    
+    zip_fields = {}
+    if is_zip:
+        try:
+            zip_fields = await read_zip_fields(main.temp_path)
+        except BaseException:
+            discard_all(staged)
+            raise
+    # Identical content already in the store is referenced, not written again
+    paths = await blob_store.put_all(list(zip(staged, extensions)))
+    file_path, cover_path = paths[0], paths[1]
+    # Preview audio is optional; single audio files preview themselves
+    preview_path = paths[2] if has_preview else (None if is_zip else file_path)
+    
+    pack_doc = {
+        "pack_id": pack_id,
+        **fields,
+        "creator_id": creator_id,
+        "creator_name": creator_name,
+        "audio_file_path": file_path,
+        "cover_image_path": cover_path,
+        "preview_audio_path": preview_path,
+        "file_type": "zip" if is_zip else "audio",
+        "duration": 0.0,
+        "file_size": main.size,
+        "file_sha256": main.sha256,
+        "download_count": 0,
+        "created_at": datetime.now(timezone.utc),
+        **zip_fields
+    }
+    try:
+        await db.sample_packs.insert_one(pack_doc)
+    except BaseException:
+        await blob_store.release_pack(pack_doc)
+        raise
+    await pack_changed(pack_id)
+    await platform_stats.increment(packs=1)
+    spawn_background(process_pack_media(pack_id))
+    
+    # Return serialized document (without _id or the manifest)
+    return json_response(public_pack(pack_doc))
+
 @api_router.post("/creator/packs")
 async def upload_pack(
     title: str = Form(...),
@@ -958,137 +2032,284 @@ async def upload_pack(
     """Upload new sample pack (creator only) - supports audio files and ZIP archives"""
     user = await require_role(request, "creator", session_token)
     
-    # Validate price
-    if price < 0:
-        raise HTTPException(status_code=400, detail="Price cannot be negative")
-    
-    # Save file
-    pack_id = f"pack_{uuid.uuid4().hex[:12]}"
-    file_extension = audio_file.filename.split(".")[-1].lower()
-    
-    # Handle ZIP files
-    if file_extension == "zip":
-        # Save ZIP file
-        zip_filename = f"{pack_id}.zip"
-        zip_path = ZIP_STORAGE_PATH / zip_filename
-        
-        with open(zip_path, "wb") as f:
-            shutil.copyfileobj(audio_file.file, f)
-        
-        file_size = os.path.getsize(zip_path)
-        file_path = f"zip_files/{zip_filename}"
-    else:
-        # Save audio file
-        audio_filename = f"{pack_id}.{file_extension}"
-        audio_path = AUDIO_STORAGE_PATH / audio_filename
-        
-        with open(audio_path, "wb") as f:
-            shutil.copyfileobj(audio_file.file, f)
-        
-        file_size = os.path.getsize(audio_path)
-        file_path = f"audio_files/{audio_filename}"
-    
-    # Save cover image (required)
-    cover_ext = cover_image.filename.split(".")[-1].lower()
-    cover_filename = f"{pack_id}.{cover_ext}"
-    cover_path = COVERS_STORAGE_PATH / cover_filename
-    with open(cover_path, "wb") as f:
-        shutil.copyfileobj(cover_image.file, f)
-    
-    # Save preview audio (optional, but required for ZIP files)
-    preview_path = None
-    if preview_audio and preview_audio.filename:
-        preview_ext = preview_audio.filename.split(".")[-1].lower()
-        preview_filename = f"{pack_id}_preview.{preview_ext}"
-        preview_file_path = PREVIEWS_STORAGE_PATH / preview_filename
-        with open(preview_file_path, "wb") as f:
-            shutil.copyfileobj(preview_audio.file, f)
-        preview_path = f"previews/{preview_filename}"
-    elif file_extension != "zip":
-        # For single audio files, use the main file as preview
-        preview_path = file_path
-    
-    # Parse tags
-    tags_list = [t.strip() for t in tags.split(",") if t.strip()]
-    
-    # Create pack
-    pack_doc = {
-        "pack_id": pack_id,
-        "title": title,
-        "description": description,
-        "category": category,
-        "tags": tags_list,
-        "price": price,
-        "is_free": price == 0,
-        "is_featured": is_featured,
-        "is_sync_ready": is_sync_ready,
-        "sync_type": sync_type if is_sync_ready else None,
-        "bpm": bpm,
-        "key": key,
-        "creator_id": user.user_id,
-        "creator_name": user.name,
-        "audio_file_path": file_path,
-        "cover_image_path": f"covers/{cover_filename}",
-        "preview_audio_path": preview_path,
-        "file_type": "zip" if file_extension == "zip" else "audio",
-        "duration": 0.0,
-        "file_size": file_size,
-        "download_count": 0,
-        "created_at": datetime.now(timezone.utc)
+    fields = pack_fields(title, description, category, tags, price, False, is_featured, is_sync_ready, sync_type, bpm, key)
+    return await ingest_pack(
+        fields, user.user_id, user.name,
+        audio_file.filename, partial(stage_upload, audio_file), cover_image, preview_audio
+    )
+
+# ============================================
+# RESUMABLE UPLOADS (tus 1.0)
+# ============================================
+
+def tus_headers(**headers) -> Dict[str, str]:
+    return {"Tus-Resumable": TUS_VERSION, "Cache-Control": "no-store", **{k.replace("_", "-"): str(v) for k, v in headers.items()}}
+
+def upload_part_path(upload_id: str) -> Path:
+    return UPLOADS_STORAGE_PATH / f"{upload_id}.part"
+
+def upload_limit(filename: str) -> int:
+    return UPLOAD_LIMITS["zip" if filename.lower().endswith(".zip") else "audio"]
+
+def http_date(dt: datetime) -> str:
+    return dt.astimezone(timezone.utc).strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+async def find_upload(upload_id: str, user: User) -> Dict[str, Any]:
+    upload = await db.uploads.find_one(
+        {"upload_id": upload_id, "user_id": user.user_id, "expires_at": {"$gt": datetime.now(timezone.utc)}},
+        {"_id": 0}
+    )
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found", headers=tus_headers())
+    return upload
+
+async def lock_upload(upload_id: str, user: User, offset: Optional[int] = None) -> Dict[str, Any]:
+    """Claim an upload for one request. Raises 409 if the offset doesn't match
+    and 423 while another request holds it."""
+    now = datetime.now(timezone.utc)
+    query = {
+        "upload_id": upload_id,
+        "user_id": user.user_id,
+        "expires_at": {"$gt": now},
+        "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}],
     }
-    await db.sample_packs.insert_one(pack_doc)
+    if offset is not None:
+        query["offset"] = offset
+    upload = await db.uploads.find_one_and_update(
+        query,
+        {"$set": {"locked_until": now + timedelta(seconds=UPLOAD_LOCK_SECONDS)}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if upload:
+        return upload
+    upload = await find_upload(upload_id, user)
+    if offset is not None and upload["offset"] != offset:
+        raise HTTPException(status_code=409, detail="Upload-Offset does not match", headers=tus_headers(Upload_Offset=upload["offset"]))
+    raise HTTPException(status_code=423, detail="Upload is busy", headers=tus_headers())
+
+async def unlock_upload(upload_id: str, updates: Optional[Dict[str, Any]] = None) -> None:
+    await db.uploads.update_one({"upload_id": upload_id}, {"$set": updates or {}, "$unset": {"locked_until": ""}})
+
+async def delete_upload(upload_id: str) -> None:
+    await db.uploads.delete_one({"upload_id": upload_id})
+    await asyncio.to_thread(upload_part_path(upload_id).unlink, missing_ok=True)
+
+@api_router.options("/uploads")
+async def upload_capabilities():
+    """tus discovery"""
+    return Response(status_code=204, headers=tus_headers(
+        Tus_Version=TUS_VERSION,
+        Tus_Extension=TUS_EXTENSIONS,
+        Tus_Max_Size=max(UPLOAD_LIMITS["zip"], UPLOAD_LIMITS["audio"]),
+        Tus_Checksum_Algorithm=",".join(CHECKSUM_ALGORITHMS)
+    ))
+
+@api_router.post("/uploads")
+async def create_upload(request: Request, session_token: Optional[str] = Cookie(None)):
+    """Start a resumable upload of a pack's main file (audio or ZIP).
+
+    Upload-Length is required; Upload-Metadata must carry the filename.
+    Returns the upload's URL in Location.
+    """
+    user = await require_role(request, "creator", session_token)
+    try:
+        length = int(request.headers["upload-length"])
+        metadata = parse_metadata(request.headers.get("upload-metadata"))
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Valid Upload-Length and Upload-Metadata headers are required", headers=tus_headers())
+    filename = metadata.get("filename", "")
+    if length < 0 or "." not in filename:
+        raise HTTPException(status_code=400, detail="Upload-Metadata must include a filename with an extension", headers=tus_headers())
+    if length > upload_limit(filename):
+        raise HTTPException(status_code=413, detail=str(UploadTooLarge("upload", upload_limit(filename))), headers=tus_headers())
+    
+    upload_id = f"upl_{uuid.uuid4().hex[:16]}"
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(hours=UPLOAD_EXPIRY_HOURS)
+    await asyncio.to_thread(upload_part_path(upload_id).touch)
+    await db.uploads.insert_one({
+        "upload_id": upload_id,
+        "user_id": user.user_id,
+        "filename": filename,
+        "length": length,
+        "offset": 0,
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": expires_at
+    })
+    return Response(status_code=201, headers=tus_headers(
+        Location=str(request.url_for("get_upload_offset", upload_id=upload_id)),
+        Upload_Offset=0,
+        Upload_Expires=http_date(expires_at)
+    ))
+
+@api_router.head("/uploads/{upload_id}")
+async def get_upload_offset(upload_id: str, request: Request, session_token: Optional[str] = Cookie(None)):
+    """Progress of a resumable upload: how many bytes the server has"""
+    user = await require_role(request, "creator", session_token)
+    upload = await find_upload(upload_id, user)
+    return Response(status_code=200, headers=tus_headers(
+        Upload_Offset=upload["offset"],
+        Upload_Length=upload["length"],
+        Upload_Expires=http_date(upload["expires_at"])
+    ))
+
+@api_router.patch("/uploads/{upload_id}")
+async def patch_upload(upload_id: str, request: Request, session_token: Optional[str] = Cookie(None)):
+    """Append a chunk at Upload-Offset, verifying Upload-Checksum if given.
+
+    A chunk that fails its checksum is discarded (status 460). Without a
+    checksum, whatever arrived before a dropped connection is kept, so the
+    client resumes from there.
+    """
+    user = await require_role(request, "creator", session_token)
+    if request.headers.get("content-type") != "application/offset+octet-stream":
+        raise HTTPException(status_code=415, detail="Content-Type must be application/offset+octet-stream", headers=tus_headers())
+    try:
+        offset = int(request.headers["upload-offset"])
+        checksum = parse_checksum(request.headers.get("upload-checksum"))
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid upload headers: {e}", headers=tus_headers())
+    
+    upload = await lock_upload(upload_id, user, offset)
+    writer = ChunkWriter(upload_part_path(upload_id), offset, upload["length"], checksum)
+    keep = False
+    error = None
+    try:
+        await asyncio.to_thread(writer.open)
+        buffer = bytearray()
+        async for chunk in request.stream():
+            buffer += chunk
+            if len(buffer) >= UPLOAD_WRITE_BUFFER:
+                await asyncio.to_thread(writer.write, bytes(buffer))
+                buffer.clear()
+        if buffer:
+            await asyncio.to_thread(writer.write, bytes(buffer))
+        writer.verify()
+        keep = True
+    except ClientDisconnect:
+        keep = checksum is None
+    except UploadOverflow:
+        error = HTTPException(status_code=413, detail="Chunk runs past Upload-Length", headers=tus_headers())
+    except ChecksumMismatch:
+        error = HTTPException(status_code=CHECKSUM_MISMATCH_STATUS, detail="Checksum mismatch", headers=tus_headers())
+    except FileNotFoundError:
+        error = HTTPException(status_code=404, detail="Upload not found", headers=tus_headers())
+    finally:
+        new_offset = await asyncio.to_thread(writer.close, keep)
+        now = datetime.now(timezone.utc)
+        expires_at = now + timedelta(hours=UPLOAD_EXPIRY_HOURS)
+        await unlock_upload(upload_id, {"offset": new_offset, "updated_at": now, "expires_at": expires_at})
+    if error:
+        raise error
+    return Response(status_code=204, headers=tus_headers(Upload_Offset=new_offset, Upload_Expires=http_date(expires_at)))
+
+@api_router.delete("/uploads/{upload_id}")
+async def cancel_upload(upload_id: str, request: Request, session_token: Optional[str] = Cookie(None)):
+    """tus termination"""
+    user = await require_role(request, "creator", session_token)
+    await lock_upload(upload_id, user)
+    await delete_upload(upload_id)
+    return Response(status_code=204, headers=tus_headers())
+
+@api_router.post("/uploads/{upload_id}/pack")
+async def finalize_upload(
+    upload_id: str,
+    title: str = Form(...),
+    description: str = Form(...),
+    category: str = Form(...),
+    tags: str = Form(""),
+    price: float = Form(...),
+    bpm: Optional[int] = Form(None),
+    key: Optional[str] = Form(None),
+    is_featured: bool = Form(False),
+    is_sync_ready: bool = Form(False),
+    sync_type: Optional[str] = Form(None),
+    cover_image: UploadFile = File(...),
+    preview_audio: Optional[UploadFile] = File(None),
+    request: Request = None,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Create a pack from a completed resumable upload, exactly like POST /creator/packs"""
+    user = await require_role(request, "creator", session_token)
+    fields = pack_fields(title, description, category, tags, price, False, is_featured, is_sync_ready, sync_type, bpm, key)
     
-    # Return serialized document (without _id)
-    return serialize_doc(pack_doc)
+    upload = await lock_upload(upload_id, user)
+    try:
+        if upload["offset"] != upload["length"]:
+            raise HTTPException(status_code=409, detail="Upload is not complete", headers=tus_headers(Upload_Offset=upload["offset"]))
+        response = await ingest_pack(
+            fields, user.user_id, user.name,
+            upload["filename"], partial(stage_file, upload_part_path(upload_id)), cover_image, preview_audio
+        )
+    except BaseException:
+        # Leave the upload in place so finalization can be retried
+        await unlock_upload(upload_id)
+        raise
+    await delete_upload(upload_id)
+    return response
+
+async def collect_expired_uploads() -> int:
+    """Remove uploads that haven't been patched or finalized before expiring"""
+    now = datetime.now(timezone.utc)
+    expired = await db.uploads.find(
+        {"expires_at": {"$lte": now}, "$or": [{"locked_until": None}, {"locked_until": {"$lt": now}}]},
+        {"_id": 0, "upload_id": 1}
+    ).to_list(None)
+    for upload in expired:
+        await delete_upload(upload["upload_id"])
+    return len(expired)
+
+async def collect_expired_uploads_periodically():
+    while True:
+        try:
+            removed = await collect_expired_uploads()
+            if removed:
+                logger.info(f"Removed {removed} expired uploads")
+        except Exception as e:
+            logger.error(f"Upload garbage collection failed: {e}")
+        await asyncio.sleep(UPLOAD_GC_INTERVAL_SECONDS)
 
 @api_router.get("/creator/packs")
-async def list_creator_packs(request: Request, session_token: Optional[str] = Cookie(None)):
-    """List creator's own packs"""
+async def list_creator_packs(
+    request: Request,
+    response: Response,
+    sort: str = "newest",
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    session_token: Optional[str] = Cookie(None)
+):
+    """List creator's own packs (cursor paginated)"""
     user = await require_role(request, "creator", session_token)
     
-    packs = await db.sample_packs.find({"creator_id": user.user_id}, {"_id": 0}).to_list(100)
-    
-    return packs
+    docs = await paginate(
+        response, db.sample_packs, {"creator_id": user.user_id},
+        sort, resolve_pack_sort(sort), clamp_limit(limit, 100), cursor, PACK_PROJECTION
+    )
+    return json_response(docs, response)
 
 @api_router.get("/creator/earnings")
 async def get_creator_earnings(request: Request, session_token: Optional[str] = Cookie(None)):
     """Get creator earnings summary"""
     user = await require_role(request, "creator", session_token)
     
-    # Get all creator's pack IDs only
-    packs = await db.sample_packs.find({"creator_id": user.user_id}, {"_id": 0, "pack_id": 1}).to_list(1000)
-    pack_ids = [p["pack_id"] for p in packs]
+    summary = balance_summary(await ledger.balance(user.user_id))
     
-    if not pack_ids:
-        return {
-            "total_packs": 0,
-            "total_purchases": 0,
-            "total_downloads": 0,
-            "total_revenue": 0.0,
-            "creator_earnings": 0.0,
-            "platform_fee": 0.0
-        }
-    
-    # Calculate earnings using aggregation
-    pipeline = [
-        {"$match": {"pack_id": {"$in": pack_ids}}},
-        {"$group": {"_id": None, "total": {"$sum": "$amount"}, "count": {"$sum": 1}}}
-    ]
-    revenue_result = await db.purchases.aggregate(pipeline).to_list(1)
-    total_revenue = revenue_result[0]["total"] if revenue_result else 0.0
-    total_purchases = revenue_result[0]["count"] if revenue_result else 0
-    creator_earnings = total_revenue * 0.9
-    
-    # Get download count
-    total_downloads = await db.downloads.count_documents({"pack_id": {"$in": pack_ids}})
+    # Pack and download totals from the creator_recent index
+    pack_totals = await db.sample_packs.aggregate([
+        {"$match": {"creator_id": user.user_id}},
+        {"$group": {"_id": None, "packs": {"$sum": 1}, "downloads": {"$sum": "$download_count"}}}
+    ]).to_list(1)
+    pack_totals = pack_totals[0] if pack_totals else {"packs": 0, "downloads": 0}
     
     return {
-        "total_packs": len(packs),
-        "total_purchases": total_purchases,
-        "total_downloads": total_downloads,
-        "total_revenue": total_revenue,
-        "creator_earnings": creator_earnings,
-        "platform_fee": total_revenue * 0.1
+        "total_packs": pack_totals["packs"],
+        "total_purchases": summary["total_purchases"],
+        "total_downloads": pack_totals["downloads"],
+        "total_revenue": summary["total_revenue"],
+        "creator_earnings": summary["total_earned"],
+        "platform_fee": round(summary["total_revenue"] - summary["total_earned"], 2)
     }
 
 @api_router.post("/creator/payout-settings")
@@ -1107,6 +2328,7 @@ async def update_payout_settings(
         {"user_id": user.user_id},
         {"$set": {"payout_frequency": frequency}}
     )
+    session_cache.invalidate_user(user.user_id)
     
     return {"message": f"Payout frequency updated to {frequency}"}
 
@@ -1162,6 +2384,7 @@ async def update_payout_method(
         {"user_id": user.user_id},
         {"$set": {"payout_info": payout_info}}
     )
+    session_cache.invalidate_user(user.user_id)
     
     return {"message": f"Payout method updated to {data.method}"}
 
@@ -1194,36 +2417,20 @@ async def request_payout(
     if not payout_info.get("payout_method"):
         raise HTTPException(status_code=400, detail="No payout method configured")
     
-    # Get creator's available balance
-    packs = await db.sample_packs.find({"creator_id": user.user_id}, {"_id": 0, "pack_id": 1}).to_list(1000)
-    pack_ids = [p["pack_id"] for p in packs]
-    
-    pipeline = [
-        {"$match": {"pack_id": {"$in": pack_ids}}},
-        {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-    ]
-    revenue_result = await db.purchases.aggregate(pipeline).to_list(1)
-    total_revenue = revenue_result[0]["total"] if revenue_result else 0.0
-    available_balance = total_revenue * 0.9  # 90% to creator
-    
-    # Check for previous payouts
-    previous_payouts = await db.payouts.aggregate([
-        {"$match": {"creator_id": user.user_id, "status": {"$in": ["completed", "pending"]}}},
-        {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-    ]).to_list(1)
-    total_paid = previous_payouts[0]["total"] if previous_payouts else 0.0
-    
-    current_balance = available_balance - total_paid
-    
-    if amount > current_balance:
-        raise HTTPException(status_code=400, detail=f"Insufficient balance. Available: ${current_balance:.2f}")
-    
     if amount < 1.0:
         raise HTTPException(status_code=400, detail="Minimum payout amount is $1.00")
     
+    # Reserve the amount from the creator's balance
+    payout_id = f"payout_{uuid.uuid4().hex[:12]}"
+    amount_cents = to_cents(amount)
+    try:
+        await ledger.reserve_payout(user.user_id, payout_id, amount_cents)
+    except InsufficientBalance as e:
+        raise HTTPException(status_code=400, detail=f"Insufficient balance. {e}")
+    
     # Create payout request
     payout_doc = {
-        "payout_id": f"payout_{uuid.uuid4().hex[:12]}",
+        "payout_id": payout_id,
         "creator_id": user.user_id,
         "amount": amount,
         "method": payout_info["payout_method"],
@@ -1236,7 +2443,11 @@ async def request_payout(
         payout_doc["status"] = "processing"
         payout_doc["is_instant"] = True
     
-    await db.payouts.insert_one(payout_doc)
+    try:
+        await db.payouts.insert_one(payout_doc)
+    except BaseException:
+        await ledger.cancel_payout(user.user_id, payout_id, amount_cents)
+        raise
     
     return {
         "message": f"Payout of ${amount:.2f} requested via {payout_info['payout_method']}",
@@ -1248,17 +2459,19 @@ async def request_payout(
 @api_router.get("/creator/payouts")
 async def get_payout_history(
     request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
     session_token: Optional[str] = Cookie(None)
 ):
-    """Get creator's payout history"""
+    """Get creator's payout history, newest first (cursor paginated)"""
     user = await require_role(request, "creator", session_token)
     
-    payouts = await db.payouts.find(
-        {"creator_id": user.user_id},
-        {"_id": 0}
-    ).sort("created_at", -1).to_list(100)
-    
-    return payouts
+    docs = await paginate(
+        response, db.payouts, {"creator_id": user.user_id},
+        "payouts", PAYOUTS_SORT, clamp_limit(limit, 100), cursor
+    )
+    return json_response(docs, response)
 
 
 @api_router.get("/creator/balance")
@@ -1269,36 +2482,71 @@ async def get_creator_balance(
     """Get creator's current available balance"""
     user = await require_role(request, "creator", session_token)
     
-    # Get creator's packs
-    packs = await db.sample_packs.find({"creator_id": user.user_id}, {"_id": 0, "pack_id": 1}).to_list(1000)
-    pack_ids = [p["pack_id"] for p in packs]
-    
-    if not pack_ids:
-        return {"total_earned": 0.0, "total_paid": 0.0, "available_balance": 0.0}
-    
-    # Calculate total revenue
-    pipeline = [
-        {"$match": {"pack_id": {"$in": pack_ids}}},
-        {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-    ]
-    revenue_result = await db.purchases.aggregate(pipeline).to_list(1)
-    total_revenue = revenue_result[0]["total"] if revenue_result else 0.0
-    total_earned = total_revenue * 0.9  # 90% to creator
-    
-    # Get total payouts
-    payouts_result = await db.payouts.aggregate([
-        {"$match": {"creator_id": user.user_id, "status": {"$in": ["completed", "pending", "processing"]}}},
-        {"$group": {"_id": None, "total": {"$sum": "$amount"}}}
-    ]).to_list(1)
-    total_paid = payouts_result[0]["total"] if payouts_result else 0.0
-    
+    summary = balance_summary(await ledger.balance(user.user_id))
     return {
-        "total_earned": total_earned,
-        "total_paid": total_paid,
-        "available_balance": total_earned - total_paid
+        "total_earned": summary["total_earned"],
+        "total_paid": summary["total_paid"],
+        "available_balance": summary["available_balance"]
     }
 
 
+def analytics_range(start: Optional[str], end: Optional[str], granularity: str) -> tuple:
+    """Parse from/to (ISO dates or datetimes, UTC unless given) into a range
+    of at most MAX_ANALYTICS_BUCKETS buckets; defaults to the last 30 days
+    (daily) or 48 hours (hourly)"""
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail=f"granularity must be one of: {', '.join(GRANULARITIES)}")
+    try:
+        end_at = datetime.fromisoformat(end) if end else datetime.now(timezone.utc)
+        start_at = datetime.fromisoformat(start) if start else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="from and to must be ISO 8601 dates")
+    if end_at.tzinfo is None:
+        end_at = end_at.replace(tzinfo=timezone.utc)
+    if start_at is None:
+        start_at = end_at - (timedelta(days=30) if granularity == "day" else timedelta(hours=48))
+    elif start_at.tzinfo is None:
+        start_at = start_at.replace(tzinfo=timezone.utc)
+    if start_at >= end_at:
+        raise HTTPException(status_code=400, detail="from must be before to")
+    if (end_at - start_at) / GRANULARITIES[granularity] > MAX_ANALYTICS_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"Range spans more than {MAX_ANALYTICS_BUCKETS} buckets")
+    return start_at, end_at
+
+async def analytics_response(scope: str, scope_id: str, granularity: str, start_at: datetime, end_at: datetime) -> Dict:
+    series = await analytics.series(scope, scope_id, granularity, start_at, end_at)
+    return {
+        "scope": scope,
+        "scope_id": scope_id,
+        "granularity": granularity,
+        "from": start_at,
+        "to": end_at,
+        "totals": summarize(series),
+        "buckets": in_dollars(series)
+    }
+
+@api_router.get("/creator/analytics")
+async def get_creator_analytics(
+    request: Request,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    granularity: str = "day",
+    pack_id: Optional[str] = None,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Downloads, purchases, revenue and earnings per hour or day, for all of
+    the creator's packs or one of them"""
+    user = await require_role(request, "creator", session_token)
+    start_at, end_at = analytics_range(start, end, granularity)
+    
+    if pack_id:
+        pack = await get_pack(pack_id)
+        if not pack or (pack.get("creator_id") != user.user_id and user.role != "admin"):
+            raise HTTPException(status_code=404, detail="Sample pack not found")
+        return await analytics_response("pack", pack_id, granularity, start_at, end_at)
+    return await analytics_response("creator", user.user_id, granularity, start_at, end_at)
+
+
 # ============================================
 # ADMIN ENDPOINTS
 # ============================================
@@ -1340,6 +2588,7 @@ async def admin_update_payout_method(
         {"user_id": user.user_id},
         {"$set": {"payout_info": payout_info}}
     )
+    session_cache.invalidate_user(user.user_id)
     
     return {"message": f"Payment method updated to {data.method}"}
 
@@ -1377,10 +2626,14 @@ async def approve_creator(
     """Approve creator"""
     user = await require_role(request, "admin", session_token)
     
-    await db.users.update_one(
+    before = await db.users.find_one_and_update(
         {"user_id": creator_id},
-        {"$set": {"creator_approved": True}}
+        {"$set": {"creator_approved": True}},
+        projection={"_id": 0, "role": 1, "creator_approved": 1}
     )
+    session_cache.invalidate_user(creator_id)
+    if before and before.get("role") == "creator" and not before.get("creator_approved"):
+        await platform_stats.increment(creators=1)
     
     return {"message": "Creator approved"}
 
@@ -1412,88 +2665,11 @@ async def admin_upload_pack(
     if not creator:
         raise HTTPException(status_code=404, detail="Creator not found")
     
-    # Validate price
-    if price < 0:
-        raise HTTPException(status_code=400, detail="Price cannot be negative")
-    
-    # Save file
-    pack_id = f"pack_{uuid.uuid4().hex[:12]}"
-    file_extension = audio_file.filename.split(".")[-1].lower()
-    
-    # Handle ZIP files
-    if file_extension == "zip":
-        # Save ZIP file
-        zip_filename = f"{pack_id}.zip"
-        zip_path = ZIP_STORAGE_PATH / zip_filename
-        
-        with open(zip_path, "wb") as f:
-            shutil.copyfileobj(audio_file.file, f)
-        
-        file_size = os.path.getsize(zip_path)
-        file_path = f"zip_files/{zip_filename}"
-    else:
-        # Save audio file
-        audio_filename = f"{pack_id}.{file_extension}"
-        audio_path = AUDIO_STORAGE_PATH / audio_filename
-        
-        with open(audio_path, "wb") as f:
-            shutil.copyfileobj(audio_file.file, f)
-        
-        file_size = os.path.getsize(audio_path)
-        file_path = f"audio_files/{audio_filename}"
-    
-    # Save cover image (required)
-    cover_ext = cover_image.filename.split(".")[-1].lower()
-    cover_filename = f"{pack_id}.{cover_ext}"
-    cover_path = COVERS_STORAGE_PATH / cover_filename
-    with open(cover_path, "wb") as f:
-        shutil.copyfileobj(cover_image.file, f)
-    
-    # Save preview audio (optional, but required for ZIP files)
-    preview_path = None
-    if preview_audio and preview_audio.filename:
-        preview_ext = preview_audio.filename.split(".")[-1].lower()
-        preview_filename = f"{pack_id}_preview.{preview_ext}"
-        preview_file_path = PREVIEWS_STORAGE_PATH / preview_filename
-        with open(preview_file_path, "wb") as f:
-            shutil.copyfileobj(preview_audio.file, f)
-        preview_path = f"previews/{preview_filename}"
-    elif file_extension != "zip":
-        # For single audio files, use the main file as preview
-        preview_path = file_path
-    
-    # Parse tags
-    tags_list = [t.strip() for t in tags.split(",") if t.strip()]
-    
-    # Create pack
-    pack_doc = {
-        "pack_id": pack_id,
-        "title": title,
-        "description": description,
-        "category": category,
-        "tags": tags_list,
-        "price": price if not is_free else 0.0,
-        "is_free": is_free or price == 0,
-        "is_featured": is_featured,
-        "is_sync_ready": is_sync_ready,
-        "sync_type": sync_type if is_sync_ready else None,
-        "bpm": bpm,
-        "key": key,
-        "creator_id": creator["user_id"],
-        "creator_name": creator["name"],
-        "audio_file_path": file_path,
-        "cover_image_path": f"covers/{cover_filename}",
-        "preview_audio_path": preview_path,
-        "file_type": "zip" if file_extension == "zip" else "audio",
-        "duration": 0.0,
-        "file_size": file_size,
-        "download_count": 0,
-        "created_at": datetime.now(timezone.utc)
-    }
-    await db.sample_packs.insert_one(pack_doc)
-    
-    # Return serialized document (without _id)
-    return serialize_doc(pack_doc)
+    fields = pack_fields(title, description, category, tags, price, is_free, is_featured, is_sync_ready, sync_type, bpm, key)
+    return await ingest_pack(
+        fields, creator["user_id"], creator["name"],
+        audio_file.filename, partial(stage_upload, audio_file), cover_image, preview_audio
+    )
 
 @api_router.post("/admin/packs/{pack_id}/mark-free")
 async def mark_pack_free(
@@ -1513,6 +2689,7 @@ async def mark_pack_free(
         {"pack_id": pack_id},
         {"$set": update_data}
     )
+    await pack_changed(pack_id)
     
     return {"message": f"Pack marked as {'free' if is_free else 'paid'}"}
 
@@ -1530,6 +2707,7 @@ async def mark_pack_featured(
         {"pack_id": pack_id},
         {"$set": {"is_featured": is_featured}}
     )
+    await pack_changed(pack_id)
     
     return {"message": f"Pack marked as {'featured' if is_featured else 'not featured'}"}
 
@@ -1554,6 +2732,7 @@ async def mark_pack_sync_ready(
         {"pack_id": pack_id},
         {"$set": update_data}
     )
+    await pack_changed(pack_id)
     
     return {"message": f"Pack marked as {'sync-ready' if is_sync_ready else 'not sync-ready'}"}
 
@@ -1573,12 +2752,14 @@ async def update_pack_metadata(
         update_data["bpm"] = bpm
     if key is not None:
         update_data["key"] = key
+        update_data["key_normalized"] = normalize_key(key)
     
     if update_data:
         await db.sample_packs.update_one(
             {"pack_id": pack_id},
             {"$set": update_data}
         )
+        await pack_changed(pack_id)
     
     return {"message": "Pack metadata updated"}
 
@@ -1603,7 +2784,7 @@ async def admin_update_pack(
     admin = await require_role(request, "admin", session_token)
     
     # Check if pack exists
-    pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0})
+    pack = await db.sample_packs.find_one({"pack_id": pack_id}, PACK_PROJECTION)
     if not pack:
         raise HTTPException(status_code=404, detail="Pack not found")
     
@@ -1624,6 +2805,7 @@ async def admin_update_pack(
         update_data["bpm"] = bpm
     if key is not None:
         update_data["key"] = key
+        update_data["key_normalized"] = normalize_key(key)
     if is_free is not None:
         update_data["is_free"] = is_free
         if is_free:
@@ -1642,23 +2824,26 @@ async def admin_update_pack(
             {"pack_id": pack_id},
             {"$set": update_data}
         )
+        await pack_changed(pack_id)
     
     # Return updated pack
-    updated_pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0})
+    updated_pack = await db.sample_packs.find_one({"pack_id": pack_id}, PACK_PROJECTION)
     return updated_pack
 
 @api_router.get("/admin/packs")
 async def admin_list_packs(
     request: Request,
+    response: Response,
     session_token: Optional[str] = Cookie(None),
-    skip: int = 0,
+    sort: str = "newest",
+    cursor: Optional[str] = None,
     limit: int = 100
 ):
-    """Admin list all packs"""
+    """Admin list all packs (cursor paginated)"""
     admin = await require_role(request, "admin", session_token)
     
-    packs = await db.sample_packs.find({}, {"_id": 0}).skip(skip).limit(limit).to_list(limit)
-    return packs
+    packs = await paginate(response, db.sample_packs, {}, sort, resolve_pack_sort(sort), clamp_limit(limit, 100), cursor, PACK_PROJECTION)
+    return json_response(packs, response)
 
 @api_router.delete("/admin/packs/{pack_id}")
 async def admin_delete_pack(
@@ -1670,39 +2855,28 @@ async def admin_delete_pack(
     admin = await require_role(request, "admin", session_token)
     
     # Check if pack exists
-    pack = await db.sample_packs.find_one({"pack_id": pack_id}, {"_id": 0})
+    pack = await db.sample_packs.find_one({"pack_id": pack_id}, PACK_PROJECTION)
     if not pack:
         raise HTTPException(status_code=404, detail="Pack not found")
     
-    # Delete the audio/zip file
-    if pack.get("audio_file_path"):
-        file_path = ROOT_DIR / pack["audio_file_path"]
-        if file_path.exists():
-            try:
-                os.remove(file_path)
-            except Exception as e:
-                logging.warning(f"Failed to delete audio file: {e}")
-    
-    # Delete cover image
-    if pack.get("cover_image_path"):
-        cover_path = ROOT_DIR / pack["cover_image_path"]
-        if cover_path.exists():
-            try:
-                os.remove(cover_path)
-            except Exception as e:
-                logging.warning(f"Failed to delete cover: {e}")
-    
-    # Delete preview audio
-    if pack.get("preview_audio_path"):
-        preview_path = ROOT_DIR / pack["preview_audio_path"]
-        if preview_path.exists():
-            try:
-                os.remove(preview_path)
-            except Exception as e:
-                logging.warning(f"Failed to delete preview: {e}")
-    
-    # Delete from database
-    await db.sample_packs.delete_one({"pack_id": pack_id})
+    # Delete from database first: only the request that actually removes the
+    # pack releases its blob references
+    result = await db.sample_packs.delete_one({"pack_id": pack_id})
+    if not result.deleted_count:
+        raise HTTPException(status_code=404, detail="Pack not found")
+    await pack_changed(pack_id, deleted=True)
+    await platform_stats.increment(packs=-1)
+    
+    # Blobs are removed with their last reference; files stored before the
+    # blob store belong to this pack alone
+    await blob_store.release_pack(pack)
+    # Waveform peaks too
+    keys = [path for path in pack_file_paths(pack) if not is_blob_path(path)] + [peaks_key(pack_id)]
+    for key in keys:
+        try:
+            await asyncio.to_thread(storage.delete, key)
+        except Exception as e:
+            logging.warning(f"Failed to delete {key}: {e}")
     
     return {"message": "Pack deleted successfully"}
 
@@ -1721,54 +2895,132 @@ async def promote_user_to_creator(
         raise HTTPException(status_code=404, detail="User not found")
     
     # Update user role
-    await db.users.update_one(
+    before = await db.users.find_one_and_update(
         {"user_id": user_id},
-        {"$set": {"role": "creator", "creator_approved": True}}
+        {"$set": {"role": "creator", "creator_approved": True}},
+        projection={"_id": 0, "role": 1, "creator_approved": 1}
     )
+    session_cache.invalidate_user(user_id)
+    if before and not (before.get("role") == "creator" and before.get("creator_approved")):
+        await platform_stats.increment(creators=1)
     
     return {"message": f"User {user['email']} promoted to creator"}
 
 @api_router.get("/admin/stats")
 async def get_admin_stats(request: Request, session_token: Optional[str] = Cookie(None)):
-    """Get platform statistics"""
+    """Get platform statistics from the maintained counters. recomputed_at and
+    stale_seconds say when they were last recounted from the collections."""
     admin = await require_role(request, "admin", session_token)
     
-    total_users = await db.users.count_documents({})
-    total_creators = await db.users.count_documents({"role": "creator", "creator_approved": True})
-    total_packs = await db.sample_packs.count_documents({})
-    total_purchases = await db.purchases.count_documents({})
-    total_subscriptions = await db.subscriptions.count_documents({"status": "active"})
-    
-    # Calculate revenue using aggregation for efficiency
-    pipeline = [{"$group": {"_id": None, "total": {"$sum": "$amount"}}}]
-    revenue_result = await db.purchases.aggregate(pipeline).to_list(1)
-    total_revenue = revenue_result[0]["total"] if revenue_result else 0.0
-    platform_earnings = total_revenue * 0.1
-    creator_earnings = total_revenue * 0.9
+    stats = await platform_stats.snapshot()
+    recomputed_at = stats["recomputed_at"]
+    if recomputed_at.tzinfo is None:
+        recomputed_at = recomputed_at.replace(tzinfo=timezone.utc)
     
     # Subscription revenue (count * price)
-    subscription_revenue = total_subscriptions * 5.0
+    subscription_revenue = stats["active_subscriptions"] * 5.0
     
     return {
-        "total_users": total_users,
-        "total_creators": total_creators,
-        "total_packs": total_packs,
-        "total_purchases": total_purchases,
-        "total_subscriptions": total_subscriptions,
-        "total_revenue": total_revenue,
+        "total_users": stats["users"],
+        "total_creators": stats["creators"],
+        "total_packs": stats["packs"],
+        "total_purchases": stats["purchases"],
+        "total_subscriptions": stats["active_subscriptions"],
+        "total_revenue": stats["revenue_cents"] / 100,
         "subscription_revenue": subscription_revenue,
-        "platform_earnings": platform_earnings,
-        "creator_earnings": creator_earnings
+        "platform_earnings": (stats["revenue_cents"] - stats["creator_earnings_cents"]) / 100,
+        "creator_earnings": stats["creator_earnings_cents"] / 100,
+        "updated_at": stats["updated_at"],
+        "recomputed_at": recomputed_at,
+        "stale_seconds": round((datetime.now(timezone.utc) - recomputed_at).total_seconds(), 1)
     }
 
+@api_router.get("/admin/analytics")
+async def get_admin_analytics(
+    request: Request,
+    start: Optional[str] = Query(None, alias="from"),
+    end: Optional[str] = Query(None, alias="to"),
+    granularity: str = "day",
+    pack_id: Optional[str] = None,
+    creator_id: Optional[str] = None,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Platform-wide analytics series, or one pack's or creator's"""
+    admin = await require_role(request, "admin", session_token)
+    start_at, end_at = analytics_range(start, end, granularity)
+    
+    if pack_id:
+        return await analytics_response("pack", pack_id, granularity, start_at, end_at)
+    if creator_id:
+        return await analytics_response("creator", creator_id, granularity, start_at, end_at)
+    return await analytics_response("platform", "all", granularity, start_at, end_at)
+
+async def recompute_platform_stats_periodically():
+    while True:
+        await asyncio.sleep(PLATFORM_STATS_RECOMPUTE_SECONDS)
+        try:
+            # Every worker runs this loop; one recount per interval is enough
+            doc = await db.platform_stats.find_one({"_id": "platform"}, {"_id": 0, "recomputed_at": 1})
+            last = doc.get("recomputed_at") if doc else None
+            if last and last.tzinfo is None:
+                last = last.replace(tzinfo=timezone.utc)
+            if last is None or (datetime.now(timezone.utc) - last).total_seconds() >= PLATFORM_STATS_RECOMPUTE_SECONDS / 2:
+                await platform_stats.recompute()
+        except Exception as e:
+            logger.error(f"Platform stats recompute failed: {e}")
+
 @api_router.get("/admin/users")
-async def get_all_users(request: Request, session_token: Optional[str] = Cookie(None)):
-    """Get all registered users with their emails"""
+async def get_all_users(
+    request: Request,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = 100,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Get registered users with their emails, in signup order (cursor paginated)"""
+    admin = await require_role(request, "admin", session_token)
+    
+    users = await paginate(
+        response, db.users, {}, "users", USERS_SORT, clamp_limit(limit, 100), cursor,
+        {"_id": 0, "user_id": 1, "email": 1, "name": 1, "role": 1, "created_at": 1}
+    )
+    return json_response(users, response)
+
+@api_router.get("/admin/export/{dataset}")
+async def export_dataset(
+    dataset: str,
+    request: Request,
+    format: str = "ndjson",
+    after: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    session_token: Optional[str] = Cookie(None)
+):
+    """Stream a whole collection (users, packs, purchases, downloads, payouts
+    or invitations) as NDJSON or CSV. Other query parameters filter on the
+    dataset's fields; `after` takes a row's export_cursor to resume after it."""
     admin = await require_role(request, "admin", session_token)
     
-    users = await db.users.find({}, {"_id": 0, "user_id": 1, "email": 1, "name": 1, "role": 1, "created_at": 1}).to_list(10000)
+    if dataset not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export; available: {', '.join(EXPORTS)}")
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(FORMATS)}")
+    filters = {
+        key: value for key, value in request.query_params.items()
+        if key not in ("format", "after", "since", "until")
+    }
+    try:
+        query = export_query(dataset, filters, after=after, since=since, until=until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    return users
+    media_type, extension = FORMATS[format]
+    filename = f"{dataset}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.{extension}"
+    return StreamingResponse(
+        iter_export(db[EXPORTS[dataset].collection], dataset, query, format),
+        media_type=media_type,
+        headers={"Content-Disposition": content_disposition(filename, inline=False)}
+    )
 
 @api_router.post("/admin/invite-creator")
 async def invite_creator(
@@ -1795,7 +3047,14 @@ async def invite_creator(
     
     await db.creator_invitations.insert_one(invitation_doc)
     
-    return {"message": "Creator invitation sent", "invitation": serialize_doc(invitation_doc)}
+    return {"message": "Creator invitation sent", "invitation": without_id(invitation_doc)}
+
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats(request: Request, session_token: Optional[str] = Cookie(None)):
+    """Get hit/miss counters for this worker's in-process caches"""
+    admin = await require_role(request, "admin", session_token)
+    
+    return {"sessions": session_cache.stats(), "packs": pack_cache.stats()}
 
 @api_router.get("/admin/invitations")
 async def list_invitations(request: Request, session_token: Optional[str] = Cookie(None)):
@@ -1851,8 +3110,28 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        NEXT_CURSOR_HEADER, "ETag", "Location",
+        "Tus-Resumable", "Tus-Version", "Tus-Extension", "Tus-Max-Size", "Tus-Checksum-Algorithm",
+        "Upload-Offset", "Upload-Length", "Upload-Expires",
+    ],
 )
 
+@app.on_event("startup")
+async def startup_tasks():
+    await ensure_indexes(db)
+    doc = await db.catalog_meta.find_one({"_id": CATALOG_ID})
+    catalog_state["version"] = current_version(doc)
+    await rebuild_search_index()
+    asyncio.create_task(refresh_search_index_periodically())
+    asyncio.create_task(poll_catalog_version())
+    asyncio.create_task(collect_expired_uploads_periodically())
+    await download_recorder.start()
+    asyncio.create_task(recompute_platform_stats_periodically())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    media_executor.shutdown(wait=False, cancel_futures=True)
+    # Queued download events are written before the connection goes
+    await download_recorder.stop()
     client.close()
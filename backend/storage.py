@@ -0,0 +1,245 @@
+"""Storage backends for pack files.
+
+Files are addressed by key: the relative path stored on the pack document
+("blobs/ab/<sha256>.wav", or "covers/..." for packs from before the blob
+store). LocalStorage keeps them under the backend directory; S3Storage
+keeps them in an S3-compatible bucket (AWS, or MinIO and similar through
+endpoint_url), so any number of API hosts can serve them.
+
+Every method blocks: call them through asyncio.to_thread, or hand the
+iterators to StreamingResponse, which already runs them in a threadpool.
+"""
+import asyncio
+import io
+import mimetypes
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Iterator, Optional
+
+from http_ranges import CHUNK_SIZE, content_disposition, iter_file_range
+
+# Reads through S3Storage.open() are buffered in blocks this size, so
+# zipfile's small seeks and reads don't each become a request
+S3_READ_BLOCK_SIZE = 1024 * 1024
+
+
+class StoredFile:
+    def __init__(self, size: int, mtime: float, etag: str):
+        self.size = size
+        self.mtime = mtime
+        self.etag = etag
+
+
+class LocalStorage:
+    presigns = False
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return self.root / key
+
+    def stat(self, key: str) -> Optional[StoredFile]:
+        try:
+            st = (self.root / key).stat()
+        except FileNotFoundError:
+            return None
+        return StoredFile(st.st_size, st.st_mtime, f'"{st.st_mtime_ns:x}-{st.st_size:x}"')
+
+    def exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    def put_file(self, key: str, source: Path, move: bool = True) -> None:
+        """Store a local file under key; with move, the source is consumed"""
+        dest = self.root / key
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            try:
+                os.replace(source, dest)
+                return
+            except OSError:
+                # Different filesystem: fall through to copy-and-rename
+                pass
+        temp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex[:8]}.part")
+        shutil.copyfile(source, temp)
+        os.replace(temp, dest)
+        if move:
+            Path(source).unlink(missing_ok=True)
+
+    def delete(self, key: str) -> None:
+        (self.root / key).unlink(missing_ok=True)
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.root / key, "rb")
+
+    def iter_range(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        """Yield bytes [start, end] (inclusive)"""
+        yield from iter_file_range(self.root / key, start, end)
+
+    def download(self, key: str, dest: Path) -> None:
+        shutil.copyfile(self.root / key, dest)
+
+    def presigned_url(self, key: str, filename: Optional[str] = None, inline: bool = True, media_type: Optional[str] = None) -> Optional[str]:
+        return None
+
+
+class _S3RangeReader(io.RawIOBase):
+    """Seekable read-only view of an S3 object; every read is a ranged GET"""
+
+    def __init__(self, storage: "S3Storage", key: str, size: int):
+        self._storage = storage
+        self._key = key
+        self._size = size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: self._size}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        if self._pos >= self._size:
+            return 0
+        end = min(self._size, self._pos + len(buffer)) - 1
+        data = self._storage.read_range(self._key, self._pos, end)
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+class S3Storage:
+    """S3-compatible object storage. Credentials come from the usual boto3
+    sources (AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY, profiles, roles)."""
+
+    presigns = True
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        presign_seconds: int = 300,
+        multipart_threshold: int = 64 * 1024 * 1024,
+        multipart_chunksize: int = 16 * 1024 * 1024,
+        max_concurrency: int = 4
+    ):
+        import boto3
+        from boto3.s3.transfer import TransferConfig
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.presign_seconds = presign_seconds
+        # Path-style addressing: MinIO and most self-hosted stand-ins need it
+        config = Config(signature_version="s3v4", s3={"addressing_style": "path" if endpoint_url else "auto"})
+        self.client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region, config=config)
+        # Uploads and downloads above the threshold run as concurrent multipart transfers
+        self.transfer = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency
+        )
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def local_path(self, key: str) -> Optional[Path]:
+        return None
+
+    def stat(self, key: str) -> Optional[StoredFile]:
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+        return StoredFile(head["ContentLength"], head["LastModified"].timestamp(), head["ETag"])
+
+    def exists(self, key: str) -> bool:
+        return self.stat(key) is not None
+
+    def put_file(self, key: str, source: Path, move: bool = True) -> None:
+        content_type = mimetypes.guess_type(key)[0] or "application/octet-stream"
+        self.client.upload_file(
+            str(source), self.bucket, self._key(key),
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer
+        )
+        if move:
+            Path(source).unlink(missing_ok=True)
+
+    def delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+
+    def read_range(self, key: str, start: int, end: int) -> bytes:
+        response = self.client.get_object(Bucket=self.bucket, Key=self._key(key), Range=f"bytes={start}-{end}")
+        with response["Body"] as body:
+            return body.read()
+
+    def open(self, key: str) -> BinaryIO:
+        stored = self.stat(key)
+        if stored is None:
+            raise FileNotFoundError(key)
+        return io.BufferedReader(_S3RangeReader(self, key, stored.size), buffer_size=S3_READ_BLOCK_SIZE)
+
+    def iter_range(self, key: str, start: int, end: int) -> Iterator[bytes]:
+        """Yield bytes [start, end] (inclusive) from a single ranged GET"""
+        response = self.client.get_object(Bucket=self.bucket, Key=self._key(key), Range=f"bytes={start}-{end}")
+        with response["Body"] as body:
+            yield from body.iter_chunks(CHUNK_SIZE)
+
+    def download(self, key: str, dest: Path) -> None:
+        self.client.download_file(self.bucket, self._key(key), str(dest), Config=self.transfer)
+
+    def presigned_url(self, key: str, filename: Optional[str] = None, inline: bool = True, media_type: Optional[str] = None) -> Optional[str]:
+        """Short-lived GET URL; the client then fetches (and range-requests) the bytes from S3 directly"""
+        params = {"Bucket": self.bucket, "Key": self._key(key)}
+        if filename:
+            params["ResponseContentDisposition"] = content_disposition(filename, inline=inline)
+        if media_type:
+            params["ResponseContentType"] = media_type
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=self.presign_seconds)
+
+
+@asynccontextmanager
+async def local_copy(storage, key: str) -> AsyncIterator[Path]:
+    """A local path for a stored file; downloaded to a temp directory when the storage is remote"""
+    local_path = storage.local_path(key)
+    if local_path is not None:
+        yield local_path
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / Path(key).name
+        await asyncio.to_thread(storage.download, key, path)
+        yield path
+
+
+def storage_from_env(root_dir: Path):
+    """STORAGE_BACKEND=local (default) or s3, configured by the S3_* variables"""
+    backend = os.environ.get("STORAGE_BACKEND", "local")
+    if backend == "local":
+        return LocalStorage(root_dir)
+    if backend == "s3":
+        return S3Storage(
+            bucket=os.environ["S3_BUCKET"],
+            prefix=os.environ.get("S3_PREFIX", ""),
+            endpoint_url=os.environ.get("S3_ENDPOINT_URL") or None,
+            region=os.environ.get("S3_REGION") or None,
+            presign_seconds=int(os.environ.get("S3_PRESIGN_SECONDS", "300"))
+        )
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
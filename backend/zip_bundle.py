@@ -0,0 +1,94 @@
+"""ZIP bundles streamed to the client while they are being built.
+
+zipfile writes to an unseekable sink here (sizes and CRCs go into data
+descriptors after each member), and the sink is drained after every
+chunk, so memory use is one read chunk plus zlib state no matter how
+large the bundle is. Source files are read through a storage backend
+(storage.py), so they may be local or in object storage.
+"""
+import os
+import re
+import time
+import zipfile
+from typing import Iterable, Iterator, List, Tuple
+
+READ_CHUNK_SIZE = 1024 * 1024
+
+# Formats that are already compressed gain nothing from deflate
+STORED_EXTENSIONS = {
+    ".zip", ".mp3", ".flac", ".ogg", ".m4a", ".aac", ".opus",
+    ".jpg", ".jpeg", ".png", ".gif", ".webp", ".rar", ".7z", ".gz",
+}
+
+
+class _ChunkSink:
+    """Write-only, unseekable file object that collects output until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> Iterator[bytes]:
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            yield data
+
+
+def safe_name(name: str, fallback: str) -> str:
+    """A single path component usable inside the archive"""
+    cleaned = re.sub(r'[\x00-\x1f/\\:*?"<>|]+', " ", name or "").strip(" .")
+    return cleaned[:120] or fallback
+
+
+def unique_names(names: Iterable[str]) -> List[str]:
+    """Disambiguate duplicate archive names as "name (2).ext", "name (3).ext", ..."""
+    seen = set()
+    result = []
+    for name in names:
+        candidate, n = name, 1
+        stem, ext = os.path.splitext(name)
+        while candidate.lower() in seen:
+            n += 1
+            candidate = f"{stem} ({n}){ext}"
+        seen.add(candidate.lower())
+        result.append(candidate)
+    return result
+
+
+def _zip_info(arcname: str, key: str, stored) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(arcname, date_time=max(time.localtime(stored.mtime)[:6], (1980, 1, 1, 0, 0, 0)))
+    # Known up front so zipfile switches to zip64 for members over 4 GB
+    info.file_size = stored.size
+    info.external_attr = 0o644 << 16
+    if os.path.splitext(key)[1].lower() in STORED_EXTENSIONS:
+        info.compress_type = zipfile.ZIP_STORED
+    else:
+        info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+
+def iter_zip_bundle(storage, files: Iterable[Tuple[str, str]]) -> Iterator[bytes]:
+    """Yield a ZIP archive of (arcname, storage key) pairs, chunk by chunk"""
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as zf:
+        for arcname, key in files:
+            stored = storage.stat(key)
+            if stored is None:
+                raise FileNotFoundError(key)
+            with storage.open(key) as src, zf.open(_zip_info(arcname, key, stored), "w") as dst:
+                while True:
+                    chunk = src.read(READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    dst.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    # Central directory, written when the ZipFile closes
+    yield from sink.drain()
@@ -0,0 +1,181 @@
+"""Index of a ZIP pack's contents, read from its central directory.
+
+Building the manifest never extracts the archive: names, sizes, CRCs and
+offsets come straight from the central directory, and audio headers are
+read from the first few KB of each audio member. The stored offsets then
+let single members be streamed straight out of the archive.
+"""
+import struct
+import zipfile
+import zlib
+from typing import BinaryIO, Callable, Dict, Iterator, List
+
+from audio_analysis import is_audio_member
+from audio_headers import AudioHeaderError, read_audio_info
+
+COMPRESSION_NAMES = {
+    zipfile.ZIP_STORED: "stored",
+    zipfile.ZIP_DEFLATED: "deflated",
+    zipfile.ZIP_BZIP2: "bzip2",
+    zipfile.ZIP_LZMA: "lzma",
+    9: "deflate64",
+}
+
+# Keeps the manifest well inside Mongo's 16 MB document limit
+MAX_MANIFEST_ENTRIES = 20000
+
+
+def is_junk_member(name: str) -> bool:
+    """macOS resource forks and Finder metadata that ride along in archives"""
+    basename = name.rsplit("/", 1)[-1]
+    return name.startswith("__MACOSX/") or basename.startswith("._") or basename in (".DS_Store", "Thumbs.db")
+
+
+def manifest_entry(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> Dict:
+    entry = {
+        "name": info.filename,
+        "size": info.file_size,
+        "compressed_size": info.compress_size,
+        "compression": COMPRESSION_NAMES.get(info.compress_type, str(info.compress_type)),
+        "crc": f"{info.CRC:08x}",
+        "header_offset": info.header_offset,
+    }
+    if info.flag_bits & 0x1:
+        entry["encrypted"] = True
+    elif is_audio_member(info.filename):
+        try:
+            with zf.open(info) as member:
+                audio = read_audio_info(member, info.file_size, info.filename)
+        except (AudioHeaderError, RuntimeError, NotImplementedError, zipfile.BadZipFile, EOFError):
+            audio = None
+        entry["audio"] = audio or {}
+    return entry
+
+
+def read_zip_manifest(path: str) -> Dict:
+    """Manifest for a ZIP: {"entries", "file_count", "total_size", "truncated"}.
+
+    Raises zipfile.BadZipFile if the archive has no readable central directory.
+    """
+    with zipfile.ZipFile(path) as zf:
+        infos = [info for info in zf.infolist() if not info.is_dir() and not is_junk_member(info.filename)]
+        entries = [manifest_entry(zf, info) for info in infos[:MAX_MANIFEST_ENTRIES]]
+    return {
+        "entries": entries,
+        "file_count": len(infos),
+        "total_size": sum(info.file_size for info in infos),
+        "truncated": len(infos) > MAX_MANIFEST_ENTRIES,
+    }
+
+
+def member_updates(entries: List[Dict], results: List[Dict], fields) -> Dict:
+    """$set paths merging per-member analysis results into zip_manifest entries by name"""
+    positions = {entry["name"]: i for i, entry in enumerate(entries)}
+    updates = {}
+    for result in results:
+        i = positions.get(result.get("name"))
+        if i is None or "error" in result:
+            continue
+        for field in fields:
+            if result.get(field) is not None:
+                updates[f"zip_manifest.{i}.audio.{field}"] = result[field]
+    return updates
+
+
+# ============================================
+# Streaming single members
+# ============================================
+
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def member_data_offset(f: BinaryIO, header_offset: int) -> int:
+    """Offset of a member's data: its local header's name and extra field lengths
+    can differ from the central directory's, so they're read from the local header"""
+    f.seek(header_offset)
+    header = f.read(LOCAL_HEADER.size)
+    if len(header) < LOCAL_HEADER.size:
+        raise zipfile.BadZipFile("Truncated local file header")
+    fields = LOCAL_HEADER.unpack(header)
+    if fields[0] != LOCAL_HEADER_SIGNATURE:
+        raise zipfile.BadZipFile("Bad local file header signature")
+    name_length, extra_length = fields[-2:]
+    return header_offset + LOCAL_HEADER.size + name_length + extra_length
+
+
+def _iter_stored(f: BinaryIO, data_offset: int, start: int, end: int) -> Iterator[bytes]:
+    f.seek(data_offset + start)
+    remaining = end - start + 1
+    while remaining > 0:
+        chunk = f.read(min(STREAM_CHUNK_SIZE, remaining))
+        if not chunk:
+            break
+        remaining -= len(chunk)
+        yield chunk
+
+
+def _iter_deflated(f: BinaryIO, data_offset: int, compressed_size: int, start: int, end: int) -> Iterator[bytes]:
+    """Inflate from the start of the member, emitting only [start, end].
+
+    Output is bounded to STREAM_CHUNK_SIZE per step, so memory stays flat
+    however far into the member the range begins.
+    """
+    decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    f.seek(data_offset)
+    compressed_left = compressed_size
+    position = 0
+    pending = b""
+    while position <= end:
+        if not pending:
+            if compressed_left <= 0:
+                tail = decompressor.flush()
+                if tail:
+                    yield tail[max(0, start - position):end + 1 - position]
+                return
+            pending = f.read(min(STREAM_CHUNK_SIZE, compressed_left))
+            if not pending:
+                return
+            compressed_left -= len(pending)
+        out = decompressor.decompress(pending, STREAM_CHUNK_SIZE)
+        pending = decompressor.unconsumed_tail
+        if position + len(out) > start:
+            piece = out[max(0, start - position):end + 1 - position]
+            if piece:
+                yield piece
+        position += len(out)
+        if decompressor.eof:
+            return
+
+
+def _iter_via_zipfile(f: BinaryIO, name: str, start: int, end: int) -> Iterator[bytes]:
+    """Fallback for other compression methods: zipfile seeks by decompressing forward"""
+    with zipfile.ZipFile(f) as zf, zf.open(name) as member:
+        member.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = member.read(min(STREAM_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def iter_member_range(open_archive: Callable[[], BinaryIO], entry: Dict, start: int, end: int) -> Iterator[bytes]:
+    """Yield bytes [start, end] (inclusive) of a member's uncompressed data.
+
+    open_archive() returns the archive as a seekable binary file (local, or
+    ranged reads from object storage). Stored members are read by seeking
+    straight to the range; deflated members are streamed through zlib
+    without touching the rest of the archive.
+    """
+    with open_archive() as f:
+        if entry["compression"] not in ("stored", "deflated"):
+            yield from _iter_via_zipfile(f, entry["name"], start, end)
+            return
+        data_offset = member_data_offset(f, entry["header_offset"])
+        if entry["compression"] == "stored":
+            yield from _iter_stored(f, data_offset, start, end)
+        else:
+            yield from _iter_deflated(f, data_offset, entry["compressed_size"], start, end)
@@ -1,5 +1,6 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 import WaveSurfer from 'wavesurfer.js';
+import { loadPeaks, peaksForWidth } from './peaks';
 
 const MiniWaveformPlayer = ({ audioUrl, packId, isGlobalPlaying, onPlay, onStop }) => {
   const waveformRef = useRef(null);
@@ -35,72 +36,92 @@ const MiniWaveformPlayer = ({ audioUrl, packId, isGlobalPlaying, onPlay, onStop
     setError(null);
     setIsReady(false);
 
-    try {
-      wavesurfer.current = WaveSurfer.create({
-        container: waveformRef.current,
-        waveColor: 'rgba(139, 92, 246, 0.4)',
-        progressColor: '#8B5CF6',
-        cursorColor: '#fff',
-        cursorWidth: 2,
-        barWidth: 2,
-        barRadius: 2,
-        barGap: 1,
-        responsive: true,
-        height: 40,
-        normalize: true,
-        backend: 'WebAudio',
-        interact: true
-      });
-
-      wavesurfer.current.on('ready', () => {
-        setIsLoading(false);
-        setIsReady(true);
-        const dur = wavesurfer.current.getDuration();
-        setDuration(formatTime(dur));
-      });
-
-      wavesurfer.current.on('audioprocess', () => {
-        if (wavesurfer.current) {
-          const cur = wavesurfer.current.getCurrentTime();
-          setCurrentTime(formatTime(cur));
-        }
-      });
-
-      wavesurfer.current.on('seeking', () => {
-        if (wavesurfer.current) {
-          const cur = wavesurfer.current.getCurrentTime();
-          setCurrentTime(formatTime(cur));
-        }
-      });
-
-      wavesurfer.current.on('play', () => {
-        setIsPlaying(true);
-        if (onPlay) onPlay(packId);
-      });
+    let cancelled = false;
 
-      wavesurfer.current.on('pause', () => {
-        setIsPlaying(false);
-      });
+    const init = async () => {
+      const peaks = await loadPeaks(packId);
+      if (cancelled || !waveformRef.current) return;
 
-      wavesurfer.current.on('finish', () => {
-        setIsPlaying(false);
-        if (onStop) onStop(packId);
-      });
+      // Stream through a media element that fetches nothing until play is pressed
+      const media = new Audio();
+      media.preload = 'none';
 
-      wavesurfer.current.on('error', (err) => {
-        console.error('MiniWaveformPlayer error:', err);
-        setError('Failed to load audio');
+      try {
+        wavesurfer.current = WaveSurfer.create({
+          container: waveformRef.current,
+          waveColor: 'rgba(139, 92, 246, 0.4)',
+          progressColor: '#8B5CF6',
+          cursorColor: '#fff',
+          cursorWidth: 2,
+          barWidth: 2,
+          barRadius: 2,
+          barGap: 1,
+          responsive: true,
+          height: 40,
+          normalize: true,
+          media,
+          interact: true
+        });
+
+        wavesurfer.current.on('ready', () => {
+          setIsLoading(false);
+          setIsReady(true);
+          const dur = wavesurfer.current.getDuration();
+          setDuration(formatTime(dur));
+        });
+
+        wavesurfer.current.on('audioprocess', () => {
+          if (wavesurfer.current) {
+            const cur = wavesurfer.current.getCurrentTime();
+            setCurrentTime(formatTime(cur));
+          }
+        });
+
+        wavesurfer.current.on('seeking', () => {
+          if (wavesurfer.current) {
+            const cur = wavesurfer.current.getCurrentTime();
+            setCurrentTime(formatTime(cur));
+          }
+        });
+
+        wavesurfer.current.on('play', () => {
+          setIsPlaying(true);
+          if (onPlay) onPlay(packId);
+        });
+
+        wavesurfer.current.on('pause', () => {
+          setIsPlaying(false);
+        });
+
+        wavesurfer.current.on('finish', () => {
+          setIsPlaying(false);
+          if (onStop) onStop(packId);
+        });
+
+        wavesurfer.current.on('error', (err) => {
+          console.error('MiniWaveformPlayer error:', err);
+          setError('Failed to load audio');
+          setIsLoading(false);
+        });
+
+        const channels = peaks && peaksForWidth(peaks, waveformRef.current.clientWidth);
+        if (channels) {
+          wavesurfer.current.load(audioUrl, channels, peaks.duration);
+        } else {
+          // No precomputed peaks yet: decode the audio in the browser
+          wavesurfer.current.load(audioUrl);
+        }
+      } catch (err) {
+        console.error('MiniWaveformPlayer initialization error:', err);
+        setError('Failed to initialize player');
         setIsLoading(false);
-      });
+      }
+    };
 
-      wavesurfer.current.load(audioUrl);
-    } catch (err) {
-      console.error('MiniWaveformPlayer initialization error:', err);
-      setError('Failed to initialize player');
-      setIsLoading(false);
-    }
+    init();
 
     return () => {
+      cancelled = true;
       if (wavesurfer.current) {
         try {
           wavesurfer.current.destroy();
@@ -1,7 +1,8 @@
 import { useState, useEffect, useRef, useCallback } from 'react';
 import WaveSurfer from 'wavesurfer.js';
+import { loadPeaks, peaksForWidth } from './peaks';
 
-const WaveformPlayer = ({ audioUrl, packTitle }) => {
+const WaveformPlayer = ({ audioUrl, packId, packTitle }) => {
   const waveformRef = useRef(null);
   const wavesurfer = useRef(null);
   const [isPlaying, setIsPlaying] = useState(false);
@@ -31,62 +32,82 @@ const WaveformPlayer = ({ audioUrl, packTitle }) => {
     setError(null);
     setIsReady(false);
 
-    try {
-      wavesurfer.current = WaveSurfer.create({
-        container: waveformRef.current,
-        waveColor: 'rgba(139, 92, 246, 0.4)',
-        progressColor: '#8B5CF6',
-        cursorColor: '#ffffff',
-        cursorWidth: 2,
-        barWidth: 3,
-        barRadius: 3,
-        barGap: 2,
-        responsive: true,
-        height: 80,
-        normalize: true,
-        backend: 'WebAudio',
-        interact: true
-      });
-
-      wavesurfer.current.on('ready', () => {
-        setIsLoading(false);
-        setIsReady(true);
-        const dur = wavesurfer.current.getDuration();
-        setDuration(formatTime(dur));
-      });
-
-      wavesurfer.current.on('audioprocess', () => {
-        if (wavesurfer.current) {
-          const cur = wavesurfer.current.getCurrentTime();
-          setCurrentTime(formatTime(cur));
-        }
-      });
+    let cancelled = false;
 
-      wavesurfer.current.on('seeking', () => {
-        if (wavesurfer.current) {
-          const cur = wavesurfer.current.getCurrentTime();
-          setCurrentTime(formatTime(cur));
-        }
-      });
+    const init = async () => {
+      const peaks = await loadPeaks(packId);
+      if (cancelled || !waveformRef.current) return;
 
-      wavesurfer.current.on('play', () => setIsPlaying(true));
-      wavesurfer.current.on('pause', () => setIsPlaying(false));
-      wavesurfer.current.on('finish', () => setIsPlaying(false));
+      // Stream through a media element that fetches nothing until play is pressed
+      const media = new Audio();
+      media.preload = 'none';
 
-      wavesurfer.current.on('error', (err) => {
-        console.error('WaveSurfer error:', err);
-        setError('Failed to load audio');
+      try {
+        wavesurfer.current = WaveSurfer.create({
+          container: waveformRef.current,
+          waveColor: 'rgba(139, 92, 246, 0.4)',
+          progressColor: '#8B5CF6',
+          cursorColor: '#ffffff',
+          cursorWidth: 2,
+          barWidth: 3,
+          barRadius: 3,
+          barGap: 2,
+          responsive: true,
+          height: 80,
+          normalize: true,
+          media,
+          interact: true
+        });
+
+        wavesurfer.current.on('ready', () => {
+          setIsLoading(false);
+          setIsReady(true);
+          const dur = wavesurfer.current.getDuration();
+          setDuration(formatTime(dur));
+        });
+
+        wavesurfer.current.on('audioprocess', () => {
+          if (wavesurfer.current) {
+            const cur = wavesurfer.current.getCurrentTime();
+            setCurrentTime(formatTime(cur));
+          }
+        });
+
+        wavesurfer.current.on('seeking', () => {
+          if (wavesurfer.current) {
+            const cur = wavesurfer.current.getCurrentTime();
+            setCurrentTime(formatTime(cur));
+          }
+        });
+
+        wavesurfer.current.on('play', () => setIsPlaying(true));
+        wavesurfer.current.on('pause', () => setIsPlaying(false));
+        wavesurfer.current.on('finish', () => setIsPlaying(false));
+
+        wavesurfer.current.on('error', (err) => {
+          console.error('WaveSurfer error:', err);
+          setError('Failed to load audio');
+          setIsLoading(false);
+        });
+
+        const channels = peaks && peaksForWidth(peaks, waveformRef.current.clientWidth);
+        if (channels) {
+          wavesurfer.current.load(audioUrl, channels, peaks.duration);
+        } else {
+          // No precomputed peaks yet: decode the audio in the browser
+          wavesurfer.current.load(audioUrl);
+        }
+      } catch (err) {
+        console.error('WaveSurfer initialization error:', err);
+        setError('Failed to initialize player');
         setIsLoading(false);
-      });
+      }
+    };
 
-      wavesurfer.current.load(audioUrl);
-    } catch (err) {
-      console.error('WaveSurfer initialization error:', err);
-      setError('Failed to initialize player');
-      setIsLoading(false);
-    }
+    init();
 
     return () => {
+      cancelled = true;
       if (wavesurfer.current) {
         try {
           wavesurfer.current.destroy();
@@ -96,7 +117,7 @@ const WaveformPlayer = ({ audioUrl, packTitle }) => {
         wavesurfer.current = null;
       }
     };
-  }, [audioUrl, formatTime]);
+  }, [audioUrl, packId, formatTime]);
 
   const togglePlay = () => {
     if (wavesurfer.current && isReady) {
@@ -0,0 +1,31 @@
+import { samplesAPI } from '../../utils/api';
+
+// Precomputed waveform peaks let wavesurfer draw without downloading audio.
+// Resolves to null when a pack has none yet, so players can fall back to
+// decoding the audio in the browser.
+export const loadPeaks = async (packId) => {
+  if (!packId) return null;
+  try {
+    const response = await samplesAPI.peaks(packId);
+    return response.data;
+  } catch (err) {
+    return null;
+  }
+};
+
+// Pick the coarsest level with at least one bucket per pixel and split the
+// interleaved int8 [min, max, ...] values into wavesurfer channels (-1..1)
+export const peaksForWidth = (peaks, width) => {
+  const resolutions = Object.keys(peaks.levels).map(Number).sort((a, b) => a - b);
+  if (resolutions.length === 0) return null;
+  const resolution = resolutions.find((r) => r >= width) || resolutions[resolutions.length - 1];
+  const values = peaks.levels[resolution];
+  const scale = 2 ** (peaks.bits - 1) - 1;
+  const mins = new Float32Array(values.length / 2);
+  const maxs = new Float32Array(values.length / 2);
+  for (let i = 0; i < mins.length; i++) {
+    mins[i] = values[2 * i] / scale;
+    maxs[i] = values[2 * i + 1] / scale;
+  }
+  return [maxs, mins];
+};
@@ -296,7 +296,8 @@ const Browse = () => {
                 </button>
               </div>
               <WaveformPlayer
-                audioUrl={`${process.env.REACT_APP_BACKEND_URL}${selectedSample.audio_file_path}`}
+                audioUrl={`${process.env.REACT_APP_BACKEND_URL}/api/samples/${selectedSample.pack_id}/preview`}
+                packId={selectedSample.pack_id}
                 packTitle={selectedSample.title}
               />
             </div>
@@ -184,7 +184,8 @@ const Sync = () => {
                 </button>
               </div>
               <WaveformPlayer
-                audioUrl={`${process.env.REACT_APP_BACKEND_URL}${selectedSample.audio_file_path}`}
+                audioUrl={`${process.env.REACT_APP_BACKEND_URL}/api/samples/${selectedSample.pack_id}/preview`}
+                packId={selectedSample.pack_id}
                 packTitle={selectedSample.title}
               />
               {(selectedSample.bpm || selectedSample.key) && (
@@ -19,7 +19,8 @@ export const authAPI = {
 export const samplesAPI = {
   list: (params) => api.get('/samples', { params }),
   get: (packId) => api.get(`/samples/${packId}`),
-  download: (packId) => api.get(`/samples/${packId}/download`, { responseType: 'blob' })
+  download: (packId) => api.get(`/samples/${packId}/download`, { responseType: 'blob' }),
+  peaks: (packId) => api.get(`/samples/${packId}/peaks`)
 };
 
 export const purchaseAPI = {
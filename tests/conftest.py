@@ -0,0 +1,18 @@
+"""Shared fixtures for the backend unit tests.
+
+Backend modules are imported directly from backend/. Mongo is replaced by
+mongomock-motor's in-memory client, so these tests need no running server.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+
+@pytest.fixture
+def mongo_db():
+    from mongomock_motor import AsyncMongoMockClient
+    return AsyncMongoMockClient()["sounddrops_test"]
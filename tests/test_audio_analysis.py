@@ -0,0 +1,48 @@
+"""
+ffmpeg decoding tests, against a stand-in ffmpeg script
+"""
+import sys
+
+import numpy as np
+import pytest
+
+from audio_analysis import FFMPEG_ERROR_CHARS, AudioDecodeError, iter_audio_blocks
+
+# Writes a lot of stderr before and while streaming stdout, as ffmpeg does
+# for a damaged file, then exits with `status`
+FAKE_FFMPEG = """#!{python}
+import struct, sys
+for _ in range(2000):
+    sys.stderr.write("x" * 200 + "\\n")
+sys.stdout.buffer.write(struct.pack("<4f", 0.0, 0.5, -0.5, 1.0))
+sys.stdout.flush()
+sys.stderr.write("last error line\\n")
+sys.exit({status})
+"""
+
+
+def fake_ffmpeg(tmp_path, monkeypatch, status):
+    script = tmp_path / "ffmpeg"
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable, status=status))
+    script.chmod(0o755)
+    monkeypatch.setenv("FFMPEG_BINARY", str(script))
+    source = tmp_path / "input.mp3"
+    source.write_bytes(b"\0" * 16)
+    return source
+
+
+class TestFfmpegDecoding:
+    """Verbose ffmpeg stderr can't stall decoding"""
+
+    def test_decodes_despite_verbose_stderr(self, tmp_path, monkeypatch):
+        source = fake_ffmpeg(tmp_path, monkeypatch, status=0)
+        blocks = [block for block, _ in iter_audio_blocks(source)]
+        assert np.array_equal(np.concatenate(blocks), np.array([0.0, 0.5, -0.5, 1.0], dtype=np.float32))
+
+    def test_failure_reports_the_end_of_stderr(self, tmp_path, monkeypatch):
+        source = fake_ffmpeg(tmp_path, monkeypatch, status=1)
+        with pytest.raises(AudioDecodeError) as error:
+            list(iter_audio_blocks(source))
+        message = str(error.value)
+        assert message.endswith("last error line")
+        assert len(message) <= FFMPEG_ERROR_CHARS
@@ -0,0 +1,59 @@
+"""
+Blob store reference counting tests
+"""
+import asyncio
+import hashlib
+
+import pytest
+
+from blobstore import BlobStore
+from ingest import stage_file
+from storage import LocalStorage
+
+LIMIT = 10 * 1024 * 1024
+
+
+@pytest.fixture
+def store(mongo_db, tmp_path):
+    asyncio.run(mongo_db.blobs.create_index("path", unique=True))
+    return BlobStore(LocalStorage(tmp_path), mongo_db.blobs, tmp_path / "staging")
+
+
+def stage(store, tmp_path, name, content):
+    source = tmp_path / f"src_{name}"
+    source.write_bytes(content)
+    return asyncio.run(stage_file(source, store.staging_path(name), "audio", LIMIT))
+
+
+class TestPackReferences:
+    """A pack holds one reference per distinct blob"""
+
+    def test_duplicate_files_in_one_pack_are_removed_with_it(self, store, tmp_path):
+        audio = stage(store, tmp_path, "a.wav", b"same audio")
+        preview = stage(store, tmp_path, "p.wav", b"same audio")
+        cover = stage(store, tmp_path, "c.png", b"cover")
+
+        paths = asyncio.run(store.put_all([(audio, "wav"), (cover, "png"), (preview, "wav")]))
+        assert paths[0] == paths[2]
+        assert not preview.temp_path.exists()
+        blob = asyncio.run(store.collection.find_one({"path": paths[0]}))
+        assert blob["refcount"] == 1
+
+        pack = {"audio_file_path": paths[0], "cover_image_path": paths[1], "preview_audio_path": paths[2]}
+        removed = asyncio.run(store.release_pack(pack))
+        assert removed == 2
+        assert not (tmp_path / paths[0]).exists()
+        assert not (tmp_path / paths[1]).exists()
+        assert asyncio.run(store.collection.count_documents({})) == 0
+
+    def test_shared_blob_survives_until_last_pack_is_deleted(self, store, tmp_path):
+        first = asyncio.run(store.put_all([(stage(store, tmp_path, "1.wav", b"loop"), "wav")]))
+        second = asyncio.run(store.put_all([(stage(store, tmp_path, "2.wav", b"loop"), "wav")]))
+        assert first == second
+        path = first[0]
+        assert path == store.blob_path(hashlib.sha256(b"loop").hexdigest(), "wav")
+
+        assert asyncio.run(store.release_pack({"audio_file_path": path})) == 0
+        assert (tmp_path / path).read_bytes() == b"loop"
+        assert asyncio.run(store.release_pack({"audio_file_path": path})) == 1
+        assert not (tmp_path / path).exists()
@@ -0,0 +1,137 @@
+"""
+In-process cache tests: single-flight loading and session invalidation
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from cache import LoadingCache, SessionCache
+
+
+class Loader:
+    """Counts calls; each call waits until released"""
+
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        return self.value
+
+
+class TestLoadingCache:
+    """Read-through pack cache with single-flight misses"""
+
+    def test_miss_then_hit(self):
+        async def run():
+            cache = LoadingCache(maxsize=10, ttl=60)
+            loader = Loader({"pack_id": "pack_a"})
+            loader.release.set()
+            first = await cache.get_or_load("pack_a", loader)
+            second = await cache.get_or_load("pack_a", loader)
+            return cache, loader, first, second
+
+        cache, loader, first, second = asyncio.run(run())
+        assert first == second == {"pack_id": "pack_a"}
+        assert loader.calls == 1
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    def test_concurrent_misses_share_one_load(self):
+        async def run():
+            cache = LoadingCache(maxsize=10, ttl=60)
+            loader = Loader({"pack_id": "pack_a"})
+            tasks = [asyncio.create_task(cache.get_or_load("pack_a", loader)) for _ in range(5)]
+            await asyncio.sleep(0)
+            loader.release.set()
+            return cache, loader, await asyncio.gather(*tasks)
+
+        cache, loader, results = asyncio.run(run())
+        assert loader.calls == 1
+        assert all(result == {"pack_id": "pack_a"} for result in results)
+        assert cache.stats()["coalesced"] == 4
+
+    def test_missing_values_are_not_cached(self):
+        async def run():
+            cache = LoadingCache(maxsize=10, ttl=60)
+            loader = Loader(None)
+            loader.release.set()
+            await cache.get_or_load("gone", loader)
+            await cache.get_or_load("gone", loader)
+            return loader.calls
+
+        assert asyncio.run(run()) == 2
+
+    def test_load_overlapping_an_invalidation_is_not_stored(self):
+        async def run():
+            cache = LoadingCache(maxsize=10, ttl=60)
+            stale = Loader({"title": "old"})
+            task = asyncio.create_task(cache.get_or_load("pack_a", stale))
+            await asyncio.sleep(0)
+            # The pack is updated while the read is in flight
+            cache.invalidate("pack_a")
+            stale.release.set()
+            returned = await task
+            fresh = Loader({"title": "new"})
+            fresh.release.set()
+            return returned, await cache.get_or_load("pack_a", fresh), fresh.calls
+
+        returned, current, fresh_calls = asyncio.run(run())
+        assert returned == {"title": "old"}
+        assert current == {"title": "new"}
+        assert fresh_calls == 1
+
+    def test_load_overlapping_a_clear_is_not_stored(self):
+        async def run():
+            cache = LoadingCache(maxsize=10, ttl=60)
+            stale = Loader({"title": "old"})
+            task = asyncio.create_task(cache.get_or_load("pack_a", stale))
+            await asyncio.sleep(0)
+            cache.clear()
+            stale.release.set()
+            await task
+            return cache.get("pack_a")
+
+        assert asyncio.run(run()) is None
+
+    def test_invalidate_drops_a_cached_value(self):
+        async def run():
+            cache = LoadingCache(maxsize=10, ttl=60)
+            loader = Loader({"pack_id": "pack_a"})
+            loader.release.set()
+            await cache.get_or_load("pack_a", loader)
+            cache.invalidate("pack_a")
+            await cache.get_or_load("pack_a", loader)
+            return cache, loader.calls
+
+        cache, calls = asyncio.run(run())
+        assert calls == 2
+        assert cache.stats()["invalidations"] == 1
+
+
+class TestSessionCache:
+    """Session token -> user, dropped on expiry or when the user changes"""
+
+    def test_invalidate_user_drops_all_their_sessions(self):
+        cache = SessionCache(maxsize=10, ttl=60)
+        expires_at = datetime.now(timezone.utc) + timedelta(days=1)
+        alice = SimpleNamespace(user_id="user_alice")
+        bob = SimpleNamespace(user_id="user_bob")
+        cache.put_user("token_1", alice, expires_at)
+        cache.put_user("token_2", alice, expires_at)
+        cache.put_user("token_3", bob, expires_at)
+
+        assert cache.invalidate_user("user_alice") == 2
+        assert cache.get_user("token_1") is None
+        assert cache.get_user("token_2") is None
+        assert cache.get_user("token_3") is bob
+
+    def test_expired_session_is_not_returned(self):
+        cache = SessionCache(maxsize=10, ttl=60)
+        user = SimpleNamespace(user_id="user_alice")
+        cache.put_user("token_1", user, datetime.now(timezone.utc) - timedelta(seconds=1))
+        assert cache.get_user("token_1") is None
+        assert cache.stats()["size"] == 0
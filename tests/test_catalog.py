@@ -0,0 +1,49 @@
+"""
+Catalog version change log tests
+"""
+import asyncio
+
+import catalog
+from catalog import bump_version, bump_version_all, changed_since, current_version
+
+
+def catalog_doc(db):
+    return asyncio.run(db.catalog_meta.find_one({"_id": catalog.CATALOG_ID}))
+
+
+class TestChangeLog:
+    """Workers catch up on just the packs changed since their version"""
+
+    def test_changes_since_a_version(self, mongo_db):
+        for pack_id in ["pack_a", "pack_b", "pack_a", "pack_c"]:
+            asyncio.run(bump_version(mongo_db.catalog_meta, [pack_id]))
+        doc = catalog_doc(mongo_db)
+        assert current_version(doc) == 4
+        assert changed_since(doc, 4) == set()
+        assert changed_since(doc, 3) == {"pack_c"}
+        assert changed_since(doc, 1) == {"pack_a", "pack_b", "pack_c"}
+        assert changed_since(doc, 0) == {"pack_a", "pack_b", "pack_c"}
+
+    def test_gap_beyond_the_log_needs_a_full_rebuild(self, mongo_db, monkeypatch):
+        monkeypatch.setattr(catalog, "CHANGE_LOG_SIZE", 2)
+        for pack_id in ["pack_a", "pack_b", "pack_c"]:
+            asyncio.run(bump_version(mongo_db.catalog_meta, [pack_id]))
+        doc = catalog_doc(mongo_db)
+        assert doc["changes"] == [["pack_b"], ["pack_c"]]
+        assert changed_since(doc, 1) == {"pack_b", "pack_c"}
+        assert changed_since(doc, 0) is None
+
+    def test_bulk_bump_clears_the_log(self, mongo_db):
+        asyncio.run(bump_version(mongo_db.catalog_meta, ["pack_a"]))
+        asyncio.run(bump_version_all(mongo_db.catalog_meta))
+        asyncio.run(bump_version(mongo_db.catalog_meta, ["pack_b"]))
+        doc = catalog_doc(mongo_db)
+        assert current_version(doc) == 3
+        assert changed_since(doc, 2) == {"pack_b"}
+        assert changed_since(doc, 1) is None
+
+    def test_log_from_before_changes_were_recorded(self):
+        # A document written before the change log existed, or none at all
+        assert changed_since({"_id": "catalog", "version": 7}, 6) is None
+        assert changed_since(None, 0) == set()
+        assert changed_since({"_id": "catalog", "version": 2, "changes": [["a"]]}, 5) is None
@@ -0,0 +1,103 @@
+"""
+Write-behind download recorder tests
+"""
+import asyncio
+
+from pymongo.errors import AutoReconnect
+
+import download_recorder
+from download_recorder import DownloadRecorder
+
+
+class StallingPacks:
+    """packs collection whose first bulk_write never returns"""
+
+    def __init__(self, packs):
+        self.packs = packs
+        self.stalled = asyncio.Event()
+
+    async def bulk_write(self, operations, **kwargs):
+        if not self.stalled.is_set():
+            self.stalled.set()
+            await asyncio.Event().wait()
+        return await self.packs.bulk_write(operations, **kwargs)
+
+
+async def pack_with_downloads(db):
+    await db.downloads.create_index("download_id", unique=True)
+    await db.sample_packs.insert_one({"pack_id": "pack_a", "download_count": 0})
+
+
+async def download_count(db):
+    return (await db.sample_packs.find_one({"pack_id": "pack_a"}))["download_count"]
+
+
+class TestJournalSegments:
+    """Segments rotate by size, not only when the flusher is idle"""
+
+    def test_segments_rotate_under_sustained_load(self, mongo_db, tmp_path, monkeypatch):
+        monkeypatch.setattr(download_recorder, "SEGMENT_MAX_EVENTS", 2)
+
+        async def run():
+            await pack_with_downloads(mongo_db)
+            recorder = DownloadRecorder(
+                mongo_db.downloads, mongo_db.sample_packs,
+                batch_size=1000, flush_seconds=60, journal_dir=tmp_path
+            )
+            await recorder.start()
+            for _ in range(5):
+                await recorder.record("user_1", "pack_a")
+            segments = tmp_path.glob(download_recorder.SEGMENT_GLOB)
+            journaled = sorted(len(path.read_text().splitlines()) for path in segments)
+            await recorder.stop()
+            return journaled
+
+        assert asyncio.run(run()) == [1, 2, 2]
+        assert list(tmp_path.glob(download_recorder.SEGMENT_GLOB)) == []
+        assert asyncio.run(download_count(mongo_db)) == 5
+
+
+class TestShutdown:
+    """stop() resumes the batch the flusher was writing"""
+
+    def test_inserted_batch_is_still_counted(self, mongo_db):
+        async def run():
+            await pack_with_downloads(mongo_db)
+            packs = StallingPacks(mongo_db.sample_packs)
+            recorder = DownloadRecorder(mongo_db.downloads, packs, batch_size=3, flush_seconds=60)
+            await recorder.start()
+            for _ in range(3):
+                await recorder.record("user_1", "pack_a")
+            # The batch is inserted and the flusher is stuck on the $inc
+            await packs.stalled.wait()
+            assert await mongo_db.downloads.count_documents({}) == 3
+            await recorder.record("user_1", "pack_a")
+            await recorder.stop()
+            return await mongo_db.downloads.count_documents({}), await download_count(mongo_db)
+
+        assert asyncio.run(run()) == (4, 4)
+
+
+class TestFlushHook:
+    """The on_flush hook runs once per batch, even when it fails"""
+
+    def test_failed_hook_is_not_rerun(self, mongo_db):
+        calls = []
+
+        async def on_flush(downloads):
+            calls.append(len(downloads))
+            raise AutoReconnect("rollup write failed")
+
+        async def run():
+            await pack_with_downloads(mongo_db)
+            recorder = DownloadRecorder(
+                mongo_db.downloads, mongo_db.sample_packs, batch_size=2, flush_seconds=60, on_flush=on_flush
+            )
+            await recorder.start()
+            for _ in range(2):
+                await recorder.record("user_1", "pack_a")
+            await recorder.stop()
+            return await download_count(mongo_db)
+
+        assert asyncio.run(run()) == 2
+        assert calls == [2]
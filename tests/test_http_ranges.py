@@ -0,0 +1,96 @@
+"""
+HTTP Range parsing and 206/416 response tests
+"""
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from http_ranges import RangeNotSatisfiable, parse_range, requested_range, stream_range_response
+
+BODY = bytes(range(256)) * 4
+ETAG = '"body-v1"'
+
+
+def body_app():
+    app = FastAPI()
+
+    @app.get("/file")
+    async def serve(request: Request):
+        byte_range = requested_range(request, len(BODY), ETAG)
+        start, end = byte_range or (0, len(BODY) - 1)
+        return stream_range_response(
+            iter([BODY[start:end + 1]]), len(BODY), byte_range, "application/octet-stream", {"ETag": ETAG}
+        )
+
+    return TestClient(app)
+
+
+class TestParseRange:
+    """Range header -> inclusive (start, end), None for the whole body"""
+
+    def test_closed_range(self):
+        assert parse_range("bytes=0-99", 1000) == (0, 99)
+        assert parse_range("bytes=500-5000", 1000) == (500, 999)
+
+    def test_open_ended(self):
+        assert parse_range("bytes=900-", 1000) == (900, 999)
+
+    def test_suffix(self):
+        assert parse_range("bytes=-100", 1000) == (900, 999)
+        assert parse_range("bytes=-5000", 1000) == (0, 999)
+
+    def test_unsatisfiable(self):
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=1000-", 1000)
+        with pytest.raises(RangeNotSatisfiable):
+            parse_range("bytes=-0", 1000)
+
+    def test_whole_body_fallbacks(self):
+        assert parse_range(None, 1000) is None
+        assert parse_range("bytes=0-99", 0) is None
+        # Several ranges are answered with the whole body, not multipart
+        assert parse_range("bytes=0-9, 20-29", 1000) is None
+        assert parse_range("items=0-9", 1000) is None
+        assert parse_range("bytes=abc-", 1000) is None
+        assert parse_range("bytes=50-10", 1000) is None
+
+
+class TestRangeResponses:
+    """206 with Content-Range, 416 past the end, 200 otherwise"""
+
+    def test_partial_content(self):
+        response = body_app().get("/file", headers={"Range": "bytes=10-19"})
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 10-19/{len(BODY)}"
+        assert response.headers["content-length"] == "10"
+        assert response.content == BODY[10:20]
+
+    def test_suffix_and_open_ended(self):
+        client = body_app()
+        response = client.get("/file", headers={"Range": "bytes=-24"})
+        assert response.status_code == 206
+        assert response.content == BODY[-24:]
+        response = client.get("/file", headers={"Range": "bytes=1000-"})
+        assert response.headers["content-range"] == f"bytes 1000-1023/{len(BODY)}"
+        assert response.content == BODY[1000:]
+
+    def test_unsatisfiable(self):
+        response = body_app().get("/file", headers={"Range": f"bytes={len(BODY)}-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(BODY)}"
+
+    def test_multiple_ranges_get_the_whole_body(self):
+        response = body_app().get("/file", headers={"Range": "bytes=0-9,20-29"})
+        assert response.status_code == 200
+        assert response.headers["accept-ranges"] == "bytes"
+        assert response.content == BODY
+
+    def test_if_range(self):
+        client = body_app()
+        response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": ETAG})
+        assert response.status_code == 206
+        assert response.content == BODY[:10]
+        # The client's partial copy is of another version
+        response = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"body-v0"'})
+        assert response.status_code == 200
+        assert response.content == BODY
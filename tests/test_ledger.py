@@ -0,0 +1,103 @@
+"""
+Creator earnings ledger tests
+"""
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from indexes import ensure_indexes
+from ledger import CreatorLedger, InsufficientBalance
+
+CREATOR = "user_creator"
+
+
+def purchase(purchase_id, amount, pack_id="pack_a"):
+    return {
+        "purchase_id": purchase_id,
+        "user_id": "user_buyer",
+        "pack_id": pack_id,
+        "amount": amount,
+        "created_at": datetime.now(timezone.utc)
+    }
+
+
+@pytest.fixture
+def ledger(mongo_db):
+    asyncio.run(ensure_indexes(mongo_db))
+    asyncio.run(mongo_db.sample_packs.insert_one({"pack_id": "pack_a", "creator_id": CREATOR}))
+    return CreatorLedger(mongo_db)
+
+
+async def checkout(ledger, session_id, doc):
+    """What the purchase status check does for a paid session"""
+    if await ledger.create_purchase(session_id, doc):
+        await ledger.record_sale(CREATOR, doc)
+
+
+class TestSalesAndPayouts:
+    """Balances move with sales and payouts, in cents"""
+
+    def test_purchase_credits_the_creator(self, ledger):
+        asyncio.run(checkout(ledger, "cs_1", purchase("pur_1", 9.99)))
+        balance = asyncio.run(ledger.balance(CREATOR))
+        assert balance == {
+            "revenue_cents": 999, "earned_cents": 899, "paid_cents": 0, "available_cents": 899, "sales": 1
+        }
+
+    def test_payout_debits_the_available_balance(self, ledger):
+        asyncio.run(checkout(ledger, "cs_1", purchase("pur_1", 20.00)))
+        asyncio.run(ledger.reserve_payout(CREATOR, "payout_1", 1500))
+        balance = asyncio.run(ledger.balance(CREATOR))
+        assert (balance["paid_cents"], balance["available_cents"]) == (1500, 300)
+
+        with pytest.raises(InsufficientBalance) as error:
+            asyncio.run(ledger.reserve_payout(CREATOR, "payout_2", 301))
+        assert error.value.available_cents == 300
+
+        asyncio.run(ledger.cancel_payout(CREATOR, "payout_1", 1500))
+        assert asyncio.run(ledger.balance(CREATOR))["available_cents"] == 1800
+
+    def test_redelivered_checkout_session_is_credited_once(self, ledger, mongo_db):
+        asyncio.run(checkout(ledger, "cs_1", purchase("pur_1", 10.00)))
+        # The same paid session again, as a new purchase document
+        asyncio.run(checkout(ledger, "cs_1", purchase("pur_2", 10.00)))
+        assert asyncio.run(mongo_db.purchases.count_documents({})) == 1
+        assert asyncio.run(mongo_db.ledger_entries.count_documents({})) == 1
+        balance = asyncio.run(ledger.balance(CREATOR))
+        assert (balance["sales"], balance["earned_cents"]) == (1, 900)
+
+    def test_sale_is_entered_once_per_purchase(self, ledger):
+        doc = purchase("pur_1", 5.00)
+        assert asyncio.run(ledger.record_sale(CREATOR, doc)) is True
+        assert asyncio.run(ledger.record_sale(CREATOR, doc)) is False
+        assert asyncio.run(ledger.balance(CREATOR))["sales"] == 1
+
+
+class TestReconcile:
+    """reconcile() finds and repairs drift between entries and balances"""
+
+    def test_drifted_balance_is_reported_and_fixed(self, ledger, mongo_db):
+        asyncio.run(checkout(ledger, "cs_1", purchase("pur_1", 10.00)))
+        asyncio.run(checkout(ledger, "cs_2", purchase("pur_2", 5.00)))
+        # A crash between an entry and its $inc leaves the balance behind
+        asyncio.run(mongo_db.creator_balances.update_one(
+            {"creator_id": CREATOR}, {"$inc": {"earned_cents": -450, "available_cents": -450}}
+        ))
+
+        report = asyncio.run(ledger.reconcile())
+        assert report["balance_mismatches"] == [
+            {"creator_id": CREATOR, "delta": {"earned_cents": 450, "available_cents": 450}}
+        ]
+        assert asyncio.run(ledger.balance(CREATOR))["available_cents"] == 900
+
+        asyncio.run(ledger.reconcile(fix=True))
+        assert asyncio.run(ledger.balance(CREATOR))["available_cents"] == 1350
+        assert asyncio.run(ledger.reconcile())["balance_mismatches"] == []
+
+    def test_purchase_without_an_entry_is_entered(self, ledger, mongo_db):
+        asyncio.run(mongo_db.purchases.insert_one(purchase("pur_1", 10.00)))
+        report = asyncio.run(ledger.reconcile(fix=True))
+        assert report["missing_sales"] == 1
+        assert asyncio.run(ledger.balance(CREATOR))["earned_cents"] == 900
+        assert asyncio.run(ledger.reconcile())["missing_sales"] == 0
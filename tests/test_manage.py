@@ -0,0 +1,99 @@
+"""
+Maintenance command tests, against local storage and an in-memory Mongo
+"""
+import asyncio
+import io
+import wave
+import zipfile
+from argparse import Namespace
+
+import numpy as np
+import pytest
+
+import manage
+
+SAMPLE_RATE = 8000
+
+
+def wav_bytes(seconds: float) -> bytes:
+    samples = (0.25 * np.sin(np.linspace(0, 440 * 2 * np.pi * seconds, int(SAMPLE_RATE * seconds)))).astype("<f4")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes((samples * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def zip_pack(mongo_db, tmp_path, monkeypatch):
+    """A ZIP pack with two loops, stored under the (local) storage root"""
+    monkeypatch.setattr(manage, "ROOT_DIR", tmp_path)
+    monkeypatch.setenv("STORAGE_BACKEND", "local")
+    (tmp_path / "zip_files").mkdir()
+    with zipfile.ZipFile(tmp_path / "zip_files" / "pack_a.zip", "w") as zf:
+        zf.writestr("loops/one.wav", wav_bytes(1.0))
+        zf.writestr("loops/two.wav", wav_bytes(0.5))
+    asyncio.run(mongo_db.sample_packs.insert_one({
+        "pack_id": "pack_a", "file_type": "zip", "audio_file_path": "zip_files/pack_a.zip",
+        "zip_manifest": [{"name": "loops/one.wav"}, {"name": "loops/two.wav"}],
+    }))
+    return mongo_db
+
+
+def pack(db):
+    return asyncio.run(db.sample_packs.find_one({"pack_id": "pack_a"}))
+
+
+class TestBackfillAudioMetadata:
+    """ZIP packs get per-member results, as uploads do"""
+
+    def test_members_are_merged_into_the_manifest(self, zip_pack):
+        args = Namespace(force=False, workers=1)
+        assert asyncio.run(manage.cmd_backfill_audio_metadata(zip_pack, args)) == 0
+        doc = pack(zip_pack)
+        assert doc["duration"] == pytest.approx(1.5, abs=0.01)
+        durations = [entry["audio"]["duration"] for entry in doc["zip_manifest"]]
+        assert durations == [pytest.approx(1.0, abs=0.01), pytest.approx(0.5, abs=0.01)]
+        assert all("loudness_lufs" in entry["audio"] for entry in doc["zip_manifest"])
+
+    def test_missing_files_are_skipped(self, zip_pack, tmp_path):
+        (tmp_path / "zip_files" / "pack_a.zip").unlink()
+        assert asyncio.run(manage.cmd_backfill_audio_metadata(zip_pack, Namespace(force=False, workers=1))) == 0
+        assert "audio_metadata" not in pack(zip_pack)
+
+
+def catalog_version(db):
+    doc = asyncio.run(db.catalog_meta.find_one({"_id": "catalog"}))
+    return doc["version"] if doc else 0
+
+
+class TestBackfillKeyNormalized:
+    """Workers are told to drop catalog state the backfill changed"""
+
+    def test_bumps_the_catalog_version_when_packs_change(self, mongo_db):
+        asyncio.run(mongo_db.sample_packs.insert_one({"pack_id": "pack_a", "key": "A min"}))
+        assert asyncio.run(manage.cmd_backfill_key_normalized(mongo_db, Namespace())) == 0
+        assert pack(mongo_db)["key_normalized"] == "Am"
+        assert catalog_version(mongo_db) == 1
+        # Nothing left to fill: no bump
+        asyncio.run(manage.cmd_backfill_key_normalized(mongo_db, Namespace()))
+        assert catalog_version(mongo_db) == 1
+
+
+class TestBackfillZipManifests:
+    """Indexed ZIPs get a manifest, and workers drop their cached copies"""
+
+    def test_writes_the_manifest_and_bumps_the_catalog_version(self, zip_pack):
+        asyncio.run(zip_pack.sample_packs.update_one({"pack_id": "pack_a"}, {"$unset": {"zip_manifest": ""}}))
+        args = Namespace(force=False, workers=1)
+        assert asyncio.run(manage.cmd_backfill_zip_manifests(zip_pack, args)) == 0
+        doc = pack(zip_pack)
+        assert [entry["name"] for entry in doc["zip_manifest"]] == ["loops/one.wav", "loops/two.wav"]
+        assert doc["zip_file_count"] == 2
+        assert catalog_version(zip_pack) == 1
+
+    def test_no_bump_when_nothing_was_indexed(self, zip_pack):
+        assert asyncio.run(manage.cmd_backfill_zip_manifests(zip_pack, Namespace(force=False, workers=1))) == 0
+        assert catalog_version(zip_pack) == 0
@@ -0,0 +1,56 @@
+"""
+Cursor encoding and validation tests
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pagination import USERS_SORT, decode_cursor, decode_position_cursor, encode_cursor, fetch_page
+
+
+class TestPositionCursor:
+    """Relevance and contents cursors hold one non-negative position"""
+
+    def test_round_trip(self):
+        assert decode_position_cursor(encode_cursor("relevance", [40]), "relevance") == 40
+        assert decode_position_cursor(encode_cursor("relevance", [0]), "relevance") == 0
+
+    @pytest.mark.parametrize("values", [[], [-1], [1, 2], ["20"], [2.5], [True], [None]])
+    def test_rejects_anything_but_one_non_negative_int(self, values):
+        with pytest.raises(ValueError):
+            decode_position_cursor(encode_cursor("relevance", values), "relevance")
+
+    def test_rejects_other_sorts_and_garbage(self):
+        with pytest.raises(ValueError):
+            decode_position_cursor(encode_cursor("contents", [10]), "relevance")
+        with pytest.raises(ValueError):
+            decode_position_cursor("not-a-cursor", "relevance")
+
+    def test_keyset_cursor_round_trip(self):
+        assert decode_cursor(encode_cursor("downloads", [12, "pack_a"]), "downloads") == [12, "pack_a"]
+
+
+class TestKeysetPages:
+    """Every document is returned exactly once, however many pages"""
+
+    def test_admin_user_listing_pages_through_all_users(self, mongo_db):
+        signup = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        users = [
+            # Two users share a signup time; user_id breaks the tie
+            {"user_id": f"user_{i}", "email": f"u{i}@example.com", "created_at": signup + timedelta(minutes=i // 2)}
+            for i in range(7)
+        ]
+        asyncio.run(mongo_db.users.insert_many([dict(user) for user in users]))
+
+        async def all_pages():
+            seen, cursor = [], None
+            while True:
+                docs, cursor = await fetch_page(
+                    mongo_db.users, {}, "users", USERS_SORT, 3, cursor, {"_id": 0, "user_id": 1, "created_at": 1}
+                )
+                seen += [doc["user_id"] for doc in docs]
+                if not cursor:
+                    return seen
+
+        assert asyncio.run(all_pages()) == [user["user_id"] for user in users]
@@ -0,0 +1,92 @@
+"""
+In-memory pack search tests: BM25 ranking, prefix and typo matching
+"""
+from search_index import SearchIndex, tokenize
+
+PACKS = [
+    {"pack_id": "pack_drums", "title": "Dusty Drum Breaks", "tags": ["drums", "breaks"], "category": "Drums"},
+    {"pack_id": "pack_lofi", "title": "Lofi Keys", "tags": ["piano", "lofi"], "category": "Keys",
+     "description": "Warm piano with some drum textures"},
+    {"pack_id": "pack_synth", "title": "Analog Synthwave", "tags": ["synth", "retro"], "category": "Synths"},
+    {"pack_id": "pack_vocals", "title": "Soul Vocals", "tags": ["vocals"], "category": "Vocals",
+     "creator_name": "Beyoncé Fan"},
+]
+
+
+def build():
+    index = SearchIndex()
+    index.rebuild(PACKS)
+    return index
+
+
+def ids(results):
+    return [pack_id for pack_id, _ in results]
+
+
+class TestRanking:
+    """BM25 with field weights"""
+
+    def test_title_and_tag_hits_outrank_description(self):
+        results = build().search("drums")
+        assert ids(results)[0] == "pack_drums"
+        assert results == sorted(results, key=lambda item: -item[1])
+
+    def test_exact_term_outranks_prefix_expansion(self):
+        index = SearchIndex()
+        index.rebuild([
+            {"pack_id": "exact", "title": "Bass"},
+            {"pack_id": "prefix", "title": "Bassline"},
+        ])
+        assert ids(index.search("bass")) == ["exact", "prefix"]
+
+    def test_every_query_token_contributes(self):
+        results = build().search("lofi piano")
+        assert ids(results) == ["pack_lofi"]
+
+    def test_limit_and_empty_queries(self):
+        index = build()
+        assert len(index.search("s", limit=1)) <= 1
+        assert index.search("") == []
+        assert index.search("!!!") == []
+        assert SearchIndex().search("drums") == []
+
+
+class TestMatching:
+    """Prefix (search-as-you-type) and typo tolerance"""
+
+    def test_prefix(self):
+        assert ids(build().search("synthw")) == ["pack_synth"]
+
+    def test_single_character_is_not_a_prefix(self):
+        assert build().search("v") == []
+
+    def test_fuzzy_one_edit(self):
+        assert "pack_vocals" in ids(build().search("vocels"))
+
+    def test_fuzzy_transposition_on_long_term(self):
+        assert ids(build().search("synthwaev")) == ["pack_synth"]
+
+    def test_short_terms_need_an_exact_match(self):
+        assert build().search("pno") == []
+
+    def test_accents_are_folded(self):
+        assert tokenize("Beyoncé") == ["beyonce"]
+        assert ids(build().search("beyonce")) == ["pack_vocals"]
+
+
+class TestMaintenance:
+    """Incremental add/remove keep the index consistent"""
+
+    def test_reindex_replaces_old_terms(self):
+        index = build()
+        index.add({"pack_id": "pack_synth", "title": "Modular Bleeps"})
+        assert index.search("synthwave") == []
+        assert ids(index.search("modular")) == ["pack_synth"]
+        assert len(index) == len(PACKS)
+
+    def test_remove(self):
+        index = build()
+        index.remove("pack_drums")
+        index.remove("pack_missing")
+        assert "pack_drums" not in ids(index.search("drums"))
+        assert len(index) == len(PACKS) - 1
@@ -0,0 +1,101 @@
+"""
+Storage backend tests: key handling and local round trips
+"""
+import asyncio
+from urllib.parse import urlparse
+
+import pytest
+
+from storage import LocalStorage, S3Storage, local_copy, storage_from_env
+
+KEY = "blobs/ab/abcdef.wav"
+CONTENT = bytes(range(256)) * 512
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "upload.wav"
+    path.write_bytes(CONTENT)
+    return path
+
+
+class TestLocalStorage:
+    """Files live at root / key"""
+
+    def test_round_trip(self, tmp_path, source):
+        storage = LocalStorage(tmp_path / "root")
+        assert not storage.exists(KEY)
+        assert storage.stat(KEY) is None
+
+        storage.put_file(KEY, source)
+        assert not source.exists()
+        assert storage.local_path(KEY) == tmp_path / "root" / KEY
+        assert storage.exists(KEY)
+        stored = storage.stat(KEY)
+        assert stored.size == len(CONTENT)
+        assert stored.etag.startswith('"') and stored.etag.endswith('"')
+
+        with storage.open(KEY) as f:
+            assert f.read() == CONTENT
+        assert b"".join(storage.iter_range(KEY, 100, 70000)) == CONTENT[100:70001]
+        storage.download(KEY, tmp_path / "copy.wav")
+        assert (tmp_path / "copy.wav").read_bytes() == CONTENT
+
+        storage.delete(KEY)
+        storage.delete(KEY)
+        assert not storage.exists(KEY)
+
+    def test_put_file_copy_keeps_the_source(self, tmp_path, source):
+        storage = LocalStorage(tmp_path / "root")
+        storage.put_file("peaks/pack_a.json", source, move=False)
+        assert source.exists()
+        with storage.open("peaks/pack_a.json") as f:
+            assert f.read() == CONTENT
+        assert list((tmp_path / "root" / "peaks").iterdir()) == [tmp_path / "root" / "peaks" / "pack_a.json"]
+
+    def test_local_copy_is_the_stored_file(self, tmp_path, source):
+        storage = LocalStorage(tmp_path)
+        storage.put_file(KEY, source)
+
+        async def path_of():
+            async with local_copy(storage, KEY) as path:
+                return path
+
+        assert asyncio.run(path_of()) == tmp_path / KEY
+
+    def test_directories_are_not_files(self, tmp_path):
+        (tmp_path / "blobs" / "ab").mkdir(parents=True)
+        assert not LocalStorage(tmp_path).exists("blobs/ab")
+
+
+class TestS3Keys:
+    """Keys are stored under the configured prefix"""
+
+    @pytest.fixture
+    def s3(self, monkeypatch):
+        monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+        monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+        return S3Storage("sounds", prefix="prod/", endpoint_url="http://minio.local:9000", region="us-east-1")
+
+    def test_prefixed_key(self, s3):
+        assert s3._key(KEY) == "prod/" + KEY
+        assert s3.local_path(KEY) is None
+
+    def test_presigned_url_addresses_the_prefixed_object(self, s3):
+        url = urlparse(s3.presigned_url(KEY, filename="Loop.wav", media_type="audio/wav"))
+        # Path-style addressing for a custom endpoint
+        assert url.netloc == "minio.local:9000"
+        assert url.path == "/sounds/prod/" + KEY
+        assert "response-content-disposition" in url.query
+
+    def test_storage_from_env(self, monkeypatch, tmp_path, s3):
+        monkeypatch.setenv("STORAGE_BACKEND", "s3")
+        monkeypatch.setenv("S3_BUCKET", "sounds")
+        monkeypatch.setenv("S3_PREFIX", "prod/")
+        monkeypatch.setenv("S3_REGION", "us-east-1")
+        assert storage_from_env(tmp_path)._key(KEY) == "prod/" + KEY
+        monkeypatch.setenv("STORAGE_BACKEND", "local")
+        assert storage_from_env(tmp_path).local_path(KEY) == tmp_path / KEY
+        monkeypatch.setenv("STORAGE_BACKEND", "ftp")
+        with pytest.raises(ValueError):
+            storage_from_env(tmp_path)